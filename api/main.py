@@ -1,13 +1,49 @@
-from fastapi import FastAPI, Query
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from pathlib import Path
-import pandas as pd
-import unicodedata
-import json
+from dotenv import load_dotenv
+import os
 import numpy as np
 
-app = FastAPI()
+from routes.despesas import router as despesas_router
+from services.banco import buscar_operadoras_mysql, encerrar_engine
+from services.snapshot import GerenciadorSnapshot, SnapshotOperadoras
+
+load_dotenv()
+
+# === Backend de busca: "csv" (em memória) ou "mysql" (tabela cadastro_operadoras) ===
+BUSCA_BACKEND = os.getenv("BUSCA_BACKEND", "csv").lower()
+if BUSCA_BACKEND not in ("csv", "mysql"):
+    raise ValueError(f"❌ BUSCA_BACKEND inválido: {BUSCA_BACKEND} (use 'csv' ou 'mysql')")
+
+# === Carrega o CSV uma vez e acompanha alterações em segundo plano ===
+CADASTRO_PATH = Path(__file__).resolve().parent.parent / "input" / "Relatorio_cadop.csv"
+INTERVALO_RECARGA = float(os.getenv("CADOP_RELOAD_INTERVALO", 30))
+
+gerenciador: GerenciadorSnapshot | None = None
+if BUSCA_BACKEND == "csv":
+    gerenciador = GerenciadorSnapshot(CADASTRO_PATH, intervalo=INTERVALO_RECARGA)
+
+    print(f"✅ CSV carregado com encoding: utf-8")
+    print(f"📦 CSV de operadoras carregado com {len(gerenciador.atual.df)} registros (versão {gerenciador.atual.versao})")
+    print(f"🗂️ Índice de busca criado com {len(gerenciador.atual.indice_busca.postings)} n-gramas")
+else:
+    print("🐬 Busca de operadoras via MySQL (tabela cadastro_operadoras)")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if gerenciador is not None:
+        gerenciador.iniciar()
+    yield
+    if gerenciador is not None:
+        gerenciador.parar()
+    await encerrar_engine()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # === CORS para testes locais com front ===
 app.add_middleware(
@@ -16,39 +52,82 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-# === Carrega o CSV uma vez ===
-CADASTRO_PATH = Path(__file__).resolve().parent.parent / "input" / "Relatorio_cadop.csv"
-
-CAMPO_BUSCA = "razao_social"
-df_operadoras = pd.read_csv(CADASTRO_PATH, sep=";", encoding="utf-8")
-df_operadoras.columns = [col.strip().lower().replace(" ", "_") for col in df_operadoras.columns]
+app.include_router(despesas_router)
 
-print(f"✅ CSV carregado com encoding: utf-8")
-print(f"📦 CSV de operadoras carregado com {len(df_operadoras)} registros")
 
+@app.get("/versao", summary="Versão dos dados de operadoras em uso")
+def versao_dados(response: Response):
+    if gerenciador is None:
+        return {"backend": BUSCA_BACKEND, "versao": None}
+    snapshot = gerenciador.atual
+    response.headers["ETag"] = f'"{snapshot.versao}"'
+    return {
+        "backend": BUSCA_BACKEND,
+        "versao": snapshot.versao,
+        "carregado_em": snapshot.carregado_em,
+        "registros": len(snapshot.df),
+    }
 
-def normalizar(texto: str) -> str:
-    if not isinstance(texto, str):
-        return ""
-    texto = unicodedata.normalize("NFKD", texto)
-    texto = "".join(c for c in texto if not unicodedata.combining(c))
-    return texto.lower().strip()
 
+def buscar_no_snapshot(snapshot: SnapshotOperadoras, q: str, modo: str, limit: int, offset: int) -> list[dict]:
+    """
+    Executa a busca nos índices em memória de um snapshot do CSV.
+    """
+    if modo == "relevancia":
+        ranqueados = snapshot.indice_relevancia.buscar(q, limite=limit, deslocamento=offset)
+        posicoes = [posicao for posicao, _ in ranqueados]
+        pontuacoes = [pontuacao for _, pontuacao in ranqueados]
+    else:
+        posicoes = snapshot.indice_busca.buscar(q, limite=offset + limit)[offset:]
+        pontuacoes = None
 
-@app.get("/operadoras", summary="Busca textual nas operadoras")
-def buscar_operadoras(q: str = Query(..., description="Termo de busca textual")):
-    termo = normalizar(q)
-    df_filtrado = df_operadoras[df_operadoras[CAMPO_BUSCA].apply(lambda x: termo in normalizar(x))]
+    df_filtrado = snapshot.df.iloc[posicoes]
 
     # 👇 Substitui NaN por None para ser JSON-safe
     df_filtrado = df_filtrado.replace({np.nan: None})
 
-    resultados = df_filtrado.head(10).to_dict(orient="records")
+    resultados = df_filtrado.to_dict(orient="records")
+    if pontuacoes is not None:
+        for resultado, pontuacao in zip(resultados, pontuacoes):
+            resultado["score"] = pontuacao
+    return resultados
+
+
+@app.get("/operadoras", summary="Busca textual nas operadoras")
+async def buscar_operadoras(
+    request: Request,
+    response: Response,
+    q: str = Query(..., description="Termo de busca textual"),
+    modo: str = Query("contem", pattern="^(contem|relevancia)$", description=(
+        "'contem' (substring, ordem do arquivo) ou 'relevancia' (aproximada, ranqueada). "
+        "Com BUSCA_BACKEND=mysql, 'relevancia' pontua pelos bigramas do FULLTEXT em vez da "
+        "similaridade de trigramas: o conjunto e a ordem de resultados próximos podem diferir do backend csv"
+    )),
+    limit: int = Query(10, ge=1, le=100, description="Quantidade máxima de resultados"),
+    offset: int = Query(0, ge=0, description="Quantidade de resultados a pular"),
+):
+    if gerenciador is None:
+        versao = None
+        resultados = await buscar_operadoras_mysql(q, modo, limit, offset)
+    else:
+        # Um único snapshot por requisição, mesmo que uma recarga aconteça no meio
+        snapshot = gerenciador.atual
+        versao = snapshot.versao
+        etag = f'"{versao}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        resultados = await run_in_threadpool(buscar_no_snapshot, snapshot, q, modo, limit, offset)
 
     return {
         "query": q,
+        "versao": versao,
+        "modo": modo,
+        "limit": limit,
+        "offset": offset,
         "total": len(resultados),
         "resultados": resultados
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,99 @@
+import re
+
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import text
+
+from services.banco import TABELA_OPERADORAS, escapar_like, obter_engine
+from services.busca import normalizar
+
+router = APIRouter(prefix="/despesas", tags=["despesas"])
+
+# Tabelas mantidas por scripts/resumir_despesas.py
+TABELA_RESUMO = "resumo_despesas_trimestre"
+TABELA_CONTROLE = "controle_resumo_despesas"
+
+DESCRICAO_PADRAO = "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS DE ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR"
+TRIMESTRES_POR_PERIODO = {"trimestre": 1, "ano": 4}
+
+
+def padrao_descricao(descricao: str) -> str:
+    """
+    Monta o padrão LIKE de uma descrição de conta, tolerando espaços repetidos entre as palavras.
+    """
+    palavras = [escapar_like(p) for p in re.split(r"\s+", normalizar(descricao)) if p]
+    return "%" + "%".join(palavras) + "%"
+
+
+async def listar_trimestres(conexao) -> list[tuple[int, int]]:
+    """
+    Retorna os trimestres já resumidos, do mais recente para o mais antigo.
+    """
+    resultado = await conexao.execute(
+        text(f"SELECT ano, trimestre FROM {TABELA_CONTROLE} ORDER BY ano DESC, trimestre DESC")
+    )
+    return [(ano, trimestre) for ano, trimestre in resultado]
+
+
+@router.get("/periodos", summary="Trimestres disponíveis nas tabelas de resumo")
+async def periodos_disponiveis():
+    async with obter_engine().connect() as conexao:
+        trimestres = await listar_trimestres(conexao)
+    return {"trimestres": [f"{trimestre}T{ano}" for ano, trimestre in trimestres]}
+
+
+@router.get("/top-operadoras", summary="Operadoras com maiores despesas no último trimestre ou ano")
+async def top_operadoras(
+    periodo: str = Query("trimestre", pattern="^(trimestre|ano)$", description="'trimestre' (último disponível) ou 'ano' (últimos 4 trimestres)"),
+    descricao: str = Query(DESCRICAO_PADRAO, description="Descrição da conta contábil (busca por palavras)"),
+    conta: int | None = Query(None, description="Código da conta contábil (substitui a descrição)"),
+    limite: int = Query(10, ge=1, le=100, description="Quantidade de operadoras"),
+):
+    async with obter_engine().connect() as conexao:
+        trimestres = (await listar_trimestres(conexao))[:TRIMESTRES_POR_PERIODO[periodo]]
+        if not trimestres:
+            raise HTTPException(
+                status_code=404,
+                detail="Nenhum resumo de despesas disponível. Execute 'make etapa3-despesas'.",
+            )
+
+        ano_fim, trimestre_fim = trimestres[0]
+        ano_inicio, trimestre_inicio = trimestres[-1]
+        parametros = {
+            "inicio": ano_inicio * 10 + trimestre_inicio,
+            "fim": ano_fim * 10 + trimestre_fim,
+            "limite": limite,
+        }
+        if conta is not None:
+            filtro_conta = "r.cd_conta_contabil = :conta"
+            parametros["conta"] = conta
+        else:
+            filtro_conta = "r.descricao LIKE :descricao"
+            parametros["descricao"] = padrao_descricao(descricao)
+
+        resultado = await conexao.execute(
+            text(f"""
+                SELECT r.registro_operadora,
+                       MAX(o.razao_social) AS razao_social,
+                       SUM(r.total_despesa) AS total_despesa
+                FROM {TABELA_RESUMO} r
+                LEFT JOIN {TABELA_OPERADORAS} o ON o.registro_operadora = r.registro_operadora
+                WHERE r.ano BETWEEN :inicio DIV 10 AND :fim DIV 10
+                  AND r.ano * 10 + r.trimestre BETWEEN :inicio AND :fim
+                  AND {filtro_conta}
+                GROUP BY r.registro_operadora
+                ORDER BY total_despesa DESC
+                LIMIT :limite
+            """),
+            parametros,
+        )
+        operadoras = [dict(linha) for linha in resultado.mappings()]
+
+    return {
+        "periodo": periodo,
+        "inicio": f"{trimestre_inicio}T{ano_inicio}",
+        "fim": f"{trimestre_fim}T{ano_fim}",
+        "conta": conta,
+        "descricao": None if conta is not None else descricao,
+        "total": len(operadoras),
+        "operadoras": operadoras,
+    }
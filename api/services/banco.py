@@ -0,0 +1,153 @@
+import os
+import re
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+TABELA_OPERADORAS = "cadastro_operadoras"
+# Tamanho padrão do token do parser ngram do MySQL (ngram_token_size)
+TAMANHO_TOKEN_NGRAM = 2
+# Posição da linha no Relatorio_cadop.csv (gravada pela importação, ver scripts/import_csv_to_mysql.py)
+COLUNA_ORDEM = "ordem_arquivo"
+# Fração da maior pontuação do FULLTEXT abaixo da qual um resultado de 'relevancia' é descartado
+# (padrão; BUSCA_MYSQL_LIMIAR é lida na consulta, depois do load_dotenv da API)
+LIMIAR_PONTUACAO_RELATIVA = 0.2
+
+_engine: AsyncEngine | None = None
+
+
+def obter_engine() -> AsyncEngine:
+    """
+    Retorna o engine assíncrono compartilhado, criando o pool de conexões na primeira chamada.
+    """
+    global _engine
+    if _engine is None:
+        engine_str = (
+            f"mysql+aiomysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}"
+            f"@{os.getenv('MYSQL_HOST')}:{os.getenv('MYSQL_PORT')}/{os.getenv('MYSQL_DATABASE')}?charset=utf8mb4"
+        )
+        _engine = create_async_engine(
+            engine_str,
+            pool_size=int(os.getenv("MYSQL_POOL_SIZE", 5)),
+            max_overflow=int(os.getenv("MYSQL_POOL_MAX_OVERFLOW", 5)),
+            pool_recycle=3600,
+            pool_pre_ping=True,
+        )
+    return _engine
+
+
+async def encerrar_engine() -> None:
+    """
+    Fecha as conexões do pool (chamado no desligamento da API).
+    """
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+
+
+def escapar_like(termo: str) -> str:
+    """
+    Escapa os curingas do LIKE para que o termo seja comparado literalmente.
+    """
+    return termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def termo_booleano(termo: str) -> str:
+    """
+    Remove os operadores do modo BOOLEAN (+ - < > ( ) ~ * " @) digitados pelo usuário.
+
+    Sem operadores, o parser ngram quebra o termo em bigramas e pontua pelas
+    ocorrências de cada um (OR): um erro de digitação só perde alguns bigramas.
+    """
+    return " ".join(re.sub(r'[+\-<>()~*"@]', " ", termo).split())
+
+
+def montar_sql_busca(q: str, modo: str, limit: int, offset: int) -> tuple[str, dict] | None:
+    """
+    Monta a consulta de `buscar_operadoras_mysql`.
+
+    - 'contem': o índice FULLTEXT (parser ngram) em `razao_social` reduz os
+      candidatos e o LIKE confirma a semântica de substring. A collation
+      padrão do MySQL 8 (utf8mb4_0900_ai_ci) já ignora acentos e maiúsculas.
+      O índice precisa ser criado sem stopwords (`innodb_ft_enable_stopword=0`,
+      ver create_database_and_tables), senão bigramas como "am"/"mi" somem do índice.
+      A ordem é a do arquivo (`ordem_arquivo`), como no backend CSV.
+    - 'relevancia': MATCH ... AGAINST em modo BOOLEAN, sem operadores, sobre
+      `razao_social` e `nome_fantasia`: qualquer bigrama em comum conta, então
+      erros de digitação ainda encontram a operadora. Como no limiar de similaridade
+      do backend CSV, só entram linhas com pelo menos `BUSCA_MYSQL_LIMIAR`
+      (padrão 0.2) da maior pontuação da consulta. A pontuação é a do FULLTEXT (TF-IDF dos bigramas),
+      não a similaridade de Jaccard dos trigramas: a ordem entre resultados próximos
+      pode diferir do backend CSV.
+
+    Returns:
+        tuple | None: (SQL, parâmetros), ou None quando a consulta não tem termo pesquisável.
+    """
+    termo = q.strip()
+    parametros = {"limit": limit, "offset": offset}
+
+    if modo == "relevancia":
+        termo = termo_booleano(termo)
+        if not termo:
+            return None
+        limiar = float(os.getenv("BUSCA_MYSQL_LIMIAR", LIMIAR_PONTUACAO_RELATIVA))
+        parametros.update(termo=termo, limiar=limiar)
+        sql = f"""
+            WITH candidatos AS (
+                SELECT *, MATCH(razao_social, nome_fantasia) AGAINST (:termo IN BOOLEAN MODE) AS score
+                FROM {TABELA_OPERADORAS}
+                WHERE MATCH(razao_social, nome_fantasia) AGAINST (:termo IN BOOLEAN MODE)
+            ),
+            pontuados AS (
+                SELECT *, MAX(score) OVER () AS score_maximo FROM candidatos
+            )
+            SELECT *
+            FROM pontuados
+            WHERE score >= :limiar * score_maximo
+            ORDER BY score DESC, {COLUNA_ORDEM}
+            LIMIT :limit OFFSET :offset
+        """
+        return sql, parametros
+
+    parametros["like"] = f"%{escapar_like(termo)}%"
+    filtro_fulltext = ""
+    if len(termo) >= TAMANHO_TOKEN_NGRAM:
+        # Frase entre aspas: o parser ngram exige a sequência de n-gramas do termo
+        parametros["frase"] = '"' + termo.replace('"', " ") + '"'
+        filtro_fulltext = "MATCH(razao_social) AGAINST (:frase IN BOOLEAN MODE) AND "
+    sql = f"""
+        SELECT *
+        FROM {TABELA_OPERADORAS}
+        WHERE {filtro_fulltext}razao_social LIKE :like
+        ORDER BY {COLUNA_ORDEM}
+        LIMIT :limit OFFSET :offset
+    """
+    return sql, parametros
+
+
+async def buscar_operadoras_mysql(q: str, modo: str, limit: int, offset: int) -> list[dict]:
+    """
+    Busca operadoras na tabela `cadastro_operadoras` do MySQL (consulta de `montar_sql_busca`).
+
+    Args:
+        q (str): Termo de busca.
+        modo (str): 'contem' ou 'relevancia'.
+        limit (int): Quantidade máxima de resultados.
+        offset (int): Quantidade de resultados a pular.
+
+    Returns:
+        list[dict]: Linhas encontradas.
+    """
+    consulta = montar_sql_busca(q, modo, limit, offset)
+    if consulta is None:
+        return []
+    sql, parametros = consulta
+
+    async with obter_engine().connect() as conexao:
+        resultado = await conexao.execute(text(sql), parametros)
+        linhas = [dict(linha) for linha in resultado.mappings()]
+    for linha in linhas:
+        linha.pop("score_maximo", None)
+        linha.pop(COLUNA_ORDEM, None)
+    return linhas
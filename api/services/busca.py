@@ -0,0 +1,219 @@
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from math import ceil
+
+import pandas as pd
+
+TAMANHO_NGRAMA = 3
+LIMIAR_SIMILARIDADE = 0.2
+
+
+def normalizar(texto: str) -> str:
+    """
+    Remove acentuação, converte para minúsculas e remove espaços das pontas.
+
+    Valores que não são texto (ex.: NaN) viram string vazia.
+    """
+    if not isinstance(texto, str):
+        return ""
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return texto.lower().strip()
+
+
+def gerar_ngramas(texto: str, n: int = TAMANHO_NGRAMA) -> set[str]:
+    """
+    Gera o conjunto de n-gramas (substrings de tamanho n) de um texto.
+    """
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+def gerar_trigramas_palavras(texto: str) -> set[str]:
+    """
+    Gera trigramas por palavra, com preenchimento nas bordas (como o pg_trgm).
+
+    Como cada palavra é tratada isoladamente, a ordem das palavras não altera
+    o conjunto, e erros de digitação preservam boa parte dos trigramas.
+    """
+    trigramas: set[str] = set()
+    for palavra in re.split(r"[^a-z0-9]+", normalizar(texto)):
+        if palavra:
+            trigramas |= gerar_ngramas(f"  {palavra} ")
+    return trigramas
+
+
+class IndiceBusca:
+    """
+    Índice em memória para busca por substring em uma coluna de texto.
+
+    Os valores da coluna são normalizados uma única vez na construção e
+    cada n-grama aponta para as posições (ordem do arquivo) que o contêm.
+    Uma consulta só verifica as linhas que possuem todos os n-gramas do termo,
+    mantendo a mesma semântica de `termo in normalizar(valor)`.
+    """
+
+    def __init__(self, df: pd.DataFrame, campo: str):
+        self.nomes: list[str] = [normalizar(valor) for valor in df[campo].tolist()]
+
+        postings: dict[str, list[int]] = defaultdict(list)
+        for posicao, nome in enumerate(self.nomes):
+            for ngrama in gerar_ngramas(nome):
+                postings[ngrama].append(posicao)
+        self.postings: dict[str, list[int]] = dict(postings)
+
+    def __len__(self) -> int:
+        return len(self.nomes)
+
+    def _candidatos(self, termo: str) -> list[int]:
+        """
+        Retorna, em ordem crescente, as posições que contêm todos os n-gramas do termo.
+        Termos menores que o n-grama não podem ser filtrados e retornam todas as linhas.
+        """
+        if len(termo) < TAMANHO_NGRAMA:
+            return list(range(len(self.nomes)))
+
+        listas = []
+        for ngrama in gerar_ngramas(termo):
+            posicoes = self.postings.get(ngrama)
+            if not posicoes:
+                return []
+            listas.append(posicoes)
+
+        # Interseção começando pela lista mais curta
+        listas.sort(key=len)
+        candidatos = set(listas[0])
+        for posicoes in listas[1:]:
+            candidatos.intersection_update(posicoes)
+            if not candidatos:
+                return []
+        return sorted(candidatos)
+
+    def buscar(self, consulta: str, limite: int | None = None) -> list[int]:
+        """
+        Busca as linhas cujo valor normalizado contém a consulta normalizada.
+
+        Args:
+            consulta (str): Termo digitado pelo usuário.
+            limite (int | None): Quantidade máxima de posições retornadas.
+
+        Returns:
+            list[int]: Posições das linhas encontradas, na ordem do arquivo.
+        """
+        termo = normalizar(consulta)
+        encontrados: list[int] = []
+        for posicao in self._candidatos(termo):
+            if termo in self.nomes[posicao]:
+                encontrados.append(posicao)
+                if limite is not None and len(encontrados) >= limite:
+                    break
+        return encontrados
+
+
+class IndiceRelevancia:
+    """
+    Índice de trigramas por palavra para busca aproximada ranqueada.
+
+    Cada par (linha, campo) é um documento; a pontuação da linha é a maior
+    similaridade de Jaccard entre os trigramas da consulta e os de seus campos.
+    """
+
+    def __init__(self, df: pd.DataFrame, campos: list[str]):
+        self.campos = campos
+        # Documento d corresponde à linha d // len(campos) e ao campo d % len(campos)
+        self.tamanhos: list[int] = []
+        postings: dict[str, list[int]] = defaultdict(list)
+        documento = 0
+        for valores in zip(*(df[campo].tolist() for campo in campos)):
+            for valor in valores:
+                trigramas = gerar_trigramas_palavras(valor)
+                self.tamanhos.append(len(trigramas))
+                for trigrama in trigramas:
+                    postings[trigrama].append(documento)
+                documento += 1
+        self.postings: dict[str, list[int]] = dict(postings)
+
+    def _em_comum(self, documento: int, listas: list[list[int]]) -> int:
+        """
+        Quantas listas de postings (ordenadas) contêm o documento (busca binária em cada uma).
+        """
+        total = 0
+        for lista in listas:
+            posicao = bisect_left(lista, documento)
+            if posicao < len(lista) and lista[posicao] == documento:
+                total += 1
+        return total
+
+    def buscar(
+        self,
+        consulta: str,
+        limite: int = 10,
+        deslocamento: int = 0,
+        limiar: float = LIMIAR_SIMILARIDADE,
+    ) -> list[tuple[int, float]]:
+        """
+        Retorna as linhas mais similares à consulta, da maior para a menor pontuação.
+
+        A similaridade de Jaccard de um documento nunca passa de
+        `em_comum / trigramas da consulta`, então uma linha só pode entrar no
+        top-k se tiver pelo menos `necessarios` trigramas em comum, valor que
+        sobe junto com o pior item do heap (limitado a `deslocamento + limite`).
+        Pelo princípio da casa dos pombos, um documento com `necessarios`
+        trigramas aparece em pelo menos uma das `L - necessarios + 1` listas mais
+        curtas. As listas são percorridas da mais curta para a mais longa e a
+        varredura para assim que as restantes não podem mais trazer um candidato
+        novo; as listas longas (trigramas comuns) só são consultadas por busca binária.
+
+        Args:
+            consulta (str): Termo digitado pelo usuário.
+            limite (int): Quantidade de resultados da página.
+            deslocamento (int): Quantidade de resultados a pular (paginação).
+            limiar (float): Similaridade mínima para um resultado ser aceito.
+
+        Returns:
+            list[tuple[int, float]]: Pares (posição da linha, pontuação).
+        """
+        trigramas_consulta = gerar_trigramas_palavras(consulta)
+        total_consulta = len(trigramas_consulta)
+        k = deslocamento + limite
+        if not total_consulta or k <= 0:
+            return []
+
+        listas = sorted(
+            (self.postings[trigrama] for trigrama in trigramas_consulta if trigrama in self.postings), key=len
+        )
+        n_campos = len(self.campos)
+        # Heap mínimo de (pontuação, -posição): o topo é o pior resultado mantido
+        heap: list[tuple[float, int]] = []
+        avaliadas: set[int] = set()
+
+        for i, lista in enumerate(listas):
+            corte = max(limiar, heap[0][0]) if len(heap) >= k else limiar
+            # Menor quantidade de trigramas em comum que ainda alcança o corte (empates incluídos)
+            necessarios = max(1, ceil(corte * total_consulta - 1e-9))
+            if len(listas) - i < necessarios:
+                break
+            for documento in lista:
+                linha = documento // n_campos
+                if linha in avaliadas:
+                    continue
+                avaliadas.add(linha)
+                pontuacao = 0.0
+                for campo in range(n_campos):
+                    documento_campo = linha * n_campos + campo
+                    em_comum = self._em_comum(documento_campo, listas)
+                    if em_comum:
+                        uniao = total_consulta + self.tamanhos[documento_campo] - em_comum
+                        pontuacao = max(pontuacao, em_comum / uniao)
+                if pontuacao < limiar:
+                    continue
+                item = (pontuacao, -linha)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+        ordenados = sorted(heap, reverse=True)[deslocamento:]
+        return [(-linha_negativa, round(pontuacao, 4)) for pontuacao, linha_negativa in ordenados]
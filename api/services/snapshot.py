@@ -0,0 +1,131 @@
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from services.busca import IndiceBusca, IndiceRelevancia
+
+# A API roda a partir de api/ (uvicorn main:app); a raiz do projeto dá acesso ao pacote scripts
+RAIZ_PROJETO = Path(__file__).resolve().parent.parent.parent
+if str(RAIZ_PROJETO) not in sys.path:
+    sys.path.append(str(RAIZ_PROJETO))
+
+from scripts.etl_utils import calcular_hash_arquivo
+
+CAMPO_BUSCA = "razao_social"
+CAMPOS_RELEVANCIA = ["razao_social", "nome_fantasia"]
+
+
+def assinatura_arquivo(caminho: Path) -> tuple[int, int]:
+    """
+    Retorna (mtime em ns, tamanho) do arquivo, usado para detectar alterações sem lê-lo.
+    """
+    stat = caminho.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SnapshotOperadoras:
+    """
+    Versão do cadastro de operadoras: DataFrame e índices de busca.
+
+    Uma requisição deve obter o snapshot uma única vez e usá-lo até o fim,
+    assim a troca por uma versão nova nunca mistura dados de arquivos diferentes.
+    """
+
+    def __init__(self, df: pd.DataFrame, versao: str, assinatura: tuple[int, int]):
+        self.df = df
+        self.versao = versao
+        self.assinatura = assinatura
+        self.carregado_em = datetime.now().isoformat(timespec="seconds")
+        self.indice_busca = IndiceBusca(df, CAMPO_BUSCA)
+        self.indice_relevancia = IndiceRelevancia(
+            df, [campo for campo in CAMPOS_RELEVANCIA if campo in df.columns]
+        )
+
+
+def carregar_snapshot(caminho: Path) -> SnapshotOperadoras:
+    """
+    Lê o CSV do CADOP e constrói um snapshot com seus índices.
+
+    A versão é o prefixo do SHA-256 do conteúdo, então o mesmo arquivo
+    sempre gera a mesma versão (e o mesmo ETag), mesmo após reinícios.
+    """
+    assinatura = assinatura_arquivo(caminho)
+    versao = calcular_hash_arquivo(caminho)[:16]
+    df = pd.read_csv(caminho, sep=";", encoding="utf-8")
+    df.columns = [col.strip().lower().replace(" ", "_") for col in df.columns]
+    return SnapshotOperadoras(df, versao, assinatura)
+
+
+class GerenciadorSnapshot:
+    """
+    Mantém o snapshot atual e recarrega o CSV em segundo plano quando ele muda.
+
+    A verificação compara mtime e tamanho; só quando mudam o hash é recalculado.
+    O novo snapshot é construído inteiro fora do caminho das requisições e
+    publicado com uma única atribuição, que é atômica no Python.
+    """
+
+    def __init__(self, caminho: Path, intervalo: float = 30):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.atual = carregar_snapshot(caminho)
+        self._parar = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def verificar(self) -> bool:
+        """
+        Recarrega o snapshot se o arquivo mudou.
+
+        Returns:
+            bool: True se um novo snapshot foi publicado.
+        """
+        try:
+            assinatura = assinatura_arquivo(self.caminho)
+        except FileNotFoundError:
+            return False
+        if assinatura == self.atual.assinatura:
+            return False
+
+        try:
+            if calcular_hash_arquivo(self.caminho)[:16] == self.atual.versao:
+                # Mesmo conteúdo com mtime novo: só atualiza a assinatura
+                self.atual.assinatura = assinatura
+                return False
+            novo = carregar_snapshot(self.caminho)
+            # Arquivo ainda sendo escrito: tenta de novo na próxima verificação
+            if assinatura_arquivo(self.caminho) != novo.assinatura:
+                return False
+        except Exception as e:
+            print(f"⚠️ Falha ao recarregar {self.caminho.name}, mantendo versão {self.atual.versao}: {e}")
+            return False
+
+        anterior = self.atual.versao
+        self.atual = novo
+        print(f"🔄 CSV de operadoras recarregado: versão {anterior} → {novo.versao} ({len(novo.df)} registros)")
+        return True
+
+    def _executar(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            self.verificar()
+
+    def iniciar(self) -> None:
+        """
+        Inicia a thread de monitoramento (não faz nada se o intervalo for 0).
+        """
+        if self.intervalo <= 0 or self._thread is not None:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="recarga-cadop", daemon=True)
+        self._thread.start()
+
+    def parar(self) -> None:
+        """
+        Encerra a thread de monitoramento.
+        """
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,17 @@
+CREATE TABLE IF NOT EXISTS `fato_despesas_contabeis` (
+  `data` DATE NOT NULL,
+  `registro_operadora` MEDIUMINT UNSIGNED NOT NULL,
+  `cd_conta_contabil` INT UNSIGNED NOT NULL,
+  `descricao` VARCHAR(255) NULL,
+  `vl_saldo_inicial` DECIMAL(20,2) NULL,
+  `vl_saldo_final` DECIMAL(20,2) NULL,
+  PRIMARY KEY (`data`, `registro_operadora`, `cd_conta_contabil`),
+  KEY `idx_operadora_data` (`registro_operadora`, `data`),
+  KEY `idx_conta_data` (`cd_conta_contabil`, `data`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE (YEAR(`data`)) (
+  PARTITION p2024 VALUES LESS THAN (2025),
+  PARTITION p2025 VALUES LESS THAN (2026),
+  PARTITION p2026 VALUES LESS THAN (2027),
+  PARTITION pmax VALUES LESS THAN MAXVALUE
+);
\ No newline at end of file
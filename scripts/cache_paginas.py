@@ -0,0 +1,102 @@
+import os
+import json
+import hashlib
+import logging
+import pdfplumber
+from pathlib import Path
+from scripts.etl_utils import calcular_hash_arquivo
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = BASE_DIR / "output" / "cache" / "etapa2"
+CACHE_MAX_MB = int(os.getenv("ETAPA2_CACHE_MAX_MB", 256))
+
+
+def configurar_cache(pdf_path: Path, table_settings: dict | None = None, diretorio: Path = CACHE_DIR) -> dict:
+    """
+    Monta a configuração do cache de páginas de um PDF.
+
+    A chave de cada página combina o hash do conteúdo do PDF, a versão do
+    pdfplumber e as configurações de extração; mudar qualquer um deles
+    invalida as entradas antigas, que depois são removidas pela limpeza por tamanho.
+
+    Args:
+        pdf_path (Path): PDF a ser extraído.
+        table_settings (dict | None): Configurações passadas ao `extract_table()`.
+        diretorio (Path): Diretório do cache.
+
+    Returns:
+        dict: Configuração serializável (pode ser enviada aos processos do pool).
+    """
+    configuracao = json.dumps(
+        {"pdfplumber": pdfplumber.__version__, "table_settings": table_settings or {}},
+        sort_keys=True,
+    )
+    prefixo = f"{calcular_hash_arquivo(pdf_path)}:{configuracao}"
+    return {"diretorio": str(diretorio), "prefixo": prefixo}
+
+
+def caminho_pagina(cache: dict, pagina: int) -> Path:
+    """
+    Caminho do arquivo de cache de uma página.
+    """
+    chave = hashlib.sha256(f"{cache['prefixo']}:{pagina}".encode("utf-8")).hexdigest()
+    return Path(cache["diretorio"]) / chave[:2] / f"{chave}.json"
+
+
+def ler_pagina(cache: dict, pagina: int) -> tuple[bool, list[list] | None]:
+    """
+    Lê a tabela de uma página do cache.
+
+    Returns:
+        tuple: (encontrada no cache, tabela ou None quando a página não tinha tabela).
+    """
+    caminho = caminho_pagina(cache, pagina)
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            tabela = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False, None
+    # Atualiza o mtime: a limpeza remove primeiro as entradas usadas há mais tempo
+    os.utime(caminho)
+    return True, tabela
+
+
+def gravar_pagina(cache: dict, pagina: int, tabela: list[list] | None) -> None:
+    """
+    Grava a tabela de uma página no cache (escrita atômica, segura entre processos).
+    """
+    caminho = caminho_pagina(cache, pagina)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_suffix(f".{os.getpid()}.tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(tabela, f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def aplicar_limite_cache(diretorio: Path = CACHE_DIR, max_mb: int = CACHE_MAX_MB) -> int:
+    """
+    Remove as entradas menos usadas até o cache caber em `max_mb`.
+
+    Returns:
+        int: Quantidade de arquivos removidos.
+    """
+    if not diretorio.exists():
+        return 0
+    entradas = []
+    total = 0
+    for caminho in diretorio.rglob("*.json"):
+        stat = caminho.stat()
+        entradas.append((stat.st_mtime, stat.st_size, caminho))
+        total += stat.st_size
+
+    limite = max_mb * 1024 * 1024
+    removidos = 0
+    for _, tamanho, caminho in sorted(entradas):
+        if total <= limite:
+            break
+        caminho.unlink(missing_ok=True)
+        total -= tamanho
+        removidos += 1
+    if removidos:
+        logging.info(f"🧹 Cache de páginas: {removidos} entrada(s) removida(s) para respeitar {max_mb} MB")
+    return removidos
@@ -48,6 +48,9 @@ def main():
         cursor = conexao.cursor()
         cursor.execute(f"CREATE DATABASE IF NOT EXISTS {NOME_BANCO}")
         cursor.execute(f"USE {NOME_BANCO}")
+        # Índices FULLTEXT (ngram) criados nesta sessão não usam a lista de stopwords do InnoDB:
+        # ela descartaria todo bigrama com "a", "i"... e a busca 'contem' da API não acharia "amil"
+        cursor.execute("SET SESSION innodb_ft_enable_stopword = 0")
         logger.info(f"Banco de dados '{NOME_BANCO}' pronto para uso.")
 
         executar_script_sql(CAMINHO_SQL_CADASTRO, conexao)
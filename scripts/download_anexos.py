@@ -1,12 +1,13 @@
+import asyncio
 import logging
 import os
-import requests
 from bs4 import BeautifulSoup
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 from zipfile import ZipFile
 from dotenv import load_dotenv
 from scripts.etl_utils import setup_logger
+from scripts.download_utils import ClienteDownload
 logger = setup_logger(__name__, console=True)
 
 logger.info('🚀 Iniciando script...')
@@ -32,13 +33,10 @@ logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s - %(levelname)s - %(mes
 ANEXO_DIR.mkdir(parents=True, exist_ok=True)
 ZIP_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-def obter_soup(url: str) -> BeautifulSoup:
-    headers = {"User-Agent": USER_AGENT}
+async def obter_soup(cliente: ClienteDownload, url: str) -> BeautifulSoup:
     try:
-        response = requests.get(url, headers=headers, timeout=20)
-        response.raise_for_status()
-        return BeautifulSoup(response.text, "html.parser")
-    except requests.RequestException as e:
+        return BeautifulSoup(await cliente.buscar_texto(url), "html.parser")
+    except Exception as e:
         logging.error(f"Erro ao acessar a URL: {url} - {e}")
         raise
 
@@ -53,13 +51,10 @@ def extrair_links_anexos(soup: BeautifulSoup):
             anexos.append((nome_arquivo, url_absoluta))
     return anexos
 
-def baixar_arquivo(nome_arquivo: str, url: str, pasta_destino: Path):
+async def baixar_arquivo(cliente: ClienteDownload, nome_arquivo: str, url: str, pasta_destino: Path):
     caminho = pasta_destino / nome_arquivo
     try:
-        response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=30)
-        response.raise_for_status()
-        with open(caminho, "wb") as f:
-            f.write(response.content)
+        await cliente.baixar(url, caminho)
         logging.info(f"✅ Baixado: {nome_arquivo}")
     except Exception as e:
         logging.error(f"❌ Erro ao baixar {url}: {e}")
@@ -70,17 +65,28 @@ def compactar_arquivos(pasta: Path, destino_zip: Path):
             zipf.write(file, arcname=file.name)
     logging.info(f"📦 Compactado em: {destino_zip}")
 
+async def baixar_anexos() -> bool:
+    """
+    Lê a página da ANS e baixa os anexos em paralelo, na mesma sessão HTTP.
+
+    Returns:
+        bool: False se nenhum anexo foi encontrado.
+    """
+    async with ClienteDownload(user_agent=USER_AGENT) as cliente:
+        logging.info("🌐 Acessando a página da ANS...")
+        soup = await obter_soup(cliente, URL)
+        anexos = extrair_links_anexos(soup)
+        if not anexos:
+            logging.warning("⚠️ Nenhum anexo encontrado.")
+            return False
+
+        await asyncio.gather(*(baixar_arquivo(cliente, nome, link, ANEXO_DIR) for nome, link in anexos))
+    return True
+
 def executar_download_anexos():
-    logging.info("🌐 Acessando a página da ANS...")
-    soup = obter_soup(URL)
-    anexos = extrair_links_anexos(soup)
-    if not anexos:
-        logging.warning("⚠️ Nenhum anexo encontrado.")
+    if not asyncio.run(baixar_anexos()):
         return
 
-    for nome, link in anexos:
-        baixar_arquivo(nome, link, ANEXO_DIR)
-
     compactar_arquivos(ANEXO_DIR, ZIP_PATH)
 
     # === Limpeza dos PDFs após compactação ===
@@ -90,6 +96,8 @@ def executar_download_anexos():
             logging.info(f"🧹 PDF removido: {file.name}")
         except Exception as e:
             logging.warning(f"⚠️ Falha ao remover {file.name}: {e}")
+    for file in ANEXO_DIR.glob("*.pdf.manifesto.json"):
+        file.unlink(missing_ok=True)
 
     logging.info("✅ Download e compactação finalizados.")
 
@@ -1,7 +1,9 @@
 import os
-import requests
+import asyncio
+from pathlib import Path
 from dotenv import load_dotenv
 from scripts.etl_utils import setup_logger
+from scripts.download_utils import ClienteDownload
 logger = setup_logger(__name__, console=True)
 
 logger.info('🚀 Iniciando script...')
@@ -14,14 +16,14 @@ OUTPUT_DIR = os.path.join("input")
 FILENAME = "Relatorio_cadop.csv"
 DEST_PATH = os.path.join(OUTPUT_DIR, FILENAME)
 
+async def baixar(url: str, destino: Path) -> Path:
+    async with ClienteDownload() as cliente:
+        return await cliente.baixar(url, destino)
+
 def baixar_csv_cadop():
     print("📥 Baixando arquivo CADOP da ANS...")
     try:
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        response = requests.get(URL_CADOP, timeout=30)
-        response.raise_for_status()
-        with open(DEST_PATH, "wb") as f:
-            f.write(response.content)
+        asyncio.run(baixar(URL_CADOP, Path(DEST_PATH)))
         print(f"✅ Download finalizado: {DEST_PATH}")
     except Exception as e:
         print(f"❌ Erro ao baixar arquivo CADOP: {e}")
@@ -1,8 +1,10 @@
 import os
-import requests
+import asyncio
+from pathlib import Path
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from datetime import datetime
+from scripts.download_utils import ClienteDownload, arquivo_integro, nome_do_arquivo
 
 # === CONFIGURAÇÕES ===
 load_dotenv()
@@ -11,65 +13,67 @@ ANOS_RETROATIVOS = int(os.getenv("DEMO_ANOS_RETROATIVOS"))
 DESTINO = "input"
 
 
-def baixar_arquivo(url: str, destino: str) -> None:
-    """Faz o download de um arquivo ZIP se ainda não existir localmente."""
-    nome_arquivo = url.split("/")[-1]
-    caminho_arquivo = os.path.join(destino, nome_arquivo)
-    if os.path.exists(caminho_arquivo):
-        print(f"⚠️  Arquivo já existe: {nome_arquivo}, pulando download.")
+async def baixar_arquivo(cliente: ClienteDownload, url: str, destino: str) -> None:
+    """Faz o download de um arquivo ZIP, a menos que já exista íntegro (tamanho e SHA-256 do manifesto)."""
+    nome_arquivo = nome_do_arquivo(url)
+    caminho_arquivo = Path(destino) / nome_arquivo
+    if await asyncio.to_thread(arquivo_integro, caminho_arquivo):
+        print(f"⚠️  Arquivo já existe e foi verificado: {nome_arquivo}, pulando download.")
         return
 
     try:
-        resposta = requests.get(url, timeout=30)
-        resposta.raise_for_status()
-        with open(caminho_arquivo, "wb") as f:
-            f.write(resposta.content)
+        await cliente.baixar(url, caminho_arquivo)
         print(f"✅ Baixado com sucesso: {nome_arquivo}")
     except Exception as e:
         print(f"❌ Erro ao baixar {nome_arquivo} → {e}")
 
 
-def encontrar_arquivos_zip() -> list[str]:
-    """Acessa o índice do FTP da ANS e retorna os arquivos ZIP dos anos alvo."""
+def anos_alvo() -> list[str]:
+    """Anos completos dentro da janela de DEMO_ANOS_RETROATIVOS."""
+    ano_atual = datetime.now().year
+    #return [str(ano) for ano in range(ano_atual - ANOS_RETROATIVOS + 1, ano_atual + 1)] # Caso seja interessante pegar do ano atual, mesmo sendo algo não usual.
+    return [str(ano) for ano in range(ano_atual - ANOS_RETROATIVOS, ano_atual)]
+
+
+async def encontrar_arquivos_zip(cliente: ClienteDownload, base_url: str = BASE_URL, anos: list[str] | None = None) -> list[str]:
+    """Acessa o índice do FTP da ANS e retorna os arquivos ZIP dos anos alvo (diretórios dos anos em paralelo)."""
     print("🌐 Acessando diretório de demonstrações contábeis...")
     try:
-        resposta = requests.get(BASE_URL, timeout=15)
-        resposta.raise_for_status()
+        indice = await cliente.buscar_texto(base_url)
     except Exception as e:
-        print(f"❌ Erro ao acessar {BASE_URL} → {e}")
+        print(f"❌ Erro ao acessar {base_url} → {e}")
         return []
 
-    soup = BeautifulSoup(resposta.text, "html.parser")
+    soup = BeautifulSoup(indice, "html.parser")
     links = [a["href"] for a in soup.find_all("a", href=True)]
 
-    ano_atual = datetime.now().year
-    #anos_alvo = [str(ano) for ano in range(ano_atual - ANOS_RETROATIVOS + 1, ano_atual + 1)] # Caso seja interessante pegar do ano atual, mesmo sendo algo não usual.
-    anos_alvo = [str(ano) for ano in range(ano_atual - ANOS_RETROATIVOS, ano_atual)]
+    anos = anos if anos is not None else anos_alvo()
+    urls_anos = [base_url + link for link in links if link.strip("/").isdigit() and link.strip("/") in anos]
 
     arquivos = []
+    for ano_url, pagina in zip(urls_anos, await cliente.buscar_textos(urls_anos)):
+        if isinstance(pagina, BaseException):
+            print(f"❌ Erro ao acessar {ano_url} → {pagina}")
+            continue
+        soup_ano = BeautifulSoup(pagina, "html.parser")
+        zips = [a["href"] for a in soup_ano.find_all("a", href=True) if a["href"].endswith(".zip")]
+        arquivos += [ano_url + zipfile for zipfile in zips]
 
-    for link in links:
-        if link.strip("/").isdigit() and link.strip("/") in anos_alvo:
-            ano_url = BASE_URL + link
-            try:
-                resposta_ano = requests.get(ano_url, timeout=15)
-                resposta_ano.raise_for_status()
-                soup_ano = BeautifulSoup(resposta_ano.text, "html.parser")
-                zips = [a["href"] for a in soup_ano.find_all("a", href=True) if a["href"].endswith(".zip")]
-                arquivos += [ano_url + zipfile for zipfile in zips]
-            except Exception as e:
-                print(f"❌ Erro ao acessar {ano_url} → {e}")
-
-    print(f"🔎 Encontrados {len(arquivos)} arquivos dos anos: {', '.join(anos_alvo)}")
+    print(f"🔎 Encontrados {len(arquivos)} arquivos dos anos: {', '.join(anos)}")
     return arquivos
 
 
+async def baixar_demonstracoes(destino: str = DESTINO) -> None:
+    """Procura e baixa os ZIPs com uma única sessão HTTP (conexões reaproveitadas)."""
+    async with ClienteDownload() as cliente:
+        arquivos = await encontrar_arquivos_zip(cliente)
+        await asyncio.gather(*(baixar_arquivo(cliente, url, destino) for url in arquivos))
+
+
 def main():
     """Executa o download dos arquivos de demonstrações contábeis."""
     os.makedirs(DESTINO, exist_ok=True)
-    arquivos = encontrar_arquivos_zip()
-    for url in arquivos:
-        baixar_arquivo(url, DESTINO)
+    asyncio.run(baixar_demonstracoes())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,272 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import aiohttp
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+from scripts.etl_utils import calcular_hash_arquivo
+
+load_dotenv()
+
+USER_AGENT = os.getenv("USER_AGENT", "Mozilla/5.0")
+# Conexões abertas ao mesmo tempo (total e por host); reaproveitadas via keep-alive
+CONCORRENCIA = int(os.getenv("DOWNLOAD_CONCORRENCIA", 8))
+CONCORRENCIA_POR_HOST = int(os.getenv("DOWNLOAD_CONCORRENCIA_POR_HOST", 4))
+# Tentativas por requisição e espera inicial (s) entre elas, dobrada a cada falha
+TENTATIVAS = int(os.getenv("DOWNLOAD_TENTATIVAS", 3))
+BACKOFF = float(os.getenv("DOWNLOAD_BACKOFF", 1.0))
+# Espera máxima (s) para conectar e entre dois blocos recebidos; não limita a duração do download inteiro
+TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", 60))
+# Bytes gravados por vez: a memória usada não depende do tamanho do arquivo
+TAMANHO_BLOCO = 1024 * 1024
+
+# Respostas temporárias: vale tentar de novo
+STATUS_RETENTATIVA = {408, 429, 500, 502, 503, 504}
+
+
+class ClienteDownload:
+    """
+    Sessão HTTP assíncrona compartilhada pelos scripts de download.
+
+    Uma única sessão com pool de conexões (keep-alive) para índices e arquivos,
+    limite de conexões por host e novas tentativas com backoff exponencial
+    para erros de rede e respostas temporárias (5xx, 429, 408). Arquivos são
+    gravados em blocos num `.part` e continuados com `Range` após uma queda.
+
+    Uso:
+        async with ClienteDownload() as cliente:
+            html = await cliente.buscar_texto(url)
+    """
+
+    def __init__(
+        self,
+        user_agent: str = USER_AGENT,
+        concorrencia: int = CONCORRENCIA,
+        concorrencia_por_host: int = CONCORRENCIA_POR_HOST,
+        tentativas: int = TENTATIVAS,
+        backoff: float = BACKOFF,
+        timeout: float = TIMEOUT,
+    ):
+        self.user_agent = user_agent
+        self.concorrencia = concorrencia
+        self.concorrencia_por_host = concorrencia_por_host
+        self.tentativas = max(tentativas, 1)
+        self.backoff = backoff
+        self.timeout = timeout
+        self.sessao: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> "ClienteDownload":
+        conector = aiohttp.TCPConnector(limit=self.concorrencia, limit_per_host=self.concorrencia_por_host)
+        self.sessao = aiohttp.ClientSession(
+            connector=conector,
+            headers={"User-Agent": self.user_agent},
+            # Sem limite total: ZIPs de centenas de MB podem levar mais que `timeout` e continuam válidos
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.sessao.close()
+        self.sessao = None
+
+    async def _requisitar(self, url: str, ler, cabecalhos: Callable[[], dict] | None = None):
+        """
+        Faz um GET e aplica `ler(resposta)`, tentando de novo em falhas temporárias.
+
+        Erros 4xx (exceto 408/429) não são repetidos: o recurso não vai aparecer na próxima tentativa.
+        `cabecalhos` é chamado a cada tentativa (ex.: Range a partir do que já foi gravado).
+        """
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                async with self.sessao.get(url, headers=cabecalhos() if cabecalhos else None) as resposta:
+                    if resposta.status not in STATUS_RETENTATIVA or tentativa == self.tentativas:
+                        resposta.raise_for_status()
+                        return await ler(resposta)
+                    erro = f"HTTP {resposta.status}"
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                if tentativa == self.tentativas:
+                    raise
+                erro = repr(e)
+            espera = self.backoff * 2 ** (tentativa - 1)
+            logging.warning(f"🔁 {url}: tentativa {tentativa}/{self.tentativas} falhou ({erro}), nova tentativa em {espera:.1f}s")
+            await asyncio.sleep(espera)
+
+    async def buscar_texto(self, url: str) -> str:
+        """
+        Baixa uma página (índice de diretório, HTML) como texto.
+        """
+        return await self._requisitar(url, lambda resposta: resposta.text())
+
+    async def buscar_textos(self, urls: list[str]) -> list[str | BaseException]:
+        """
+        Baixa várias páginas ao mesmo tempo, na ordem de `urls`; falhas voltam como exceção na lista.
+        """
+        return await asyncio.gather(*(self.buscar_texto(url) for url in urls), return_exceptions=True)
+
+    async def baixar(self, url: str, destino: Path, sha256_esperado: str | None = None) -> Path:
+        """
+        Baixa um arquivo em blocos para `<destino>.part` e renomeia ao final (atômico).
+
+        Um `.part` deixado por uma execução interrompida é continuado com `Range`/`If-Range`
+        (se o arquivo mudou no servidor, a resposta vem inteira e o download recomeça).
+        Tamanho e SHA-256 ficam no manifesto ao lado do arquivo (`<destino>.manifesto.json`).
+
+        Args:
+            url (str): Endereço do arquivo.
+            destino (Path): Caminho final do arquivo.
+            sha256_esperado (str | None): Hash conhecido; se não bater, o download é descartado.
+
+        Returns:
+            Path: O próprio `destino`.
+        """
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        parcial = caminho_parcial(destino)
+        manifesto = ler_manifesto(destino)
+        # Um .part só pode ser continuado se veio da mesma URL e de um download ainda não concluído
+        if parcial.exists() and (manifesto.get("url") != url or manifesto.get("completo")):
+            parcial.unlink()
+
+        def cabecalhos() -> dict:
+            # Sem compressão: os bytes de Range precisam ser os do arquivo
+            cabecalhos = {"Accept-Encoding": "identity"}
+            inicio = parcial.stat().st_size if parcial.exists() else 0
+            validador = manifesto.get("etag") or manifesto.get("last_modified")
+            if inicio and validador:
+                cabecalhos["Range"] = f"bytes={inicio}-"
+                cabecalhos["If-Range"] = validador
+            return cabecalhos
+
+        async def gravar(resposta: aiohttp.ClientResponse) -> tuple[int, str]:
+            continuar = resposta.status == 206
+            if continuar:
+                sha = await asyncio.to_thread(hash_parcial, parcial)
+                # "bytes inicio-fim/*": o servidor não informa o tamanho total (RFC 9110)
+                total = resposta.headers["Content-Range"].rsplit("/", 1)[-1]
+                total = int(total) if total.isdigit() else None
+            else:
+                sha = hashlib.sha256()
+                total = resposta.content_length
+                manifesto.clear()
+                manifesto.update(
+                    url=url,
+                    etag=resposta.headers.get("ETag"),
+                    last_modified=resposta.headers.get("Last-Modified"),
+                    completo=False,
+                )
+                gravar_manifesto(destino, manifesto)
+
+            with open(parcial, "ab" if continuar else "wb") as f:
+                async for bloco in resposta.content.iter_chunked(TAMANHO_BLOCO):
+                    f.write(bloco)
+                    sha.update(bloco)
+            tamanho = parcial.stat().st_size
+            if total is not None and tamanho != total:
+                # Conexão caiu no meio: a próxima tentativa continua do ponto em que parou
+                raise aiohttp.ClientPayloadError(f"{nome_do_arquivo(url)}: {tamanho} de {total} bytes recebidos")
+            return tamanho, sha.hexdigest()
+
+        try:
+            tamanho, sha256 = await self._requisitar(url, gravar, cabecalhos)
+        except aiohttp.ClientResponseError as e:
+            # 416: o .part não corresponde mais ao arquivo do servidor; recomeça do zero
+            if e.status != 416 or not parcial.exists():
+                raise
+            parcial.unlink()
+            tamanho, sha256 = await self._requisitar(url, gravar, cabecalhos)
+
+        if sha256_esperado and sha256 != sha256_esperado.lower():
+            parcial.unlink()
+            raise ValueError(f"❌ SHA-256 divergente para {url}: esperado {sha256_esperado}, obtido {sha256}")
+
+        os.replace(parcial, destino)
+        manifesto.update(
+            tamanho=tamanho,
+            sha256=sha256,
+            completo=True,
+            baixado_em=datetime.now().isoformat(timespec="seconds"),
+        )
+        gravar_manifesto(destino, manifesto)
+        return destino
+
+    async def baixar_varios(self, itens: list[tuple[str, Path]]) -> list[Path | BaseException]:
+        """
+        Baixa vários arquivos ao mesmo tempo (respeitando os limites do pool).
+
+        Args:
+            itens (list[tuple[str, Path]]): Pares (url, destino).
+
+        Returns:
+            list: Destino de cada download, ou a exceção que o interrompeu, na ordem de `itens`.
+        """
+        return await asyncio.gather(*(self.baixar(url, destino) for url, destino in itens), return_exceptions=True)
+
+
+def nome_do_arquivo(url: str) -> str:
+    """
+    Nome do arquivo no fim da URL (sem query string).
+    """
+    return os.path.basename(urlparse(url).path)
+
+
+def caminho_parcial(destino: Path) -> Path:
+    """
+    Arquivo temporário do download em andamento.
+    """
+    return destino.with_name(destino.name + ".part")
+
+
+def caminho_manifesto(destino: Path) -> Path:
+    """
+    Manifesto com URL, validadores HTTP, tamanho e SHA-256 do arquivo baixado.
+    """
+    return destino.with_name(destino.name + ".manifesto.json")
+
+
+def ler_manifesto(destino: Path) -> dict:
+    """
+    Lê o manifesto de um arquivo (vazio se não existir ou estiver corrompido).
+    """
+    try:
+        with open(caminho_manifesto(destino), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def gravar_manifesto(destino: Path, manifesto: dict) -> None:
+    """
+    Grava o manifesto de forma atômica.
+    """
+    caminho = caminho_manifesto(destino)
+    temporario = caminho.with_suffix(".tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def hash_parcial(caminho: Path, tamanho_bloco: int = TAMANHO_BLOCO):
+    """
+    SHA-256 (ainda aberto para novos blocos) do que já foi gravado no `.part`.
+    """
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            sha.update(bloco)
+    return sha
+
+
+def arquivo_integro(destino: Path) -> bool:
+    """
+    Confere se o arquivo existe e bate com o tamanho e o SHA-256 do manifesto.
+    """
+    manifesto = ler_manifesto(destino)
+    if not manifesto.get("completo") or not destino.exists():
+        return False
+    if destino.stat().st_size != manifesto.get("tamanho"):
+        return False
+    return calcular_hash_arquivo(destino) == manifesto.get("sha256")
@@ -1,11 +1,19 @@
 import os
 import json
+import codecs
+import hashlib
 import unicodedata
 import difflib
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import logging
+import queue
+import threading
+from datetime import date
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 
 def setup_logger(name: str, console: bool = False) -> logging.Logger:
@@ -40,6 +48,98 @@ def setup_logger(name: str, console: bool = False) -> logging.Logger:
     return logger
 
 
+def calcular_hash_arquivo(caminho: Path, tamanho_bloco: int = 1024 * 1024) -> str:
+    """
+    Calcula o SHA-256 de um arquivo lendo em blocos (memória constante).
+
+    Args:
+        caminho (Path): Arquivo a ser lido.
+        tamanho_bloco (int): Bytes lidos por vez.
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+ENCODINGS_CSV = ("utf-8", "latin1")
+# Bytes de continuação do UTF-8 (0x80–0xBF): nunca iniciam um caractere
+CONTINUACAO_UTF8 = bytes(range(0x80, 0xC0))
+
+
+def detectar_encoding(caminho: Path, encodings: Iterable[str] = ENCODINGS_CSV, tamanho_amostra: int = 256 * 1024) -> str:
+    """
+    Detecta o encoding de um arquivo a partir de amostras do início, do meio e do fim.
+
+    Evita ler o arquivo inteiro só para descobrir, no final, que o encoding
+    estava errado. O primeiro encoding que decodifica todas as amostras vence.
+
+    Args:
+        caminho (Path): Arquivo de texto.
+        encodings (Iterable[str]): Candidatos, em ordem de preferência.
+        tamanho_amostra (int): Bytes lidos em cada ponto do arquivo.
+
+    Returns:
+        str: Encoding detectado (o último candidato, se nenhum decodificar tudo).
+    """
+    tamanho = Path(caminho).stat().st_size
+    amostras = []
+    with open(caminho, "rb") as f:
+        for inicio in sorted({0, max(0, tamanho // 2 - tamanho_amostra // 2), max(0, tamanho - tamanho_amostra)}):
+            f.seek(inicio)
+            amostra = f.read(tamanho_amostra)
+            if inicio:
+                # A amostra pode começar no meio de um caractere multibyte: começa na próxima linha
+                quebra = amostra.find(b"\n")
+                amostra = amostra[quebra + 1:] if quebra >= 0 else amostra.lstrip(CONTINUACAO_UTF8)
+            amostras.append(amostra)
+
+    encodings = list(encodings)
+    for encoding in encodings:
+        try:
+            for amostra in amostras:
+                # Decodificador incremental: tolera um caractere multibyte cortado no fim da amostra
+                decodificador = codecs.getincrementaldecoder(encoding)()
+                decodificador.decode(amostra, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return encodings[-1]
+
+
+def ler_em_segundo_plano(iterador: Iterable, tamanho_fila: int = 1) -> Iterator:
+    """
+    Consome um iterador em uma thread, mantendo até `tamanho_fila` itens prontos.
+
+    Usado para ler/parsear o próximo chunk enquanto o atual é enviado ao banco.
+    Exceções do iterador são repassadas a quem consome.
+    """
+    fila: queue.Queue = queue.Queue(maxsize=tamanho_fila)
+    fim = object()
+
+    def produzir():
+        try:
+            for item in iterador:
+                fila.put((item, None))
+        except BaseException as e:
+            fila.put((None, e))
+            return
+        fila.put((fim, None))
+
+    threading.Thread(target=produzir, daemon=True).start()
+    while True:
+        item, erro = fila.get()
+        if erro is not None:
+            raise erro
+        if item is fim:
+            return
+        yield item
+
+
 def normalizar_texto(texto: str) -> str:
     """
     Remove acentuação e converte para ASCII plano.
@@ -57,6 +157,37 @@ def normalizar_texto(texto: str) -> str:
     return texto.encode("ascii", "ignore").decode("utf-8").strip().lower()
 
 
+def normalizar_serie(serie: pd.Series) -> pd.Series:
+    """
+    Aplica `normalizar_texto` a uma coluna inteira, normalizando cada valor distinto uma vez.
+
+    Os valores são fatorados, os distintos passam pelas operações vetorizadas
+    de `.str` (NFKD → ASCII → strip → lower) e o resultado é redistribuído
+    pelos códigos. Valores que não são texto (inclusive nulos) ficam intactos.
+
+    Args:
+        serie (pd.Series): Coluna original.
+
+    Returns:
+        pd.Series: Coluna normalizada, com o mesmo índice e nome.
+    """
+    valores = serie.to_numpy(dtype=object)
+    codigos, distintos = pd.factorize(valores)
+    if not len(distintos):
+        return serie
+    distintos = pd.Series(distintos, dtype=object)
+    textos = distintos.map(lambda v: isinstance(v, str))
+    normalizados = distintos.copy()
+    normalizados[textos] = (
+        distintos[textos].str.normalize("NFKD")
+        .str.encode("ascii", "ignore").str.decode("ascii")
+        .str.strip().str.lower()
+    )
+    # Código -1 indica valor nulo: mantém o original
+    resultado = np.where(codigos >= 0, normalizados.to_numpy(dtype=object).take(np.maximum(codigos, 0)), valores)
+    return pd.Series(resultado, index=serie.index, name=serie.name, dtype=object)
+
+
 def normalizar_nome_coluna(nome: str) -> str:
     """
     Normaliza nome de coluna para fins de comparação:
@@ -121,15 +252,40 @@ def mapear_tipo(tipo: str, tamanho) -> str:
     return "VARCHAR(255)"
 
 
-def gerar_create_table(df: pd.DataFrame, nome_tabela: str) -> str:
+# Nomes de colunas do CSV/dicionário da ANS padronizados no banco
+ALIASES_COLUNAS_OPERADORAS = {"registro_ans": "registro_operadora"}
+
+
+def normalizar_nome_coluna_sql(nome: str, aliases: dict[str, str] | None = None) -> str:
+    """
+    Nome de coluna usado no banco: sem acentos, minúsculo, com underscores e com os aliases aplicados.
+    """
+    nome_coluna = normalizar_texto(str(nome)).replace(" ", "_")
+    return (aliases or {}).get(nome_coluna, nome_coluna)
+
+
+def gerar_create_table(
+    df: pd.DataFrame,
+    nome_tabela: str,
+    chave_primaria: str | None = None,
+    aliases: dict[str, str] | None = None,
+    tipos_inferidos: dict[str, str] | None = None,
+    coluna_ordem: str | None = None,
+) -> str:
     """
     Gera a instrução SQL para criação de uma tabela com base no dicionário de dados.
 
     As colunas do dicionário são localizadas automaticamente, considerando variações.
+    Tipos inferidos dos dados (ver `scripts.inferir_esquema`) têm prioridade sobre o dicionário.
 
     Args:
         df (pd.DataFrame): Dicionário.
         nome_tabela (str): Nome da tabela.
+        chave_primaria (str | None): Coluna da chave primária (já com alias aplicado).
+        aliases (dict[str, str] | None): Renomeações de colunas (ex.: registro_ans -> registro_operadora).
+        tipos_inferidos (dict[str, str] | None): Tipo SQL por coluna, observado nos CSVs.
+        coluna_ordem (str | None): Coluna extra com a posição da linha no CSV (ordem do arquivo),
+            já que a chave primária reordena a tabela.
 
     Returns:
         str: Comando SQL completo.
@@ -138,18 +294,55 @@ def gerar_create_table(df: pd.DataFrame, nome_tabela: str) -> str:
     coluna_tipo = localizar_coluna(df, "tipo")
     coluna_tamanho = localizar_coluna(df, "tamanho")
 
+    tipos_inferidos = tipos_inferidos or {}
     colunas_sql = []
-    for _, row in df.iterrows():
+    for nome, tipo_str, tamanho in zip(df[coluna_nome], df[coluna_tipo].astype(str), df[coluna_tamanho]):
         # Normaliza o nome da coluna para uso no SQL (mantendo underscores para separação)
-        nome_coluna = normalizar_texto(str(row[coluna_nome])).replace(" ", "_")
-        tipo_str = str(row[coluna_tipo])
-        tamanho = row.get(coluna_tamanho, None)
-        tipo_sql = mapear_tipo(tipo_str, tamanho)
+        nome_coluna = normalizar_nome_coluna_sql(nome, aliases)
+        tipo_sql = tipos_inferidos.get(nome_coluna) or mapear_tipo(tipo_str, tamanho)
+        if nome_coluna == chave_primaria:
+            tipo_sql += " NOT NULL"
         colunas_sql.append(f"  `{nome_coluna}` {tipo_sql}")
+    if coluna_ordem:
+        colunas_sql.append(f"  `{coluna_ordem}` INT UNSIGNED NOT NULL")
+    if chave_primaria:
+        colunas_sql.append(f"  PRIMARY KEY (`{chave_primaria}`)")
+    if coluna_ordem:
+        colunas_sql.append(f"  UNIQUE KEY `idx_{coluna_ordem}` (`{coluna_ordem}`)")
     colunas_sql_str = ",\n".join(colunas_sql)
     return f"CREATE TABLE `{nome_tabela}` (\n{colunas_sql_str}\n);"
 
 
+# Posição da linha no Relatorio_cadop.csv: a busca 'contem' do MySQL devolve na ordem do arquivo, como a do CSV
+COLUNA_ORDEM_OPERADORAS = "ordem_arquivo"
+
+# Índices FULLTEXT usados pela busca de operadoras da API (parser ngram, sem depender de espaços)
+INDICES_FULLTEXT_OPERADORAS = {
+    "ft_razao_social": ["razao_social"],
+    "ft_razao_social_nome_fantasia": ["razao_social", "nome_fantasia"],
+}
+
+
+def gerar_indices_fulltext(nome_tabela: str, indices: dict[str, list[str]]) -> str:
+    """
+    Gera as instruções SQL de criação de índices FULLTEXT com o parser ngram.
+
+    Args:
+        nome_tabela (str): Nome da tabela.
+        indices (dict[str, list[str]]): Nome do índice -> colunas indexadas.
+
+    Returns:
+        str: Comandos SQL, um por linha.
+    """
+    comandos = []
+    for nome_indice, colunas in indices.items():
+        colunas_str = ", ".join(f"`{col}`" for col in colunas)
+        comandos.append(
+            f"CREATE FULLTEXT INDEX `{nome_indice}` ON `{nome_tabela}` ({colunas_str}) WITH PARSER ngram;"
+        )
+    return "\n".join(comandos)
+
+
 def verificar_diferencas(colunas_dic: set, colunas_csv: set) -> tuple[set, set]:
     """
     Compara as colunas (normalizadas) do dicionário e do CSV.
@@ -166,21 +359,187 @@ def verificar_diferencas(colunas_dic: set, colunas_csv: set) -> tuple[set, set]:
     return faltando_no_csv, extras_no_csv
 
 
-def substituir_siglas(df: pd.DataFrame) -> pd.DataFrame:
+SIGLAS_OD_AMB = {
+    "OD": "Seg. Odontológica",
+    "AMB": "Seg. Ambulatorial"
+}
+
+
+def substituir_siglas(df: pd.DataFrame, colunas: list[str] | None = None) -> pd.DataFrame:
     """
-    Substitui as siglas 'OD' e 'AMB' pelas descrições completas
-    em todas as colunas que contenham esses valores.
+    Substitui as siglas 'OD' e 'AMB' pelas descrições completas nas colunas de segmentação.
+
+    Só células cujo valor (sem espaços nas pontas) é exatamente a sigla são trocadas,
+    então textos como "ODONTOLOGIA" ficam intactos. A troca é feita por código:
+    cada valor distinto da coluna é traduzido uma vez e o resultado é redistribuído.
+
+    Args:
+        df (pd.DataFrame): Tabela do Rol.
+        colunas (list[str] | None): Colunas de segmentação. Se None, usa as colunas
+            cujo cabeçalho é a própria sigla (OD, AMB).
+
+    Returns:
+        pd.DataFrame: O mesmo DataFrame, com as siglas substituídas.
     """
-    SIGLAS_OD_AMB = {
-        "OD": "Seg. Odontológica",
-        "AMB": "Seg. Ambulatorial"
-    }
-    # Para cada coluna do DataFrame, se for do tipo objeto (texto), realiza a substituição
-    for col in df.select_dtypes(include=["object"]).columns:
-        df[col] = df[col].replace(SIGLAS_OD_AMB, regex=True)
+    if colunas is None:
+        siglas = {normalizar_nome_coluna(sigla) for sigla in SIGLAS_OD_AMB}
+        colunas = [col for col in df.columns if normalizar_nome_coluna(str(col)) in siglas]
+
+    for col in colunas:
+        if col not in df.columns:
+            continue
+        valores = df[col].to_numpy(dtype=object)
+        codigos, distintos = pd.factorize(valores)
+        if not len(distintos):
+            continue
+        traduzidos = np.array(
+            [SIGLAS_OD_AMB.get(v.strip(), v) if isinstance(v, str) else v for v in distintos],
+            dtype=object,
+        )
+        # Código -1 indica valor nulo: mantém o original
+        df[col] = np.where(codigos >= 0, traduzidos.take(np.maximum(codigos, 0)), valores)
     return df
 
 
+# Tipos das colunas de despesas contábeis (nomes já normalizados com `normalizar_texto`)
+ESQUEMA_DESPESAS = pa.schema([
+    ("data", pa.date32()),
+    ("registro_operadora", pa.int32()),
+    ("cd_conta_contabil", pa.int64()),
+    ("descricao", pa.string()),
+    ("vl_saldo_inicial", pa.decimal128(20, 2)),
+    ("vl_saldo_final", pa.decimal128(20, 2)),
+])
+
+
+def converter_datas(serie: pd.Series) -> pd.Series:
+    """
+    Converte datas nos formatos 'aaaa-mm-dd' e 'dd/mm/aaaa' (usados pela ANS) em datetime.
+    Valores não reconhecidos viram NaT.
+    """
+    texto = serie.astype("string").str.strip().str.slice(0, 10)
+    datas = pd.to_datetime(texto, format="%Y-%m-%d", errors="coerce")
+    faltando = datas.isna() & texto.notna()
+    if faltando.any():
+        datas[faltando] = pd.to_datetime(texto[faltando], format="%d/%m/%Y", errors="coerce")
+    return datas
+
+
+def converter_decimais(serie: pd.Series, tipo: pa.DataType) -> pa.Array:
+    """
+    Converte saldos com vírgula decimal ('1234,56') em um array decimal do Arrow.
+    """
+    texto = serie.astype("string").str.strip().str.replace(",", ".", regex=False)
+    texto = texto.mask(texto.isin(["", "nan"]))
+    return pc.cast(pa.array(texto, type=pa.string(), from_pandas=True), tipo)
+
+
+def tipar_despesas(df: pd.DataFrame) -> pa.Table:
+    """
+    Converte um bloco de despesas (como sai da consolidação, tudo em texto) em uma tabela Arrow tipada.
+
+    Colunas fora de ESQUEMA_DESPESAS são descartadas e as que faltarem ficam nulas.
+    As colunas `ano` e `trimestre` são derivadas de `data` para o particionamento.
+
+    Args:
+        df (pd.DataFrame): Bloco com as colunas do CSV consolidado.
+
+    Returns:
+        pa.Table: Tabela com ESQUEMA_DESPESAS + ano/trimestre.
+    """
+    df = df.rename(columns={col: normalizar_texto(col) for col in df.columns})
+    colunas = []
+    for campo in ESQUEMA_DESPESAS:
+        if campo.name not in df.columns:
+            colunas.append(pa.nulls(len(df), type=campo.type))
+            continue
+        serie = df[campo.name]
+        if pa.types.is_date(campo.type):
+            datas = converter_datas(serie)
+            colunas.append(pa.array(datas.dt.date, type=campo.type, from_pandas=True))
+        elif pa.types.is_integer(campo.type):
+            numeros = pd.to_numeric(serie, errors="coerce").astype("Int64")
+            colunas.append(pa.array(numeros, type=pa.int64(), from_pandas=True).cast(campo.type))
+        elif pa.types.is_decimal(campo.type):
+            colunas.append(converter_decimais(serie, campo.type))
+        else:
+            colunas.append(pa.array(serie.astype("string"), type=campo.type, from_pandas=True))
+
+    tabela = pa.Table.from_arrays(colunas, schema=ESQUEMA_DESPESAS)
+    datas = pd.to_datetime(tabela.column("data").to_pandas())
+    ano = pa.array(datas.dt.year.astype("Int16"), type=pa.int16(), from_pandas=True)
+    trimestre = pa.array(datas.dt.quarter.astype("Int8"), type=pa.int8(), from_pandas=True)
+    return tabela.append_column("ano", ano).append_column("trimestre", trimestre)
+
+
+# Tipos SQL da tabela de fatos (mesma ordem de ESQUEMA_DESPESAS)
+COLUNAS_SQL_DESPESAS = {
+    "data": "DATE NOT NULL",
+    "registro_operadora": "MEDIUMINT UNSIGNED NOT NULL",
+    "cd_conta_contabil": "INT UNSIGNED NOT NULL",
+    "descricao": "VARCHAR(255) NULL",
+    "vl_saldo_inicial": "DECIMAL(20,2) NULL",
+    "vl_saldo_final": "DECIMAL(20,2) NULL",
+}
+CHAVE_PRIMARIA_DESPESAS = ["data", "registro_operadora", "cd_conta_contabil"]
+INDICES_DESPESAS = {
+    "idx_operadora_data": ["registro_operadora", "data"],
+    "idx_conta_data": ["cd_conta_contabil", "data"],
+}
+
+
+def limites_trimestre(ano: int, trimestre: int) -> tuple[date, date]:
+    """
+    Intervalo [início, fim) de datas de um trimestre, para filtros por faixa em `data`.
+    """
+    inicio = date(ano, 3 * (trimestre - 1) + 1, 1)
+    fim = date(ano + 1, 1, 1) if trimestre == 4 else date(ano, 3 * trimestre + 1, 1)
+    return inicio, fim
+
+
+def anos_particoes_despesas(parquet_dir: Path, anos_retroativos: int) -> list[int]:
+    """
+    Anos com partição própria na tabela de fatos: os anos baixados (DEMO_ANOS_RETROATIVOS),
+    o ano atual e os que já existirem no Parquet de processar_despesas.
+    """
+    from datetime import datetime
+
+    ano_atual = datetime.now().year
+    anos = set(range(ano_atual - anos_retroativos, ano_atual + 1))
+    for pasta in Path(parquet_dir).glob("ano=*"):
+        ano = pasta.name.split("=", 1)[1]
+        if ano.isdigit():
+            anos.add(int(ano))
+    return sorted(anos)
+
+
+def gerar_ddl_despesas(nome_tabela: str, anos: Iterable[int]) -> str:
+    """
+    Gera o CREATE TABLE da tabela de fatos de despesas, tipado, indexado e particionado por ano.
+
+    A chave primária (data, operadora, conta) inclui a coluna de particionamento,
+    como o MySQL exige; anos além dos informados caem na partição `pmax`.
+
+    Args:
+        nome_tabela (str): Nome da tabela.
+        anos (Iterable[int]): Anos que ganham partição própria.
+
+    Returns:
+        str: Comando SQL completo.
+    """
+    linhas = [f"  `{coluna}` {tipo}" for coluna, tipo in COLUNAS_SQL_DESPESAS.items()]
+    linhas.append(f"  PRIMARY KEY ({', '.join(f'`{col}`' for col in CHAVE_PRIMARIA_DESPESAS)})")
+    for nome_indice, colunas in INDICES_DESPESAS.items():
+        linhas.append(f"  KEY `{nome_indice}` ({', '.join(f'`{col}`' for col in colunas)})")
+    particoes = [f"  PARTITION p{ano} VALUES LESS THAN ({ano + 1})" for ano in sorted(set(anos))]
+    particoes.append("  PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return (
+        f"CREATE TABLE IF NOT EXISTS `{nome_tabela}` (\n" + ",\n".join(linhas) + "\n)"
+        " ENGINE=InnoDB DEFAULT CHARSET=utf8mb4\n"
+        "PARTITION BY RANGE (YEAR(`data`)) (\n" + ",\n".join(particoes) + "\n);"
+    )
+
+
 def exportar_log_diferencas(path: str, faltando: set, extras: set, alias_map: dict):
     """
     Gera um log detalhado das diferenças entre o dicionário e o CSV.
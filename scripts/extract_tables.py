@@ -3,15 +3,20 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 import os
+import argparse
 import logging
+import pickle
+import tempfile
 import zipfile
 import pdfplumber
 import pandas as pd
 
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import Iterable, Iterator
 from scripts.etl_utils import substituir_siglas
-from scripts.scan_pdf_tables import detectar_paginas_com_tabelas
+from scripts.scan_pdf_tables import TABLE_SETTINGS, tabela_valida, varrer_paginas_em_paralelo
+from scripts.cache_paginas import aplicar_limite_cache, configurar_cache
 
 
 
@@ -39,6 +44,15 @@ for d in [CSV_PATH.parent, LOG_PATH.parent, ZIP_OUT.parent]:
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# === PARALELISMO (processos que extraem páginas ao mesmo tempo) ===
+WORKERS = int(os.getenv("ETAPA2_WORKERS") or min(4, os.cpu_count() or 1))
+
+# === COLUNAS COM SIGLAS OD/AMB (vazio = detectar pelo cabeçalho) ===
+COLUNAS_SIGLAS = [col.strip() for col in os.getenv("ETAPA2_COLUNAS_SIGLAS", "").split(",") if col.strip()] or None
+
+# === STREAMING (grava página a página no CSV/ZIP, com memória constante) ===
+STREAMING = os.getenv("ETAPA2_STREAMING", "false").lower() in ("1", "true", "sim")
+
 def extrair_zip_anexos(zip_path: Path, destino: Path) -> None:
     """
     Extrai os arquivos de um ZIP para o diretório de destino.
@@ -53,45 +67,81 @@ def extrair_zip_anexos(zip_path: Path, destino: Path) -> None:
         zipf.extractall(destino)
     logging.info(f"📂 Arquivos extraídos de {zip_path.name} para {destino}")
 
-def extrair_tabelas_do_pdf(pdf_path: Path, paginas_validas: list[int]) -> tuple[list[pd.DataFrame], list[int]]:
+def montar_dataframe(table: list[list], pagina: int) -> pd.DataFrame:
+    """
+    Converte a tabela extraída de uma página em DataFrame, com cabeçalho limpo e coluna de página.
+
+    Args:
+        table (list[list]): Linhas retornadas por `extract_table()`, a primeira é o cabeçalho.
+        pagina (int): Número da página de origem.
+
+    Returns:
+        pd.DataFrame: Tabela da página.
+    """
+    df = pd.DataFrame(table[1:], columns=table[0])
+    # Deduplicação segura de colunas
+    seen: dict[str, int] = {}
+    new_cols: list[str] = []
+    for col in df.columns:
+        if col not in seen:
+            seen[col] = 1
+            new_cols.append(col)
+        else:
+            seen[col] += 1
+            new_cols.append(f"{col}_{seen[col]}")
+    df.columns = [col.replace('\n', ' ').strip() for col in new_cols]
+    df["pagina"] = pagina
+    return df
+
+def iterar_tabelas_em_passada_unica(
+    pdf_path: Path, workers: int, falhas: list[int], paginas_validas: list[int], cache: dict | None = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Gera, página a página, as tabelas detectadas e extraídas em uma única varredura.
+
+    As páginas válidas e as que falharam são acrescentadas às listas recebidas
+    conforme a varredura avança.
     """
-    Extrai tabelas de um PDF das páginas especificadas.
+    for i, table, erro in varrer_paginas_em_paralelo(pdf_path, workers=workers, cache=cache):
+        if erro is not None:
+            logging.warning(f"Erro na página {i}: {erro}")
+            continue
+        if not tabela_valida(table):
+            continue
+        paginas_validas.append(i)
+        try:
+            df = montar_dataframe(table, i)
+        except Exception as e:
+            falhas.append(i)
+            logging.warning(f"❌ Falha na página {i}: {e}")
+            continue
+        logging.debug(f"✅ Página {i} extraída")
+        yield df
+
+def extrair_tabelas_em_passada_unica(
+    pdf_path: Path, workers: int = 1, cache: dict | None = None
+) -> tuple[list[pd.DataFrame], list[int], list[int]]:
+    """
+    Detecta e extrai as tabelas do PDF percorrendo cada página uma única vez.
+
+    Equivale a `detectar_paginas_com_tabelas` seguido de um novo `extract_table()` em cada
+    página detectada, mas reaproveita a tabela lida na detecção em vez de extrair de novo.
 
     Args:
         pdf_path (Path): Caminho do arquivo PDF.
-        paginas_validas (list[int]): Lista de números de páginas que contêm tabelas.
+        workers (int): Processos usados na varredura (1 = sequencial).
+        cache (dict | None): Cache de páginas (`cache_paginas.configurar_cache`).
 
     Returns:
         tuple: Uma tupla contendo:
             - Uma lista de DataFrames com as tabelas extraídas.
             - Uma lista de páginas que falharam na extração.
+            - Uma lista de páginas detectadas com tabela.
     """
-    tabelas: list[pd.DataFrame] = []
     falhas: list[int] = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for i in paginas_validas:
-            try:
-                table = pdf.pages[i - 1].extract_table()
-                if table:
-                    df = pd.DataFrame(table[1:], columns=table[0])
-                    # Deduplicação segura de colunas
-                    seen: dict[str, int] = {}
-                    new_cols: list[str] = []
-                    for col in df.columns:
-                        if col not in seen:
-                            seen[col] = 1
-                            new_cols.append(col)
-                        else:
-                            seen[col] += 1
-                            new_cols.append(f"{col}_{seen[col]}")
-                    df.columns = [col.replace('\n', ' ').strip() for col in new_cols]
-                    df["pagina"] = i
-                    tabelas.append(df)
-                    logging.debug(f"✅ Página {i} extraída")
-            except Exception as e:
-                falhas.append(i)
-                logging.warning(f"❌ Falha na página {i}: {e}")
-    return tabelas, falhas
+    paginas_validas: list[int] = []
+    tabelas = list(iterar_tabelas_em_passada_unica(pdf_path, workers, falhas, paginas_validas, cache))
+    return tabelas, falhas, paginas_validas
 
 def exportar_csv_e_zip(tabelas: list[pd.DataFrame]) -> None:
     """
@@ -104,13 +154,53 @@ def exportar_csv_e_zip(tabelas: list[pd.DataFrame]) -> None:
         logging.warning("⚠️ Nenhuma tabela válida para exportar.")
         return
     df_final = pd.concat(tabelas, ignore_index=True)
-    df_final = substituir_siglas(df_final)
+    df_final = substituir_siglas(df_final, COLUNAS_SIGLAS)
     df_final.to_csv(CSV_PATH, index=False)
     with zipfile.ZipFile(ZIP_OUT, "w") as zipf:
         zipf.write(CSV_PATH, arcname=CSV_PATH.name)
     logging.info(f"📦 CSV exportado para: {CSV_PATH}")
     logging.info(f"🗜️ ZIP gerado em: {ZIP_OUT}")
 
+def exportar_csv_e_zip_streaming(tabelas: Iterable[pd.DataFrame]) -> int:
+    """
+    Grava o CSV e o ZIP sem concatenar todas as tabelas em memória.
+
+    Cada tabela vai para um arquivo temporário assim que chega; o cabeçalho é a
+    união das colunas na ordem em que aparecem, como no `pd.concat` de `exportar_csv_e_zip`.
+    No fim, as tabelas são relidas uma a uma e gravadas com o cabeçalho completo
+    (colunas ausentes em uma página saem vazias), então o CSV é o mesmo do modo sem streaming.
+
+    Args:
+        tabelas (Iterable[pd.DataFrame]): Tabelas por página, na ordem de saída.
+
+    Returns:
+        int: Quantidade de tabelas exportadas.
+    """
+    colunas: list[str] = []
+    exportadas = 0
+    with tempfile.TemporaryFile(dir=CSV_PATH.parent) as temporario:
+        for df in tabelas:
+            colunas.extend(col for col in df.columns if col not in colunas)
+            pickle.dump(df, temporario, protocol=pickle.HIGHEST_PROTOCOL)
+            exportadas += 1
+
+        if not exportadas:
+            logging.warning("⚠️ Nenhuma tabela válida para exportar.")
+            return 0
+
+        temporario.seek(0)
+        with open(CSV_PATH, "w", encoding="utf-8", newline="") as csv_file, zipfile.ZipFile(ZIP_OUT, "w") as zipf:
+            with zipf.open(CSV_PATH.name, "w", force_zip64=True) as membro:
+                for i in range(exportadas):
+                    df = substituir_siglas(pickle.load(temporario).reindex(columns=colunas), COLUNAS_SIGLAS)
+                    texto = df.to_csv(index=False, header=i == 0)
+                    csv_file.write(texto)
+                    membro.write(texto.encode("utf-8"))
+
+    logging.info(f"📦 CSV exportado para: {CSV_PATH}")
+    logging.info(f"🗜️ ZIP gerado em: {ZIP_OUT}")
+    return exportadas
+
 def salvar_log_falhas(falhas: list[int]) -> None:
     """
     Salva as páginas que falharam na extração em um arquivo de log.
@@ -128,19 +218,41 @@ def main() -> None:
     """
     Função principal que orquestra o processo de extração e exportação.
     """
+    parser = argparse.ArgumentParser(description="Etapa 2 - Extração das tabelas do Anexo I.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Processos usados na extração das páginas (1 = sequencial).")
+    parser.add_argument("--streaming", action="store_true", default=STREAMING, help="Grava cada página no CSV/ZIP assim que é extraída (memória constante).")
+    parser.add_argument("--no-cache", action="store_true", help="Ignora o cache de páginas e extrai o PDF inteiro de novo.")
+    args = parser.parse_args()
+
     extrair_zip_anexos(ZIP_PATH, ANEXO_DIR)
     if not PDF_PATH.exists():
         logging.error(f"❌ PDF não encontrado: {PDF_PATH}")
         return
-    paginas_validas = detectar_paginas_com_tabelas(PDF_PATH)
-    if not paginas_validas:
-        logging.warning("❌ Nenhuma tabela detectada. Encerrando.")
-        return
-    logging.info(f"📖 Detectadas {len(paginas_validas)} páginas com tabelas.")
-    tabelas, falhas = extrair_tabelas_do_pdf(PDF_PATH, paginas_validas)
-    exportar_csv_e_zip(tabelas)
+    logging.info(f"⚙️ Extraindo páginas com {args.workers} processo(s).")
+    cache = None if args.no_cache else configurar_cache(PDF_PATH, TABLE_SETTINGS)
+
+    if args.streaming:
+        falhas: list[int] = []
+        paginas_validas: list[int] = []
+        tabelas = iterar_tabelas_em_passada_unica(PDF_PATH, args.workers, falhas, paginas_validas, cache)
+        total_tabelas = exportar_csv_e_zip_streaming(tabelas)
+        if not paginas_validas:
+            logging.warning("❌ Nenhuma tabela detectada. Encerrando.")
+            return
+        logging.info(f"📖 Detectadas {len(paginas_validas)} páginas com tabelas.")
+    else:
+        tabelas, falhas, paginas_validas = extrair_tabelas_em_passada_unica(PDF_PATH, workers=args.workers, cache=cache)
+        if not paginas_validas:
+            logging.warning("❌ Nenhuma tabela detectada. Encerrando.")
+            return
+        logging.info(f"📖 Detectadas {len(paginas_validas)} páginas com tabelas.")
+        exportar_csv_e_zip(tabelas)
+        total_tabelas = len(tabelas)
+
     salvar_log_falhas(falhas)
-    logging.info(f"✅ Tabelas extraídas: {len(tabelas)} / Falhas: {len(falhas)}")
+    if cache is not None:
+        aplicar_limite_cache()
+    logging.info(f"✅ Tabelas extraídas: {total_tabelas} / Falhas: {len(falhas)}")
 
 if __name__ == "__main__":
     main()
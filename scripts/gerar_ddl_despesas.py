@@ -0,0 +1,32 @@
+import os
+import logging
+from pathlib import Path
+from dotenv import load_dotenv
+
+from scripts.etl_utils import anos_particoes_despesas, gerar_ddl_despesas
+
+# === LOG CONFIG ===
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+load_dotenv()
+ANOS_RETROATIVOS = int(os.getenv("DEMO_ANOS_RETROATIVOS", 2))
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+ARQUIVO_SQL_SAIDA = ROOT_DIR / "output" / "sql" / "fatos_despesas.sql"
+PARQUET_DIR = ROOT_DIR / "output" / "parquet" / "despesas"
+NOME_TABELA = "fato_despesas_contabeis"
+
+
+def main():
+    logging.info("🚀 Gerando DDL da tabela de fatos de despesas...")
+    sql = gerar_ddl_despesas(NOME_TABELA, anos_particoes_despesas(PARQUET_DIR, ANOS_RETROATIVOS))
+
+    ARQUIVO_SQL_SAIDA.parent.mkdir(parents=True, exist_ok=True)
+    with open(ARQUIVO_SQL_SAIDA, "w", encoding="utf-8") as f:
+        f.write(sql)
+
+    logging.info(f"📜 Script SQL salvo em: {ARQUIVO_SQL_SAIDA}")
+
+
+if __name__ == "__main__":
+    main()
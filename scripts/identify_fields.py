@@ -5,11 +5,17 @@ from pathlib import Path
 import pandas as pd
 
 from scripts.etl_utils import (
+    detectar_encoding,
     normalizar_texto,
     gerar_create_table,
+    gerar_indices_fulltext,
+    INDICES_FULLTEXT_OPERADORAS,
+    COLUNA_ORDEM_OPERADORAS,
+    ALIASES_COLUNAS_OPERADORAS,
     verificar_diferencas,
     exportar_log_diferencas
 )
+from scripts.inferir_esquema import perfilar_csv, salvar_perfil, tipos_sql
 
 def detectar_inicio_tabela(path: Path) -> pd.DataFrame:
     """Tenta identificar automaticamente a primeira linha da tabela no dicionário de dados."""
@@ -39,6 +45,8 @@ CAMINHO_CSV = INPUT_DIR / "Relatorio_cadop.csv"
 
 LOG_PATH = LOG_DIR / "diff_log.txt"
 ARQUIVO_SQL_SAIDA = SQL_DIR / "scripts.sql"
+ARQUIVO_PERFIL = SQL_DIR / "perfil_colunas.json"
+ARQUIVO_TRUNCAMENTOS = SQL_DIR / "truncamentos.json"
 
 # === GARANTIR DIRETÓRIOS DE SAÍDA ===
 for d in [LOG_DIR, SQL_DIR]:
@@ -54,7 +62,8 @@ def main():
     logging.info("🚀 Iniciando identificação de campos...")
 
     df_dic = detectar_inicio_tabela(CAMINHO_DICIONARIO)
-    df_csv = pd.read_csv(CAMINHO_CSV, encoding="latin1", sep=";")
+    # Só o cabeçalho: os dados são lidos em chunks pelo perfilador
+    df_csv = pd.read_csv(CAMINHO_CSV, encoding=detectar_encoding(CAMINHO_CSV), sep=";", nrows=0)
 
     # === DETECÇÃO ROBUSTA DA COLUNA PRINCIPAL ===
     coluna_nome = next(
@@ -75,8 +84,20 @@ def main():
 
     logging.info(f"📄 Log de diferenças salvo em: {LOG_PATH}")
 
+    # Tipos mais compactos observados nos dados + limites de truncamento para a importação
+    perfis = perfilar_csv(CAMINHO_CSV, aliases=ALIASES_COLUNAS_OPERADORAS)
+    salvar_perfil(perfis, ARQUIVO_PERFIL, ARQUIVO_TRUNCAMENTOS)
+
     nome_tabela = "cadastro_operadoras"
-    sql = gerar_create_table(df_dic, nome_tabela)
+    sql = gerar_create_table(
+        df_dic,
+        nome_tabela,
+        chave_primaria="registro_operadora",
+        aliases=ALIASES_COLUNAS_OPERADORAS,
+        tipos_inferidos=tipos_sql(perfis),
+        coluna_ordem=COLUNA_ORDEM_OPERADORAS,
+    )
+    sql += "\n\n" + gerar_indices_fulltext(nome_tabela, INDICES_FULLTEXT_OPERADORAS)
 
     with open(ARQUIVO_SQL_SAIDA, "w", encoding="utf-8") as f:
         f.write(sql)
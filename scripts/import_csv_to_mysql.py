@@ -1,9 +1,17 @@
-
 import os
+import math
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from dotenv import load_dotenv
-from scripts.etl_utils import setup_logger, carregar_truncamentos_do_arquivo
+from scripts.etl_utils import (
+    setup_logger,
+    detectar_encoding,
+    carregar_truncamentos_do_arquivo,
+    normalizar_nome_coluna_sql,
+    ALIASES_COLUNAS_OPERADORAS,
+    COLUNA_ORDEM_OPERADORAS,
+)
+from scripts.inferir_esquema import FOLGA_VARCHAR
 from pathlib import Path
 from tqdm import tqdm
 
@@ -18,6 +26,102 @@ MYSQL_PORT = os.getenv("MYSQL_PORT")
 MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
 
 CSV_PATH = Path("input/Relatorio_cadop.csv")
+NOME_TABELA = "cadastro_operadoras"
+CHUNKSIZE = 10000
+
+
+def limites_de_tamanho(engine, truncamentos: dict) -> dict[str, int]:
+    """
+    Junta os limites do truncamentos.json com o tamanho das colunas VARCHAR/CHAR da tabela.
+    Prevalece o menor limite de cada coluna. Colunas ENUM ficam de fora: valor fora da lista
+    amplia a coluna em `ampliar_enums`, não é cortado.
+    """
+    limites = {coluna: int(tamanho) for coluna, tamanho in truncamentos.items()}
+    for coluna in inspect(engine).get_columns(NOME_TABELA):
+        if getattr(coluna["type"], "enums", None):
+            limites.pop(coluna["name"], None)
+            continue
+        tamanho = getattr(coluna["type"], "length", None)
+        if tamanho:
+            limites[coluna["name"]] = min(tamanho, limites.get(coluna["name"], tamanho))
+    return limites
+
+
+def limpar_colunas(df: pd.DataFrame, limites: dict[str, int]) -> pd.DataFrame:
+    """
+    Remove espaços das pontas e aplica os limites de tamanho, coluna a coluna (vetorizado).
+    Células vazias (ou só com espaços) viram NULL, como no perfil do `inferir_esquema`:
+    no modo estrito o MySQL recusa '' em colunas ENUM, DECIMAL e DATE.
+    """
+    for coluna in df.columns:
+        serie = df[coluna].str.strip()
+        serie = serie.mask(serie == "")
+        limite = limites.get(coluna)
+        if limite:
+            truncados = int((serie.str.len() > limite).sum())
+            if truncados:
+                logger.info(f"✂️ Truncando {truncados} valor(es) da coluna '{coluna}' para {limite} caracteres.")
+            serie = serie.str.slice(0, limite)
+        df[coluna] = serie
+    return df
+
+
+def converter_inteiros(df: pd.DataFrame, colunas: list[str]) -> pd.DataFrame:
+    """
+    Converte as colunas inteiras da tabela; valores não numéricos viram NULL em vez de abortar a carga.
+    """
+    for coluna in colunas:
+        convertida = pd.to_numeric(df[coluna], errors="coerce")
+        invalidos = int((convertida.isna() & df[coluna].notna()).sum())
+        if invalidos:
+            logger.warning(f"⚠️ {invalidos} valor(es) não numérico(s) na coluna '{coluna}' gravado(s) como NULL.")
+        df[coluna] = convertida.astype("Int64")
+    return df
+
+
+def valores_fora_do_enum(df: pd.DataFrame, enums: dict[str, list[str]]) -> dict[str, list[str]]:
+    """
+    Valores do CSV que não estão na lista do ENUM de cada coluna (o perfil pode não ter visto todos).
+    """
+    fora = {}
+    for coluna, valores in enums.items():
+        novos = df.loc[df[coluna].notna() & ~df[coluna].isin(valores), coluna].unique()
+        if len(novos):
+            fora[coluna] = sorted(novos)
+    return fora
+
+
+def sql_ampliar_enum(coluna: str, valores: list[str], nula: bool) -> str:
+    """
+    ALTER que troca um ENUM por VARCHAR com folga, cabendo os valores antigos e os novos.
+    """
+    tamanho = math.ceil(max(len(valor) for valor in valores) * (1 + FOLGA_VARCHAR))
+    return f"ALTER TABLE `{NOME_TABELA}` MODIFY `{coluna}` VARCHAR({tamanho}) {'NULL' if nula else 'NOT NULL'}"
+
+
+def ampliar_enums(engine, df: pd.DataFrame, colunas_banco: list[dict]) -> list[str]:
+    """
+    Converte para VARCHAR as colunas ENUM que receberiam valores fora da lista, em vez de perder esses valores.
+
+    O ALTER roda antes da carga: DDL faz commit implícito no MySQL e não pode ficar na transação dos INSERTs.
+
+    Returns:
+        list[str]: Colunas ampliadas.
+    """
+    enums = {
+        coluna["name"]: list(coluna["type"].enums) for coluna in colunas_banco
+        if coluna["name"] in df.columns and getattr(coluna["type"], "enums", None)
+    }
+    fora = valores_fora_do_enum(df, enums)
+    nulas = {coluna["name"]: coluna.get("nullable", True) for coluna in colunas_banco}
+    for coluna, novos in fora.items():
+        logger.warning(
+            f"⚠️ {len(novos)} valor(es) fora do ENUM da coluna '{coluna}' (ex.: {novos[:5]}): coluna ampliada para VARCHAR."
+        )
+        with engine.begin() as conexao:
+            conexao.execute(text(sql_ampliar_enum(coluna, enums[coluna] + novos, nulas[coluna])))
+    return list(fora)
+
 
 def importar_csv_para_mysql():
     if not CSV_PATH.exists():
@@ -27,52 +131,79 @@ def importar_csv_para_mysql():
     logger.info("🚀 Iniciando importação do CSV para o MySQL...")
 
     # Importar o CSV com todos os campos como texto
-    df = pd.read_csv(CSV_PATH, sep=";", encoding="utf-8", dtype=str)
-    logger.info(f"CSV lido com {df.shape[0]} linhas e {df.shape[1]} colunas.")
+    encoding = detectar_encoding(CSV_PATH)
+    df = pd.read_csv(CSV_PATH, sep=";", encoding=encoding, dtype=str)
+    logger.info(f"CSV lido ({encoding}) com {df.shape[0]} linhas e {df.shape[1]} colunas.")
 
-    # Normalizar colunas
-    df.columns = [col.lower().strip().replace(" ", "_") for col in df.columns]
-
-    # Renomear registro_ans para registro_operadora para manter padronização
-    if "registro_ans" in df.columns:
-        df = df.rename(columns={"registro_ans": "registro_operadora"})
-
-    # Garantir que todos os campos estejam como string e sem espaços
-    df = df.applymap(lambda x: str(x).strip() if pd.notnull(x) else x)
-
-    # Carregar truncamentos do arquivo JSON
-    try:
-        truncamentos = carregar_truncamentos_do_arquivo()
-    except Exception as e:
-        logger.warning(f"⚠️ Não foi possível carregar truncamentos: {e}")
-        truncamentos = {}
-
-    for coluna, tamanho in truncamentos.items():
-        if coluna in df.columns:
-            df[coluna] = df[coluna].astype(str).str.slice(0, tamanho)
-            logger.info(f"✂️ Truncando coluna '{coluna}' para {tamanho} caracteres.")
+    # Normalizar colunas com a mesma regra do DDL (registro_ans -> registro_operadora)
+    df.columns = [normalizar_nome_coluna_sql(col, ALIASES_COLUNAS_OPERADORAS) for col in df.columns]
 
     engine_str = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
     engine = create_engine(engine_str)
 
-    chunksize = 10000
-    total_rows = len(df)
-    total_chunks = (total_rows // chunksize) + int(total_rows % chunksize > 0)
-
-    for i in tqdm(range(total_chunks), desc="📤 Inserindo chunks"):
-        start = i * chunksize
-        end = min((i + 1) * chunksize, total_rows)
-        chunk = df.iloc[start:end]
-        logger.info(f"📦 Inserindo chunk {i + 1}/{total_chunks} ({start}:{end})")
-        chunk.to_sql(
-            "cadastro_operadoras",
-            con=engine,
-            if_exists="append" if i > 0 else "replace",
-            index=False,
-            method="multi"
-        )
-
-    logger.info("✅ CSV importado com sucesso para a tabela 'cadastro_operadoras'!")
+    try:
+        if not inspect(engine).has_table(NOME_TABELA):
+            logger.error(f"❌ Tabela '{NOME_TABELA}' não encontrada. Execute 'make etapa3-identify etapa3-db' antes.")
+            return
+
+        colunas_banco = inspect(engine).get_columns(NOME_TABELA)
+        colunas_tabela = [coluna["name"] for coluna in colunas_banco]
+        extras = [col for col in df.columns if col not in colunas_tabela]
+        if extras:
+            logger.warning(f"⚠️ Colunas do CSV fora da tabela ignoradas: {extras}")
+            df = df.drop(columns=extras)
+
+        # Carregar truncamentos do arquivo JSON
+        try:
+            truncamentos = carregar_truncamentos_do_arquivo()
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível carregar truncamentos: {e}")
+            truncamentos = {}
+
+        # Espaços e truncamentos na mesma passada, sem função Python por célula
+        df = limpar_colunas(df, limites_de_tamanho(engine, truncamentos))
+        # Posição no arquivo (a API do MySQL ordena a busca 'contem' por ela); depois da limpeza, que é só de texto
+        if COLUNA_ORDEM_OPERADORAS in colunas_tabela:
+            df[COLUNA_ORDEM_OPERADORAS] = range(1, len(df) + 1)
+        else:
+            logger.warning(f"⚠️ Tabela sem '{COLUNA_ORDEM_OPERADORAS}': a busca do MySQL não seguirá a ordem do arquivo.")
+        inteiros = [
+            coluna["name"] for coluna in colunas_banco
+            if coluna["name"] in df.columns and "INT" in str(coluna["type"]).upper()
+        ]
+        df = converter_inteiros(df, inteiros)
+        ampliar_enums(engine, df, colunas_banco)
+        # DECIMAL inferido pelo perfil aceita vírgula no CSV; o MySQL só aceita ponto
+        for coluna in colunas_banco:
+            if coluna["name"] in df.columns and str(coluna["type"]).upper().startswith(("DECIMAL", "NUMERIC")):
+                df[coluna["name"]] = df[coluna["name"]].str.replace(",", ".", regex=False)
+
+        total_rows = len(df)
+        total_chunks = (total_rows // CHUNKSIZE) + int(total_rows % CHUNKSIZE > 0)
+
+        # Esvazia e recarrega a tabela criada pelo scripts.sql: chave primária e índices FULLTEXT continuam lá.
+        # DELETE (e não TRUNCATE, que faz commit implícito) na mesma transação dos INSERTs:
+        # se um chunk falhar, o rollback devolve os dados anteriores
+        with engine.begin() as conexao:
+            conexao.execute(text(f"DELETE FROM `{NOME_TABELA}`"))
+            logger.info(f"🧹 Tabela '{NOME_TABELA}' esvaziada (confirmado só ao final da carga).")
+
+            for i in tqdm(range(total_chunks), desc="📤 Inserindo chunks"):
+                start = i * CHUNKSIZE
+                end = min((i + 1) * CHUNKSIZE, total_rows)
+                chunk = df.iloc[start:end]
+                logger.info(f"📦 Inserindo chunk {i + 1}/{total_chunks} ({start}:{end})")
+                chunk.to_sql(
+                    NOME_TABELA,
+                    con=conexao,
+                    if_exists="append",
+                    index=False,
+                    method="multi"
+                )
+
+        logger.info(f"✅ CSV importado com sucesso para a tabela '{NOME_TABELA}'!")
+    finally:
+        engine.dispose()
 
 def main():
     importar_csv_para_mysql()
@@ -1,10 +1,30 @@
 import os
+import re
+import sys
+import argparse
+import hashlib
 import psutil
+import tempfile
 import pandas as pd
-from sqlalchemy import create_engine
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow.dataset as ds
+from sqlalchemy import create_engine, inspect, text
 from pathlib import Path
 from dotenv import load_dotenv
-from scripts.etl_utils import normalizar_texto, setup_logger
+from typing import Iterator
+from scripts.etl_utils import (
+    CHAVE_PRIMARIA_DESPESAS,
+    ESQUEMA_DESPESAS,
+    anos_particoes_despesas,
+    calcular_hash_arquivo,
+    detectar_encoding,
+    gerar_ddl_despesas,
+    ler_em_segundo_plano,
+    limites_trimestre,
+    setup_logger,
+    tipar_despesas,
+)
 from tqdm import tqdm
 
 # === Carrega variáveis de ambiente e logger ===
@@ -18,6 +38,9 @@ MYSQL_PORT = os.getenv("MYSQL_PORT")
 MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
 
 CSV_CAMINHO = Path("output/csv/despesas_consolidadas.csv")
+PARQUET_CAMINHO = Path("output/parquet/despesas")
+ANOS_RETROATIVOS = int(os.getenv("DEMO_ANOS_RETROATIVOS", 2))
+TAMANHO_DESCRICAO = 255
 
 
 def calcular_chunksize():
@@ -36,62 +59,500 @@ def calcular_chunksize():
 
 CHUNKSIZE = int(os.getenv("CHUNKSIZE_IMPORT") or calcular_chunksize())
 
+TABELA_FATOS = "fato_despesas_contabeis"
+# A carga vai para a staging e só substitui a tabela de fatos (RENAME atômico) se a contagem bater
+TABELA_STAGING = f"{TABELA_FATOS}_staging"
+TABELA_ANTIGA = f"{TABELA_FATOS}_antiga"
+# Threads que enviam chunks ao mesmo tempo (cada uma com sua conexão do pool)
+WRITERS = max(1, int(os.getenv("DESPESAS_IMPORT_WRITERS") or 4))
 
-def tentar_leitura_csv(caminho: Path, sep=";", encodings=("utf-8", "latin1", "cp1252")) -> pd.DataFrame:
-    for enc in encodings:
-        try:
-            df = pd.read_csv(caminho, sep=sep, encoding=enc)
-            logger.info(f"📥 CSV lido com encoding: {enc}")
-            return df
-        except Exception as e:
-            logger.warning(f"⚠️  Falha com encoding {enc}: {e}")
-    raise ValueError(f"❌ Não foi possível ler o CSV {caminho} com os encodings testados.")
+# Modo incremental: só trimestres novos/alterados do Parquet são (re)carregados
+TABELA_CONTROLE_IMPORT = "controle_import_despesas"
+DDL_CONTROLE_IMPORT = f"""
+CREATE TABLE IF NOT EXISTS {TABELA_CONTROLE_IMPORT} (
+  ano SMALLINT NOT NULL,
+  trimestre TINYINT NOT NULL,
+  assinatura CHAR(64) NOT NULL,
+  qtd_linhas BIGINT NOT NULL,
+  atualizado_em DATETIME NOT NULL,
+  PRIMARY KEY (ano, trimestre)
+)
+"""
+MODO_INCREMENTAL = os.getenv("DESPESAS_IMPORT_INCREMENTAL", "false").lower() in ("1", "true", "sim")
+# Chave gravada no controle por versões antigas para a partição sem data; essas linhas
+# não entram na tabela de fatos (data é NOT NULL)
+TRIMESTRE_SEM_DATA = (0, 0)
+# "load_data" (LOAD DATA LOCAL INFILE, arquivos por chunk) ou "to_sql" (INSERTs multi-linha)
+METODO_IMPORTACAO = os.getenv("DESPESAS_IMPORT_METODO", "load_data").lower()
+if METODO_IMPORTACAO not in ("load_data", "to_sql"):
+    raise ValueError(f"❌ DESPESAS_IMPORT_METODO inválido: {METODO_IMPORTACAO} (use 'load_data' ou 'to_sql')")
+# Chaves duplicadas listadas no erro quando a contagem da staging não bate
+MAX_CHAVES_RELATADAS = 20
+# Aviso do MySQL para linha ignorada por chave repetida (LOAD DATA LOCAL implica IGNORE)
+CODIGO_CHAVE_DUPLICADA = 1062
+PADRAO_CHAVE_DUPLICADA = re.compile(r"Duplicate entry '(.*)' for key")
+
+
+def preparar_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajusta um chunk tipado à tabela de fatos: descarta linhas sem chave (data, operadora
+    ou conta nulas) e limita a descrição ao tamanho da coluna.
+    """
+    sem_chave = chunk[CHAVE_PRIMARIA_DESPESAS].isna().any(axis=1)
+    if sem_chave.any():
+        logger.warning(f"⚠️ {int(sem_chave.sum())} linha(s) sem data, operadora ou conta descartada(s).")
+        chunk = chunk[~sem_chave]
+    chunk = chunk.copy()
+    chunk["descricao"] = chunk["descricao"].str.slice(0, TAMANHO_DESCRICAO)
+    return chunk
+
+
+def ler_csv_em_chunks(caminho: Path, sep=";") -> Iterator[pd.DataFrame]:
+    """
+    Lê o CSV consolidado em chunks de CHUNKSIZE linhas, com o encoding detectado por amostragem,
+    e converte cada chunk para os tipos da tabela de fatos.
+    """
+    encoding = detectar_encoding(caminho)
+    logger.info(f"📥 Lendo CSV com encoding: {encoding}")
+    with pd.read_csv(caminho, sep=sep, encoding=encoding, chunksize=CHUNKSIZE, dtype=str) as leitor:
+        for chunk in leitor:
+            tabela = tipar_despesas(chunk).drop_columns(["ano", "trimestre"])
+            yield preparar_chunk(tabela.to_pandas())
+
+
+def ler_parquet_em_chunks(dataset: ds.Dataset) -> Iterator[pd.DataFrame]:
+    """
+    Lê o dataset Parquet particionado em lotes de até CHUNKSIZE linhas, sem parsing nem inferência de tipos.
+    As colunas de partição (ano, trimestre) não vão para a tabela de fatos.
+    """
+    for lote in dataset.to_batches(columns=ESQUEMA_DESPESAS.names, batch_size=CHUNKSIZE):
+        if lote.num_rows:
+            yield preparar_chunk(lote.to_pandas())
+
+
+def abrir_fonte_despesas() -> tuple[Iterator[pd.DataFrame], bool, int | None]:
+    """
+    Escolhe a origem da importação: o Parquet tipado, quando existir, ou o CSV consolidado.
+
+    Returns:
+        tuple: (chunks, se a origem é o Parquet, total de linhas se conhecido).
+    """
+    if PARQUET_CAMINHO.exists() and any(PARQUET_CAMINHO.rglob("*.parquet")):
+        dataset = ds.dataset(PARQUET_CAMINHO, format="parquet", partitioning="hive")
+        total = dataset.count_rows()
+        logger.info(f"🧱 Lendo Parquet com {total} linhas.")
+        return ler_parquet_em_chunks(dataset), True, total
+    return ler_csv_em_chunks(CSV_CAMINHO), False, None
+
+
+def sql_load_data(caminho: Path, tabela: str, colunas: list[str], substituir: bool = False) -> str:
+    """
+    Monta o LOAD DATA LOCAL INFILE de um arquivo de chunk (';', aspas opcionais, sem cabeçalho).
+
+    Cada campo passa por uma variável e vira NULL quando vazio, como faria o to_sql com NaN.
+    Com `substituir=True` usa REPLACE: linhas com a mesma chave única são sobrescritas.
+    """
+    variaveis = [f"@c{i}" for i in range(len(colunas))]
+    atribuicoes = ", ".join(f"`{col}` = NULLIF({var}, '')" for col, var in zip(colunas, variaveis))
+    arquivo = caminho.resolve().as_posix().replace("\\", "\\\\").replace("'", "\\'")
+    return (
+        f"LOAD DATA LOCAL INFILE '{arquivo}' {'REPLACE ' if substituir else ''}INTO TABLE `{tabela}` "
+        "CHARACTER SET utf8mb4 "
+        "FIELDS TERMINATED BY ';' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+        "LINES TERMINATED BY '\\n' "
+        f"({', '.join(variaveis)}) SET {atribuicoes}"
+    )
+
+
+def carregar_chunk_load_data(conexao, chunk: pd.DataFrame, caminho: Path, tabela: str, substituir: bool = False) -> int:
+    """
+    Grava o chunk em um arquivo temporário e o envia com LOAD DATA LOCAL INFILE na conexão dada.
+
+    Returns:
+        int: Linhas carregadas segundo o servidor.
+    """
+    chunk.to_csv(caminho, sep=";", index=False, header=False, encoding="utf-8", lineterminator="\n")
+    try:
+        return conexao.exec_driver_sql(sql_load_data(caminho, tabela, list(chunk.columns), substituir)).rowcount
+    finally:
+        caminho.unlink(missing_ok=True)
+
+
+def inserir_com_upsert(tabela, conexao, colunas, linhas) -> int:
+    """
+    Método do `to_sql`: INSERT ... ON DUPLICATE KEY UPDATE (idempotente pela chave única da tabela).
+    """
+    from sqlalchemy.dialects.mysql import insert
+
+    comando = insert(tabela.table).values([dict(zip(colunas, linha)) for linha in linhas])
+    comando = comando.on_duplicate_key_update({col: comando.inserted[col] for col in colunas})
+    return conexao.execute(comando).rowcount
+
+
+def contar_por_trimestre(chunk: pd.DataFrame) -> dict[tuple[int, int], int]:
+    """
+    Linhas do chunk por (ano, trimestre) da coluna `data`.
+    """
+    datas = pd.to_datetime(chunk["data"])
+    contagem = datas.groupby([datas.dt.year, datas.dt.quarter]).size()
+    return {(int(ano), int(trimestre)): int(linhas) for (ano, trimestre), linhas in contagem.items()}
+
+
+def chaves_duplicadas(conexao) -> list[str]:
+    """
+    Chaves que o último LOAD DATA da conexão ignorou por já existirem na tabela (avisos 1062).
+
+    O MySQL guarda até `max_error_count` avisos por comando (1024 por padrão).
+    """
+    chaves = []
+    for _, codigo, mensagem in conexao.exec_driver_sql("SHOW WARNINGS").fetchall():
+        encontrada = PADRAO_CHAVE_DUPLICADA.search(mensagem)
+        if int(codigo) == CODIGO_CHAVE_DUPLICADA and encontrada:
+            chaves.append(encontrada.group(1))
+    return chaves
+
+
+def enviar_chunk(engine, chunk: pd.DataFrame, caminho: Path) -> tuple[int, list[str]]:
+    """
+    Envia um chunk para a tabela de staging (executado pelas threads de escrita).
+
+    Com LOAD DATA LOCAL, linhas com chave repetida são ignoradas pelo servidor (só aviso);
+    as chaves são devolvidas para o relatório. Com to_sql, a chave repetida é erro.
+
+    Returns:
+        tuple: (linhas carregadas, chaves ignoradas por duplicidade).
+    """
+    if METODO_IMPORTACAO == "load_data":
+        with engine.begin() as conexao:
+            carregadas = carregar_chunk_load_data(conexao, chunk, caminho, TABELA_STAGING)
+            duplicadas = chaves_duplicadas(conexao) if carregadas < len(chunk) else []
+        return carregadas, duplicadas
+    chunk.to_sql(TABELA_STAGING, con=engine, if_exists="append", index=False, method="multi")
+    return len(chunk), []
+
+
+def trocar_tabela_fatos(engine) -> None:
+    """
+    Coloca a staging no lugar da tabela de fatos com um único RENAME TABLE (atômico no MySQL).
+    Consultas veem a tabela antiga completa até o instante da troca.
+    """
+    with engine.begin() as conexao:
+        conexao.execute(text(f"DROP TABLE IF EXISTS `{TABELA_ANTIGA}`"))
+        if inspect(conexao).has_table(TABELA_FATOS):
+            conexao.execute(text(
+                f"RENAME TABLE `{TABELA_FATOS}` TO `{TABELA_ANTIGA}`, `{TABELA_STAGING}` TO `{TABELA_FATOS}`"
+            ))
+            conexao.execute(text(f"DROP TABLE `{TABELA_ANTIGA}`"))
+        else:
+            conexao.execute(text(f"RENAME TABLE `{TABELA_STAGING}` TO `{TABELA_FATOS}`"))
+
+
+def criar_engine():
+    engine_str = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+    return create_engine(
+        engine_str,
+        pool_size=WRITERS,
+        max_overflow=0,
+        pool_pre_ping=True,
+        connect_args={"allow_local_infile": METODO_IMPORTACAO == "load_data"},
+    )
+
+
+def listar_particoes(raiz: Path) -> dict[tuple[int, int], dict]:
+    """
+    Lista as partições ano/trimestre do Parquet com a assinatura do conteúdo de cada uma.
+
+    A assinatura é o sha256 dos nomes e hashes dos arquivos da partição, então
+    só muda quando processar_despesas regravou algum arquivo daquele trimestre.
+    """
+    particoes = {}
+    for pasta in sorted(raiz.glob("ano=*/trimestre=*")):
+        arquivos = sorted(pasta.glob("*.parquet"))
+        if not arquivos:
+            continue
+        ano = pasta.parent.name.split("=", 1)[1]
+        trimestre = pasta.name.split("=", 1)[1]
+        if not (ano.isdigit() and trimestre.isdigit()):
+            logger.warning(f"⚠️ Partição sem data ignorada (data é obrigatória na tabela de fatos): {pasta}")
+            continue
+        chave = (int(ano), int(trimestre))
+        assinatura = hashlib.sha256()
+        for arquivo in arquivos:
+            assinatura.update(f"{arquivo.name}:{calcular_hash_arquivo(arquivo)}\n".encode("utf-8"))
+        particoes[chave] = {"assinatura": assinatura.hexdigest()}
+    return particoes
+
+
+def filtros_trimestre(ano: int, trimestre: int):
+    """
+    Filtro do dataset Parquet e condição SQL que selecionam as linhas de um trimestre.
+    """
+    inicio, fim = limites_trimestre(ano, trimestre)
+    filtro = (ds.field("ano") == ano) & (ds.field("trimestre") == trimestre)
+    return filtro, "data >= :inicio AND data < :fim", {"inicio": inicio, "fim": fim}
+
+
+def tabela_fatos_tipada(conexao) -> bool:
+    """
+    Indica se a tabela de fatos existe com o DDL gerado (chave primária data/operadora/conta).
+    Tabelas antigas, criadas pelo to_sql, não têm chave e são substituídas na carga completa.
+    """
+    inspetor = inspect(conexao)
+    if not inspetor.has_table(TABELA_FATOS):
+        return False
+    return inspetor.get_pk_constraint(TABELA_FATOS).get("constrained_columns") == CHAVE_PRIMARIA_DESPESAS
+
+
+def criar_staging(engine) -> None:
+    """
+    Cria a staging vazia com a estrutura da tabela de fatos (tipos, índices e partições).
+
+    Usa `CREATE TABLE ... LIKE` quando a tabela de fatos já segue o DDL gerado
+    (preservando partições adicionadas depois); senão, o próprio DDL gerado.
+    """
+    with engine.begin() as conexao:
+        conexao.execute(text(f"DROP TABLE IF EXISTS `{TABELA_STAGING}`"))
+        if tabela_fatos_tipada(conexao):
+            conexao.execute(text(f"CREATE TABLE `{TABELA_STAGING}` LIKE `{TABELA_FATOS}`"))
+        else:
+            anos = anos_particoes_despesas(PARQUET_CAMINHO, ANOS_RETROATIVOS)
+            conexao.execute(text(gerar_ddl_despesas(TABELA_STAGING, anos).rstrip(";")))
+
+
+def registrar_trimestre(conexao, ano: int, trimestre: int, assinatura: str, linhas: int) -> None:
+    conexao.execute(
+        text(
+            f"REPLACE INTO {TABELA_CONTROLE_IMPORT} (ano, trimestre, assinatura, qtd_linhas, atualizado_em) "
+            "VALUES (:ano, :trimestre, :assinatura, :linhas, NOW())"
+        ),
+        {"ano": ano, "trimestre": trimestre, "assinatura": assinatura, "linhas": linhas},
+    )
+
+
+def importar_trimestre(engine, dataset: ds.Dataset, ano: int, trimestre: int, assinatura: str, diretorio: Path) -> int:
+    """
+    Substitui um trimestre da tabela de fatos em uma única transação.
+
+    Apaga as linhas do período e carrega as do Parquet com upsert pela chave
+    (data, registro_operadora, cd_conta_contabil): repetir a carga não duplica nada.
+
+    Returns:
+        int: Linhas carregadas.
+    """
+    filtro, condicao, parametros = filtros_trimestre(ano, trimestre)
+    linhas = 0
+    with engine.begin() as conexao:
+        conexao.execute(text(f"DELETE FROM `{TABELA_FATOS}` WHERE {condicao}"), parametros)
+        lotes = dataset.to_batches(columns=ESQUEMA_DESPESAS.names, filter=filtro, batch_size=CHUNKSIZE)
+        for i, lote in enumerate(lotes):
+            chunk = preparar_chunk(lote.to_pandas())
+            if chunk.empty:
+                continue
+            if METODO_IMPORTACAO == "load_data":
+                caminho = diretorio / f"chunk_{ano}_{trimestre}_{i:05d}.csv"
+                carregar_chunk_load_data(conexao, chunk, caminho, TABELA_FATOS, substituir=True)
+            else:
+                chunk.to_sql(TABELA_FATOS, con=conexao, if_exists="append", index=False, method=inserir_com_upsert)
+            linhas += len(chunk)
+        registrar_trimestre(conexao, ano, trimestre, assinatura, linhas)
+    return linhas
+
+
+def registrar_carga_completa(engine, usando_parquet: bool, linhas_por_trimestre: dict[tuple[int, int], int]) -> None:
+    """
+    Após uma carga completa, registra a assinatura de todos os trimestres carregados.
+
+    Com o Parquet, é a assinatura de cada partição (a mesma do modo incremental). Com o CSV,
+    é derivada do hash do arquivo: outro CSV muda todos os trimestres, e a próxima carga
+    incremental (pelo Parquet) recarrega tudo. O resumir_despesas usa este controle para
+    reagregar só os trimestres alterados.
+    """
+    with engine.begin() as conexao:
+        conexao.execute(text(DDL_CONTROLE_IMPORT))
+        conexao.execute(text(f"DELETE FROM {TABELA_CONTROLE_IMPORT}"))
+        if not usando_parquet:
+            hash_csv = calcular_hash_arquivo(CSV_CAMINHO)
+            for (ano, trimestre), linhas in sorted(linhas_por_trimestre.items()):
+                assinatura = hashlib.sha256(f"csv:{hash_csv}:{ano}:{trimestre}".encode("utf-8")).hexdigest()
+                registrar_trimestre(conexao, ano, trimestre, assinatura, linhas)
+            return
+        dataset = ds.dataset(PARQUET_CAMINHO, format="parquet", partitioning="hive")
+        for (ano, trimestre), info in listar_particoes(PARQUET_CAMINHO).items():
+            filtro, _, _ = filtros_trimestre(ano, trimestre)
+            registrar_trimestre(conexao, ano, trimestre, info["assinatura"], dataset.count_rows(filter=filtro))
+
+
+def importar_incremental():
+    """
+    Carrega só os trimestres do Parquet que são novos ou mudaram desde a última importação.
+
+    Cada trimestre pendente é substituído em sua própria transação (DELETE do
+    período + upsert pela chave), em paralelo nas threads de escrita.
+    Trimestres que saíram do Parquet são apagados da tabela de fatos.
+    Sem Parquet, ou sem a tabela de fatos no formato do DDL gerado, cai na carga completa.
+    """
+    if not (PARQUET_CAMINHO.exists() and any(PARQUET_CAMINHO.rglob("*.parquet"))):
+        logger.warning("⚠️ Modo incremental requer o Parquet de processar_despesas; fazendo carga completa.")
+        return importar_para_mysql()
+
+    engine = criar_engine()
+    try:
+        with engine.begin() as conexao:
+            if not tabela_fatos_tipada(conexao):
+                logger.info(f"🆕 '{TABELA_FATOS}' não existe ou não segue o DDL gerado; fazendo carga completa.")
+                engine.dispose()
+                return importar_para_mysql()
+            conexao.execute(text(DDL_CONTROLE_IMPORT))
+            controle = {
+                (ano, trimestre): assinatura
+                for ano, trimestre, assinatura in conexao.execute(
+                    text(f"SELECT ano, trimestre, assinatura FROM {TABELA_CONTROLE_IMPORT}")
+                )
+            }
+
+        particoes = listar_particoes(PARQUET_CAMINHO)
+        pendentes = sorted(chave for chave, info in particoes.items() if controle.get(chave) != info["assinatura"])
+        removidos = sorted(set(controle) - set(particoes))
+        logger.info(
+            f"🧮 Trimestres no Parquet: {len(particoes)} | a carregar: {len(pendentes)} | a remover: {len(removidos)}"
+        )
+
+        for ano, trimestre in removidos:
+            with engine.begin() as conexao:
+                if (ano, trimestre) != TRIMESTRE_SEM_DATA:
+                    _, condicao, parametros = filtros_trimestre(ano, trimestre)
+                    conexao.execute(text(f"DELETE FROM `{TABELA_FATOS}` WHERE {condicao}"), parametros)
+                conexao.execute(
+                    text(f"DELETE FROM {TABELA_CONTROLE_IMPORT} WHERE ano = :ano AND trimestre = :trimestre"),
+                    {"ano": ano, "trimestre": trimestre},
+                )
+            logger.info(f"🧹 Trimestre removido: {trimestre}T{ano}")
+
+        dataset = ds.dataset(PARQUET_CAMINHO, format="parquet", partitioning="hive")
+        with tempfile.TemporaryDirectory(prefix="despesas_load_") as diretorio, \
+                ThreadPoolExecutor(max_workers=WRITERS) as pool:
+            futuros = {
+                (ano, trimestre): pool.submit(
+                    importar_trimestre, engine, dataset, ano, trimestre,
+                    particoes[(ano, trimestre)]["assinatura"], Path(diretorio),
+                )
+                for ano, trimestre in pendentes
+            }
+            for (ano, trimestre), futuro in tqdm(futuros.items(), desc="💾 Carregando trimestres"):
+                logger.info(f"📦 {trimestre}T{ano}: {futuro.result()} linhas carregadas")
+
+        logger.info(f"✅ '{TABELA_FATOS}' atualizada de forma incremental.")
+    except Exception as e:
+        logger.exception(f"❌ Erro na importação incremental de despesas: {e}")
+        raise
+    finally:
+        engine.dispose()
+        logger.info("🏁 Importação finalizada.")
 
 
 def importar_para_mysql():
-    if not CSV_CAMINHO.exists():
+    """
+    Carga completa: envia os chunks para a staging com `WRITERS` threads e troca a tabela de fatos.
+
+    Memória: ficam no máximo `WRITERS + 2` chunks de `CHUNKSIZE` linhas ao mesmo tempo
+    (um em envio por thread, um pronto na fila de leitura e um sendo lido/parseado).
+    Com uma thread de escrita, são três.
+    """
+    if not CSV_CAMINHO.exists() and not PARQUET_CAMINHO.exists():
         logger.error(f"❌ Arquivo CSV não encontrado: {CSV_CAMINHO}")
-        return
+        raise FileNotFoundError(CSV_CAMINHO)
 
+    engine = None
     try:
-        df = tentar_leitura_csv(CSV_CAMINHO)
-        logger.info(f"📊 Lido CSV com {df.shape[0]} linhas e {df.shape[1]} colunas.")
-        df.columns = [normalizar_texto(col) for col in df.columns]
-
-        engine_str = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
-        engine = create_engine(engine_str)
-
-        total_rows = len(df)
-        total_chunks = (total_rows // CHUNKSIZE) + int(total_rows % CHUNKSIZE > 0)
-        logger.info(f"🚚 Iniciando envio em {total_chunks} chunk(s) de {CHUNKSIZE} linhas...")
-
-        for i in tqdm(range(total_chunks), desc="💾 Inserindo chunks"):
-            start = i * CHUNKSIZE
-            end = min((i + 1) * CHUNKSIZE, total_rows)
-            chunk = df.iloc[start:end]
-            logger.info(f"📦 Inserindo chunk {i + 1}/{total_chunks} ({start}:{end})")
-            chunk.to_sql(
-                "fato_despesas_contabeis",
-                con=engine,
-                if_exists="append" if i > 0 else "replace",
-                index=False,
-                method="multi"
+        chunks, usando_parquet, total_rows = abrir_fonte_despesas()
+
+        engine = criar_engine()
+        logger.info(
+            f"🚚 Iniciando envio em chunks de {CHUNKSIZE} linhas via {METODO_IMPORTACAO} "
+            f"com {WRITERS} thread(s) para '{TABELA_STAGING}'..."
+        )
+
+        carregadas = 0
+        lidas = 0
+        duplicadas: list[str] = []
+        total_duplicadas = 0
+        linhas_por_trimestre: Counter = Counter()
+        with tempfile.TemporaryDirectory(prefix="despesas_load_") as diretorio, \
+                ThreadPoolExecutor(max_workers=WRITERS) as pool, \
+                tqdm(total=total_rows, unit=" linhas", desc="💾 Inserindo chunks") as barra:
+            pendentes = deque()
+
+            def concluir_mais_antigo():
+                nonlocal carregadas, total_duplicadas
+                futuro, linhas = pendentes.popleft()
+                enviadas, chaves = futuro.result()
+                carregadas += enviadas
+                total_duplicadas += len(chaves)
+                duplicadas.extend(chaves[:MAX_CHAVES_RELATADAS - len(duplicadas)])
+                barra.update(linhas)
+
+            # O próximo chunk é lido/parseado em segundo plano enquanto os anteriores vão para o banco
+            criar_staging(engine)
+            for i, chunk in enumerate(ler_em_segundo_plano(chunks)):
+                logger.info(f"📦 Enviando chunk {i + 1} ({lidas}:{lidas + len(chunk)})")
+                futuro = pool.submit(enviar_chunk, engine, chunk, Path(diretorio) / f"chunk_{i:05d}.csv")
+                pendentes.append((futuro, len(chunk)))
+                lidas += len(chunk)
+                linhas_por_trimestre.update(contar_por_trimestre(chunk))
+                # Limita os chunks em memória: só os que estão sendo enviados (um por thread)
+                while len(pendentes) > WRITERS:
+                    concluir_mais_antigo()
+            while pendentes:
+                concluir_mais_antigo()
+
+        if lidas == 0:
+            logger.warning("⚠️ Nenhuma linha lida; a tabela de fatos foi mantida.")
+            return
+
+        with engine.connect() as conexao:
+            na_staging = conexao.execute(text(f"SELECT COUNT(*) FROM `{TABELA_STAGING}`")).scalar()
+        logger.info(f"📊 Linhas na staging: {na_staging} de {lidas} (servidor reportou {carregadas})")
+        if na_staging != lidas:
+            mensagem = (
+                f"❌ Contagem divergente: '{TABELA_STAGING}' tem {na_staging} linhas e a origem {lidas}. "
+                f"'{TABELA_FATOS}' não foi substituída."
             )
+            if duplicadas:
+                mensagem += (
+                    f" {total_duplicadas} linha(s) com chave (data, registro_operadora, cd_conta_contabil) "
+                    f"repetida, ex.: {duplicadas}"
+                )
+            raise RuntimeError(mensagem)
 
-        logger.info("✅ Dados inseridos com sucesso na tabela 'fato_despesas_contabeis'.")
+        trocar_tabela_fatos(engine)
+        registrar_carga_completa(engine, usando_parquet, linhas_por_trimestre)
+        logger.info(f"✅ Dados inseridos com sucesso na tabela '{TABELA_FATOS}' (troca atômica da staging).")
     except Exception as e:
         logger.exception(f"❌ Erro ao importar despesas para o MySQL: {e}")
-        try:
-            engine.dispose()
-        except Exception:
-            logger.warning("⚠️ Erro ao encerrar engine SQL após falha.")
+        raise
     finally:
+        if engine is not None:
+            engine.dispose()
         logger.info("🏁 Importação finalizada.")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Importa as despesas contábeis para o MySQL.")
+    parser.add_argument(
+        "--incremental", action="store_true", default=MODO_INCREMENTAL,
+        help="Carrega só os trimestres novos ou alterados do Parquet (upsert por data/operadora/conta).",
+    )
+    args = parser.parse_args()
+
     logger.info("🚀 Iniciando importação de despesas para MySQL...")
-    importar_para_mysql()
+    try:
+        if args.incremental:
+            importar_incremental()
+        else:
+            importar_para_mysql()
+    except Exception:
+        # Código de saída != 0: o make não segue para o resumir_despesas com dados antigos
+        sys.exit(1)
 
 
 if __name__ == "__main__":
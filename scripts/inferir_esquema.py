@@ -0,0 +1,271 @@
+import os
+import json
+import math
+import logging
+import pandas as pd
+from dataclasses import dataclass, field
+from pathlib import Path
+from dotenv import load_dotenv
+from scripts.etl_utils import detectar_encoding, normalizar_nome_coluna_sql
+
+load_dotenv()
+
+# Linhas lidas por vez de cada CSV perfilado
+CHUNKSIZE = int(os.getenv("ESQUEMA_CHUNKSIZE", 100000))
+# Linhas analisadas por arquivo (0 = arquivo inteiro; amostras menores podem gerar truncamentos)
+AMOSTRA_LINHAS = int(os.getenv("ESQUEMA_AMOSTRA_LINHAS", 0))
+# Máximo de valores distintos para uma coluna de texto virar ENUM (0 desativa ENUM)
+MAX_VALORES_ENUM = int(os.getenv("ESQUEMA_MAX_VALORES_ENUM", 16))
+# Folga sobre o maior tamanho observado no VARCHAR (0.5 = 50%): textos um pouco maiores na próxima carga não são cortados
+FOLGA_VARCHAR = float(os.getenv("ESQUEMA_FOLGA_VARCHAR", 0.5))
+# Acima disso a coluna vira TEXT (fora da linha da tabela)
+MAX_VARCHAR = 4000
+# CHAR só para códigos curtos de tamanho fixo (CNPJ, CEP, UF); o resto vira VARCHAR com folga
+MAX_CHAR = 32
+
+# Até 18 dígitos cabe em BIGINT; números maiores (códigos de barras etc.) ficam como texto
+PADRAO_INTEIRO = r"-?\d{1,18}"
+PADRAO_ZERO_A_ESQUERDA = r"-?0\d+"
+PADRAO_DECIMAL = r"-?\d+[.,]\d+"
+FORMATO_DATA = "%Y-%m-%d"
+# Maior precisão de um DECIMAL no MySQL
+MAX_DIGITOS_DECIMAL = 65
+
+# Folga dos tipos numéricos: dígitos inteiros a mais que o maior valor observado (INT e DECIMAL);
+# a próxima carga do CADOP com um valor um pouco maior não estoura a coluna no modo estrito
+FOLGA_DIGITOS = int(os.getenv("ESQUEMA_FOLGA_DIGITOS", 1))
+
+# Faixas dos inteiros do MySQL: (tipo, mínimo, máximo) com sinal
+FAIXAS_INTEIROS = [
+    ("TINYINT", -(2**7), 2**7 - 1),
+    ("SMALLINT", -(2**15), 2**15 - 1),
+    ("MEDIUMINT", -(2**23), 2**23 - 1),
+    ("INT", -(2**31), 2**31 - 1),
+    ("BIGINT", -(2**63), 2**63 - 1),
+]
+
+
+@dataclass
+class PerfilColuna:
+    """
+    Estatísticas de uma coluna acumuladas chunk a chunk.
+
+    Os contadores de formato (`inteiros`, `decimais`, `datas`) dizem quantos valores não nulos
+    seguem cada padrão; o tipo só é escolhido se todos os valores seguirem o mesmo.
+    """
+    linhas: int = 0
+    nulos: int = 0
+    tamanho_min: int | None = None
+    tamanho_max: int = 0
+    inteiros: int = 0
+    zeros_a_esquerda: int = 0
+    decimais: int = 0
+    digitos_inteiros: int = 0
+    casas_decimais: int = 0
+    datas: int = 0
+    minimo: int | None = None
+    maximo: int | None = None
+    # Guardados só até passar do limite do ENUM; depois vira None (cardinalidade alta)
+    distintos: set | None = field(default_factory=set)
+
+    @property
+    def nao_nulos(self) -> int:
+        return self.linhas - self.nulos
+
+    @property
+    def taxa_nulos(self) -> float:
+        return self.nulos / self.linhas if self.linhas else 0.0
+
+    def atualizar(self, serie: pd.Series, max_valores_enum: int = MAX_VALORES_ENUM) -> None:
+        """
+        Acumula as estatísticas de um chunk (série de texto, já sem espaços nas pontas).
+
+        Textos vazios contam como nulos, como na importação.
+        """
+        self.linhas += len(serie)
+        valores = serie[serie.notna() & (serie != "")]
+        self.nulos += len(serie) - len(valores)
+        if valores.empty:
+            return
+
+        tamanhos = valores.str.len()
+        self.tamanho_max = max(self.tamanho_max, int(tamanhos.max()))
+        menor = int(tamanhos.min())
+        self.tamanho_min = menor if self.tamanho_min is None else min(self.tamanho_min, menor)
+
+        inteiros = valores.str.fullmatch(PADRAO_INTEIRO)
+        self.inteiros += int(inteiros.sum())
+        self.zeros_a_esquerda += int(valores.str.fullmatch(PADRAO_ZERO_A_ESQUERDA).sum())
+        if inteiros.any():
+            numeros = valores[inteiros].astype(int)
+            self.minimo = int(numeros.min()) if self.minimo is None else min(self.minimo, int(numeros.min()))
+            self.maximo = int(numeros.max()) if self.maximo is None else max(self.maximo, int(numeros.max()))
+            self.digitos_inteiros = max(self.digitos_inteiros, int(valores[inteiros].str.lstrip("-").str.len().max()))
+
+        decimais = valores.str.fullmatch(PADRAO_DECIMAL)
+        self.decimais += int(decimais.sum())
+        if decimais.any():
+            partes = valores[decimais].str.lstrip("-").str.split(r"[.,]", n=1, expand=True)
+            self.digitos_inteiros = max(self.digitos_inteiros, int(partes[0].str.len().max()))
+            self.casas_decimais = max(self.casas_decimais, int(partes[1].str.len().max()))
+
+        self.datas += int(pd.to_datetime(valores, format=FORMATO_DATA, errors="coerce").notna().sum())
+
+        if self.distintos is not None:
+            self.distintos.update(valores.unique())
+            if len(self.distintos) > max_valores_enum:
+                self.distintos = None
+
+    def tipo_sql(self, max_valores_enum: int = MAX_VALORES_ENUM) -> str | None:
+        """
+        Tipo MySQL mais compacto que comporta os valores observados, com folga.
+
+        Inteiros e DECIMAL ganham `FOLGA_DIGITOS` dígitos inteiros além do maior valor visto;
+        CHAR/VARCHAR seguem `tamanho_sql`.
+
+        Returns:
+            str | None: Tipo SQL, ou None se a coluna só tem nulos (sem evidência para inferir).
+        """
+        if not self.nao_nulos:
+            return None
+        if self.datas == self.nao_nulos:
+            return "DATE"
+        # Zeros à esquerda (CNPJ, CEP, telefone) precisam continuar texto
+        if self.inteiros == self.nao_nulos and not self.zeros_a_esquerda:
+            sem_sinal = self.minimo >= 0
+            minimo, maximo = com_folga(self.minimo), com_folga(self.maximo)
+            for tipo, menor, maior in FAIXAS_INTEIROS:
+                if sem_sinal and maximo <= maior * 2 + 1:
+                    return f"{tipo} UNSIGNED"
+                if not sem_sinal and minimo >= menor and maximo <= maior:
+                    return tipo
+        digitos = self.digitos_inteiros + FOLGA_DIGITOS + self.casas_decimais
+        if (
+            self.decimais
+            and self.inteiros + self.decimais == self.nao_nulos
+            and not self.zeros_a_esquerda
+            and digitos <= MAX_DIGITOS_DECIMAL
+        ):
+            return f"DECIMAL({digitos},{self.casas_decimais})"
+        # ENUM só quando os valores se repetem: numa amostra toda distinta não há evidência de domínio fechado
+        if self.distintos is not None and 0 < len(self.distintos) <= max_valores_enum and len(self.distintos) * 2 <= self.nao_nulos:
+            valores = ", ".join("'" + valor.replace("\\", "\\\\").replace("'", "''") + "'" for valor in sorted(self.distintos))
+            return f"ENUM({valores})"
+        tamanho = self.tamanho_sql()
+        if tamanho is None:
+            return "TEXT"
+        if self.tamanho_min == self.tamanho_max and tamanho <= MAX_CHAR:
+            return f"CHAR({tamanho})"
+        return f"VARCHAR({tamanho})"
+
+    def tamanho_sql(self, folga: float = FOLGA_VARCHAR) -> int | None:
+        """
+        Tamanho declarado da coluna de texto: exato para códigos de tamanho fixo, com folga para o resto.
+
+        Returns:
+            int | None: Tamanho do CHAR/VARCHAR, ou None se a coluna precisa de TEXT.
+        """
+        tamanho = max(self.tamanho_max, 1)
+        if tamanho > MAX_VARCHAR:
+            return None
+        if self.tamanho_min == self.tamanho_max and tamanho <= MAX_CHAR:
+            return tamanho
+        return min(math.ceil(tamanho * (1 + folga)), MAX_VARCHAR)
+
+    def resumo(self) -> dict:
+        """
+        Dicionário serializável para o relatório de perfil.
+        """
+        return {
+            "linhas": self.linhas,
+            "taxa_nulos": round(self.taxa_nulos, 4),
+            "tamanho_min": self.tamanho_min,
+            "tamanho_max": self.tamanho_max,
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            "cardinalidade": len(self.distintos) if self.distintos is not None else f">{MAX_VALORES_ENUM}",
+            "tipo_sql": self.tipo_sql(),
+        }
+
+
+def com_folga(valor: int, digitos: int | None = None) -> int:
+    """
+    Maior valor (em módulo, com o mesmo sinal) com `digitos` dígitos a mais que `valor`.
+
+    Ex.: 39 com 1 dígito de folga vira 999; -5 vira -99.
+    """
+    digitos = FOLGA_DIGITOS if digitos is None else digitos
+    limite = 10 ** (len(str(abs(valor))) + digitos) - 1
+    return -limite if valor < 0 else limite
+
+
+def perfilar_csv(
+    caminho: Path,
+    sep: str = ";",
+    aliases: dict[str, str] | None = None,
+    chunksize: int = CHUNKSIZE,
+    amostra_linhas: int = AMOSTRA_LINHAS,
+    perfis: dict[str, PerfilColuna] | None = None,
+) -> dict[str, PerfilColuna]:
+    """
+    Lê um CSV em chunks e acumula o perfil de cada coluna.
+
+    Args:
+        caminho (Path): CSV a ser perfilado.
+        sep (str): Separador do CSV.
+        aliases (dict[str, str] | None): Renomeações aplicadas aos nomes normalizados das colunas.
+        chunksize (int): Linhas lidas por vez.
+        amostra_linhas (int): Máximo de linhas analisadas (0 = todas).
+        perfis (dict[str, PerfilColuna] | None): Perfis a complementar (vários CSVs da mesma tabela).
+
+    Returns:
+        dict[str, PerfilColuna]: Perfil por nome de coluna no banco.
+    """
+    perfis = perfis if perfis is not None else {}
+    encoding = detectar_encoding(caminho)
+    lidas = 0
+    with pd.read_csv(caminho, sep=sep, encoding=encoding, dtype=str, chunksize=chunksize) as leitor:
+        for chunk in leitor:
+            if amostra_linhas:
+                chunk = chunk.iloc[:amostra_linhas - lidas]
+            chunk.columns = [normalizar_nome_coluna_sql(col, aliases) for col in chunk.columns]
+            for coluna in chunk.columns:
+                perfis.setdefault(coluna, PerfilColuna()).atualizar(chunk[coluna].str.strip())
+            lidas += len(chunk)
+            if amostra_linhas and lidas >= amostra_linhas:
+                break
+    logging.info(f"🔬 Perfil de {caminho.name} ({encoding}): {lidas} linhas, {len(perfis)} colunas")
+    return perfis
+
+
+def tipos_sql(perfis: dict[str, PerfilColuna]) -> dict[str, str]:
+    """
+    Tipo SQL inferido por coluna (colunas sem valores ficam de fora).
+    """
+    tipos = {coluna: perfil.tipo_sql() for coluna, perfil in perfis.items()}
+    return {coluna: tipo for coluna, tipo in tipos.items() if tipo}
+
+
+def calcular_truncamentos(perfis: dict[str, PerfilColuna]) -> dict[str, int]:
+    """
+    Limite de caracteres das colunas de texto, no formato lido por `carregar_truncamentos_do_arquivo`.
+
+    O limite é o tamanho declarado no DDL (com a folga), não o maior valor observado.
+    """
+    return {
+        coluna: perfil.tamanho_sql()
+        for coluna, perfil in perfis.items()
+        if (perfil.tipo_sql() or "").startswith(("CHAR", "VARCHAR"))
+    }
+
+
+def salvar_perfil(perfis: dict[str, PerfilColuna], caminho_perfil: Path, caminho_truncamentos: Path) -> None:
+    """
+    Grava o relatório de perfil e o arquivo de truncamentos.
+    """
+    caminho_perfil.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho_perfil, "w", encoding="utf-8") as f:
+        json.dump({coluna: perfil.resumo() for coluna, perfil in perfis.items()}, f, ensure_ascii=False, indent=2)
+    with open(caminho_truncamentos, "w", encoding="utf-8") as f:
+        json.dump(calcular_truncamentos(perfis), f, ensure_ascii=False, indent=2)
+    logging.info(f"📏 Perfil salvo em: {caminho_perfil} | truncamentos em: {caminho_truncamentos}")
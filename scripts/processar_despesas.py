@@ -1,24 +1,113 @@
 import os
+import re
+import json
+import hashlib
+import shutil
+import argparse
+import zipfile
 import pandas as pd
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
 from dotenv import load_dotenv
 from tqdm import tqdm
-from scripts.etl_utils import normalizar_texto, setup_logger, salvar_truncamentos_em_arquivo
+from scripts.etl_utils import ESQUEMA_DESPESAS, calcular_hash_arquivo, normalizar_serie, setup_logger, tipar_despesas
 
 load_dotenv()
 logger = setup_logger("processar_despesas", console=True)
 
 ANOS_RETROATIVOS = int(os.getenv("DEMO_ANOS_RETROATIVOS", 2))
 BASE_PATH = Path(os.getenv("DEMO_CSV_PATH", "temp"))
+# ZIPs trimestrais baixados por download_demonstracoes_contabeis.py (lidos sem extrair)
+ZIP_PATH = Path(os.getenv("DEMO_ZIP_PATH", "input"))
+PADRAO_TRIMESTRE = re.compile(r"[1-4]T\d{4}", re.IGNORECASE)
 CSV_SAIDA = Path("output/csv/despesas_consolidadas.csv")
+# Dataset Parquet tipado, particionado por ano/trimestre (ano=AAAA/trimestre=T/<fonte>.parquet)
+PARQUET_SAIDA = Path("output/parquet/despesas")
+PARTICAO_NULA = "__HIVE_DEFAULT_PARTITION__"
+# Partes normalizadas (CSV sem cabeçalho) de cada fonte e o manifesto que as descreve
+PARTES_DIR = Path("output/csv/despesas_partes")
+MANIFESTO = PARTES_DIR / "manifesto.json"
+VERSAO_MANIFESTO = 1
+# Linhas lidas por vez de cada CSV trimestral (0 = arquivo inteiro de uma vez)
+CHUNKSIZE = int(os.getenv("DESPESAS_CHUNKSIZE", 100000))
+ENCODINGS = ("utf-8", "latin1")
+# Processos que leem e normalizam arquivos trimestrais ao mesmo tempo (1 = sequencial)
+WORKERS = int(os.getenv("DESPESAS_WORKERS") or 1)
 
 
-def ler_csv_com_fallback(caminho):
-    try:
-        return pd.read_csv(caminho, sep=';', encoding='utf-8')
-    except UnicodeDecodeError:
-        logger.warning(f"🔁 Encoding 'utf-8' falhou para {caminho.name}, tentando 'latin1'...")
-        return pd.read_csv(caminho, sep=';', encoding='latin1')
+@dataclass(frozen=True)
+class FonteCSV:
+    """
+    Um CSV trimestral: arquivo solto em DEMO_CSV_PATH ou membro de um ZIP baixado.
+
+    É serializável, então pode ser enviada aos processos do pool.
+    """
+    caminho: Path
+    membro: str | None = None
+
+    @property
+    def nome(self) -> str:
+        return Path(self.membro).name if self.membro else self.caminho.name
+
+    @property
+    def chave(self) -> str:
+        """Identificador estável da fonte no manifesto."""
+        return f"{self.caminho.as_posix()}::{self.membro}" if self.membro else self.caminho.as_posix()
+
+    @property
+    def nome_parte(self) -> str:
+        """Nome base (único por fonte) dos arquivos gerados a partir dela."""
+        return f"{Path(self.nome).stem}-{hashlib.sha1(self.chave.encode('utf-8')).hexdigest()[:8]}"
+
+    def assinatura(self) -> str:
+        """
+        Identifica o conteúdo da fonte: sha256 do CSV solto ou CRC/tamanho do membro
+        (gravados no próprio ZIP, sem precisar descompactar).
+        """
+        if self.membro is None:
+            return calcular_hash_arquivo(self.caminho)
+        with zipfile.ZipFile(self.caminho) as arquivo_zip:
+            info = arquivo_zip.getinfo(self.membro)
+        return f"crc32:{info.CRC:08x}:{info.file_size}"
+
+    @contextmanager
+    def abrir(self):
+        """
+        Abre a fonte como fluxo binário (o membro do ZIP é descompactado sob demanda).
+        """
+        if self.membro is None:
+            with open(self.caminho, "rb") as fluxo:
+                yield fluxo
+            return
+        with zipfile.ZipFile(self.caminho) as arquivo_zip, arquivo_zip.open(self.membro) as fluxo:
+            yield fluxo
+
+
+def listar_fontes() -> list[FonteCSV]:
+    """
+    Lista os CSVs soltos em DEMO_CSV_PATH e os CSVs dentro dos ZIPs trimestrais de DEMO_ZIP_PATH.
+
+    Um membro de ZIP é ignorado quando já existe um CSV extraído com o mesmo nome,
+    para o mesmo trimestre não entrar duas vezes. A ordem é a dos nomes dos arquivos.
+    """
+    fontes = [FonteCSV(caminho) for caminho in BASE_PATH.glob("*.csv")]
+    extraidos = {fonte.nome.lower() for fonte in fontes}
+    for caminho_zip in sorted(ZIP_PATH.glob("*.zip")):
+        if not PADRAO_TRIMESTRE.search(caminho_zip.name):
+            continue
+        try:
+            with zipfile.ZipFile(caminho_zip) as arquivo_zip:
+                membros = [m for m in arquivo_zip.namelist() if m.lower().endswith(".csv")]
+        except zipfile.BadZipFile:
+            logger.warning(f"⚠️ ZIP inválido ignorado: {caminho_zip.name}")
+            continue
+        for membro in membros:
+            if Path(membro).name.lower() not in extraidos:
+                fontes.append(FonteCSV(caminho_zip, membro))
+    return sorted(fontes, key=lambda fonte: (fonte.nome, str(fonte.caminho)))
 
 
 def normalizar_colunas(df):
@@ -30,33 +119,290 @@ def normalizar_colunas(df):
 
 def normalizar_textos(df):
     for col in df.select_dtypes(include=['object']).columns:
-        df[col] = df[col].astype(str).apply(lambda x: normalizar_texto(x.strip()))
+        df[col] = normalizar_serie(df[col].astype(str))
     return df
 
 
-def processar():
+def ler_cabecalho(fonte: FonteCSV) -> list[str]:
+    """
+    Lê só o cabeçalho de um CSV e devolve os nomes de colunas já normalizados.
+    """
+    for encoding in ENCODINGS:
+        try:
+            with fonte.abrir() as fluxo:
+                df = pd.read_csv(fluxo, sep=';', encoding=encoding, nrows=0)
+            return list(normalizar_colunas(df).columns)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"❌ Não foi possível ler o cabeçalho de {fonte.nome}.")
+
+
+def ler_em_chunks(fonte: FonteCSV, encoding):
+    """
+    Lê o CSV em blocos de CHUNKSIZE linhas (ou inteiro, se CHUNKSIZE for 0).
+    """
+    with fonte.abrir() as fluxo:
+        if CHUNKSIZE <= 0:
+            yield pd.read_csv(fluxo, sep=';', encoding=encoding)
+            return
+        with pd.read_csv(fluxo, sep=';', encoding=encoding, chunksize=CHUNKSIZE) as leitor:
+            yield from leitor
+
+
+class EscritorParquet:
+    """
+    Grava as linhas tipadas de uma fonte em um arquivo Parquet por partição ano/trimestre.
+
+    Cada bloco vira um row group; os arquivos só ficam completos depois de `fechar()`.
+    """
+
+    def __init__(self, raiz: Path, nome: str):
+        self.raiz = Path(raiz)
+        self.nome = nome
+        self.escritores: dict[tuple, pq.ParquetWriter] = {}
+        self.caminhos: list[Path] = []
+
+    def caminho_particao(self, ano, trimestre) -> Path:
+        if ano is None or trimestre is None:
+            return self.raiz / f"ano={PARTICAO_NULA}" / f"trimestre={PARTICAO_NULA}" / f"{self.nome}.parquet"
+        return self.raiz / f"ano={ano}" / f"trimestre={trimestre}" / f"{self.nome}.parquet"
+
+    def escrever(self, df: pd.DataFrame) -> None:
+        tabela = tipar_despesas(df)
+        chaves = tabela.select(["ano", "trimestre"]).to_pandas().astype(object)
+        chaves = chaves.where(chaves.notna(), None)
+        grupos = chaves.groupby(["ano", "trimestre"], dropna=False, sort=True).indices
+        dados = tabela.drop_columns(["ano", "trimestre"])
+        for (ano, trimestre), posicoes in grupos.items():
+            ano = None if pd.isna(ano) else int(ano)
+            trimestre = None if pd.isna(trimestre) else int(trimestre)
+            escritor = self.escritores.get((ano, trimestre))
+            if escritor is None:
+                caminho = self.caminho_particao(ano, trimestre)
+                caminho.parent.mkdir(parents=True, exist_ok=True)
+                escritor = pq.ParquetWriter(caminho, ESQUEMA_DESPESAS, compression="zstd")
+                self.escritores[(ano, trimestre)] = escritor
+                self.caminhos.append(caminho)
+            escritor.write_table(dados.take(posicoes))
+
+    def fechar(self) -> None:
+        for escritor in self.escritores.values():
+            escritor.close()
+        self.escritores.clear()
+
+    def descartar(self) -> None:
+        """
+        Fecha e apaga os arquivos já gravados desta fonte (usado ao trocar de encoding).
+        """
+        self.fechar()
+        for caminho in self.caminhos:
+            caminho.unlink(missing_ok=True)
+        self.caminhos.clear()
+
+
+def anexar_arquivo(arquivo: FonteCSV, colunas: list[str], saida) -> tuple[int, list[str]]:
+    """
+    Normaliza um CSV trimestral bloco a bloco e acrescenta as linhas ao arquivo consolidado.
+
+    Os mesmos blocos também são gravados, tipados, no dataset Parquet (PARQUET_SAIDA).
+    Se o encoding falhar no meio do arquivo, o que já foi escrito dele é
+    descartado (truncando a saída e apagando seus Parquet) e a leitura
+    recomeça com o próximo encoding.
+
+    Args:
+        arquivo (FonteCSV): CSV trimestral (solto ou dentro de um ZIP).
+        colunas (list[str]): Cabeçalho fixo do consolidado.
+        saida: Arquivo consolidado aberto em modo texto.
+
+    Returns:
+        tuple: (quantidade de linhas escritas, arquivos Parquet gerados).
+    """
+    inicio = saida.tell()
+    for encoding in ENCODINGS:
+        linhas = 0
+        parquet = EscritorParquet(PARQUET_SAIDA, arquivo.nome_parte)
+        try:
+            for chunk in ler_em_chunks(arquivo, encoding):
+                chunk = normalizar_colunas(chunk)
+                chunk = normalizar_textos(chunk)
+                chunk.reindex(columns=colunas).to_csv(saida, sep=';', index=False, header=False)
+                parquet.escrever(chunk)
+                linhas += len(chunk)
+            parquet.fechar()
+            return linhas, [str(caminho) for caminho in parquet.caminhos]
+        except UnicodeDecodeError:
+            logger.warning(f"🔁 Encoding '{encoding}' falhou para {arquivo.nome}, tentando o próximo...")
+            parquet.descartar()
+            saida.seek(inicio)
+            saida.truncate()
+        except Exception:
+            parquet.descartar()
+            raise
+    raise ValueError(f"❌ Não foi possível ler {arquivo.nome} com os encodings {ENCODINGS}.")
+
+
+def processar_arquivo(arquivo: FonteCSV, colunas: list[str], destino) -> dict:
+    """
+    Normaliza um CSV trimestral inteiro em um arquivo parcial sem cabeçalho (pode rodar no pool).
+
+    Returns:
+        dict: Entrada do manifesto para a fonte (linhas, parte e arquivos Parquet).
+    """
+    with open(destino, "w", encoding="utf-8", newline="") as parte:
+        linhas, parquet = anexar_arquivo(arquivo, colunas, parte)
+    return {"nome": arquivo.nome, "linhas": linhas, "parte": str(destino), "parquet": parquet}
+
+
+def carregar_manifesto() -> dict:
+    """
+    Lê o manifesto da última execução (ou um manifesto vazio, se não existir ou for de outra versão).
+    """
+    try:
+        with open(MANIFESTO, "r", encoding="utf-8") as f:
+            manifesto = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"versao": VERSAO_MANIFESTO, "colunas": [], "fontes": {}}
+    if manifesto.get("versao") != VERSAO_MANIFESTO:
+        return {"versao": VERSAO_MANIFESTO, "colunas": [], "fontes": {}}
+    return manifesto
+
+
+def salvar_manifesto(manifesto: dict) -> None:
+    MANIFESTO.parent.mkdir(parents=True, exist_ok=True)
+    temporario = MANIFESTO.with_suffix(".tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, MANIFESTO)
+
+
+def remover_saidas(entrada: dict) -> None:
+    """
+    Apaga a parte e os arquivos Parquet gerados por uma fonte.
+    """
+    Path(entrada["parte"]).unlink(missing_ok=True)
+    for caminho in entrada.get("parquet", []):
+        Path(caminho).unlink(missing_ok=True)
+
+
+def processar_fontes(fontes: list[FonteCSV], colunas: list[str], workers: int) -> dict[str, dict]:
+    """
+    Gera a parte e os Parquet de cada fonte, em sequência ou em um pool de processos.
+
+    Returns:
+        dict: Entradas do manifesto por chave da fonte.
+    """
+    PARTES_DIR.mkdir(parents=True, exist_ok=True)
+    destinos = [PARTES_DIR / f"{fonte.nome_parte}.csv" for fonte in fontes]
+    entradas = {}
+    if workers > 1 and len(fontes) > 1:
+        logger.info(f"⚙️ Processando arquivos com {workers} processo(s).")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futuros = [
+                pool.submit(processar_arquivo, fonte, colunas, destino)
+                for fonte, destino in zip(fontes, destinos)
+            ]
+            for fonte, futuro in tqdm(zip(fontes, futuros), total=len(fontes), desc="📅 Lendo arquivos"):
+                entradas[fonte.chave] = futuro.result()
+                logger.info(f"📄 Processado: {fonte.nome}")
+    else:
+        for fonte, destino in tqdm(zip(fontes, destinos), total=len(fontes), desc="📅 Lendo arquivos"):
+            logger.info(f"📄 Lendo: {fonte.nome}")
+            entradas[fonte.chave] = processar_arquivo(fonte, colunas, destino)
+    return entradas
+
+
+def montar_consolidado(fontes: list[FonteCSV], manifesto: dict) -> int:
+    """
+    Reescreve o CSV consolidado juntando as partes na ordem dos nomes das fontes.
+
+    Returns:
+        int: Quantidade total de linhas consolidadas.
+    """
+    CSV_SAIDA.parent.mkdir(parents=True, exist_ok=True)
+    temporario = CSV_SAIDA.with_suffix(".tmp")
+    total = 0
+    with open(temporario, "w", encoding="utf-8", newline="") as saida:
+        pd.DataFrame(columns=manifesto["colunas"]).to_csv(saida, sep=';', index=False)
+        for fonte in fontes:
+            entrada = manifesto["fontes"][fonte.chave]
+            with open(entrada["parte"], "r", encoding="utf-8", newline="") as origem:
+                shutil.copyfileobj(origem, saida)
+            total += entrada["linhas"]
+    os.replace(temporario, CSV_SAIDA)
+    return total
+
+
+def processar(workers: int = WORKERS, completo: bool = False):
+    """
+    Consolida as despesas processando só as fontes novas ou alteradas desde a última execução.
+
+    O manifesto guarda, por fonte, a assinatura do conteúdo, a quantidade de
+    linhas e onde ficaram sua parte normalizada e seus arquivos Parquet.
+    Fontes inalteradas reaproveitam essas saídas; as alteradas têm suas
+    partições Parquet substituídas e as removidas são apagadas. O CSV
+    consolidado é remontado a partir das partes (cópia, sem novo parsing).
+
+    Args:
+        workers (int): Processos usados nas fontes pendentes (1 = sequencial).
+        completo (bool): Reprocessa todas as fontes, ignorando o manifesto.
+    """
     logger.info("🚀 Iniciando processamento das despesas contábeis...")
-    arquivos = list(BASE_PATH.glob("*.csv"))
+    arquivos = listar_fontes()
     if not arquivos:
         logger.warning("⚠️ Nenhum arquivo CSV encontrado para processar.")
         return
 
-    dfs = []
-    for arquivo in tqdm(arquivos, desc="📅 Lendo arquivos"):
-        logger.info(f"📄 Lendo: {arquivo.name}")
-        df = ler_csv_com_fallback(arquivo)
-        df = normalizar_colunas(df)
-        df = normalizar_textos(df)
-        dfs.append(df)
-
-    df_consolidado = pd.concat(dfs, ignore_index=True)
-    logger.info(f"📊 Registros consolidados: {len(df_consolidado)}")
-    df_consolidado.to_csv(CSV_SAIDA, sep=';', index=False, encoding='utf-8')
+    # União dos cabeçalhos na ordem em que aparecem (mesma ordem do pd.concat)
+    colunas: list[str] = []
+    for arquivo in arquivos:
+        colunas += [col for col in ler_cabecalho(arquivo) if col not in colunas]
+
+    manifesto = carregar_manifesto()
+    if completo or manifesto["colunas"] != colunas:
+        # Cabeçalho mudou: todas as partes precisam ser realinhadas às novas colunas
+        for entrada in manifesto["fontes"].values():
+            remover_saidas(entrada)
+        manifesto = {"versao": VERSAO_MANIFESTO, "colunas": colunas, "fontes": {}}
+
+    assinaturas = {arquivo.chave: arquivo.assinatura() for arquivo in arquivos}
+    removidas = [chave for chave in manifesto["fontes"] if chave not in assinaturas]
+    pendentes = [
+        arquivo for arquivo in arquivos
+        if manifesto["fontes"].get(arquivo.chave, {}).get("hash") != assinaturas[arquivo.chave]
+        or not Path(manifesto["fontes"][arquivo.chave]["parte"]).exists()
+    ]
+    logger.info(
+        f"🗂️ Fontes: {len(arquivos)} | a processar: {len(pendentes)} | removidas: {len(removidas)}"
+    )
+
+    if not pendentes and not removidas and CSV_SAIDA.exists():
+        logger.info("⏭️ Nenhuma fonte nova ou alterada; saídas mantidas.")
+        return
+
+    for chave in removidas:
+        remover_saidas(manifesto["fontes"].pop(chave))
+    for arquivo in pendentes:
+        if arquivo.chave in manifesto["fontes"]:
+            remover_saidas(manifesto["fontes"].pop(arquivo.chave))
+
+    PARQUET_SAIDA.mkdir(parents=True, exist_ok=True)
+    for chave, entrada in processar_fontes(pendentes, colunas, workers).items():
+        manifesto["fontes"][chave] = {"hash": assinaturas[chave], **entrada}
+    salvar_manifesto(manifesto)
+
+    total = montar_consolidado(arquivos, manifesto)
+    logger.info(f"📊 Registros consolidados: {total}")
     logger.info(f"💾 Exportado para: {CSV_SAIDA}")
+    logger.info(f"🧱 Dataset Parquet: {PARQUET_SAIDA}")
 
 
 def main():
-    processar()
+    parser = argparse.ArgumentParser(description="Consolida os CSVs trimestrais de despesas contábeis.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Processos que leem os arquivos ao mesmo tempo (1 = sequencial).")
+    parser.add_argument("--completo", action="store_true", help="Reprocessa todas as fontes, mesmo sem alterações.")
+    args = parser.parse_args()
+
+    processar(workers=args.workers, completo=args.completo)
     logger.info("✅ Processamento finalizado.")
 
 
@@ -0,0 +1,203 @@
+import os
+import argparse
+from sqlalchemy import create_engine, inspect, text
+from dotenv import load_dotenv
+from scripts.etl_utils import limites_trimestre, setup_logger
+from tqdm import tqdm
+
+# === Carrega variáveis de ambiente e logger ===
+load_dotenv()
+logger = setup_logger("resumir_despesas", console=True)
+
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_PORT = os.getenv("MYSQL_PORT")
+MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
+
+TABELA_FATOS = "fato_despesas_contabeis"
+TABELA_RESUMO = "resumo_despesas_trimestre"
+TABELA_CONTROLE = "controle_resumo_despesas"
+# Gravado pelo import_despesas_to_mysql: assinatura de cada trimestre carregado na tabela de fatos
+TABELA_CONTROLE_IMPORT = "controle_import_despesas"
+
+
+DDL_RESUMO = f"""
+CREATE TABLE IF NOT EXISTS {TABELA_RESUMO} (
+  registro_operadora BIGINT NOT NULL,
+  ano SMALLINT NOT NULL,
+  trimestre TINYINT NOT NULL,
+  cd_conta_contabil BIGINT NOT NULL,
+  descricao VARCHAR(255) NOT NULL,
+  total_saldo_inicial DECIMAL(20,2) NOT NULL,
+  total_saldo_final DECIMAL(20,2) NOT NULL,
+  total_despesa DECIMAL(20,2) NOT NULL,
+  qtd_lancamentos INT NOT NULL,
+  PRIMARY KEY (ano, trimestre, cd_conta_contabil, registro_operadora),
+  KEY idx_conta_periodo (cd_conta_contabil, ano, trimestre),
+  KEY idx_operadora_periodo (registro_operadora, ano, trimestre)
+)
+"""
+
+DDL_CONTROLE = f"""
+CREATE TABLE IF NOT EXISTS {TABELA_CONTROLE} (
+  ano SMALLINT NOT NULL,
+  trimestre TINYINT NOT NULL,
+  qtd_linhas_origem BIGINT NOT NULL,
+  assinatura CHAR(64) NULL,
+  atualizado_em DATETIME NOT NULL,
+  PRIMARY KEY (ano, trimestre)
+)
+"""
+
+SQL_RESUMIR_TRIMESTRE = f"""
+INSERT INTO {TABELA_RESUMO} (
+  registro_operadora, ano, trimestre, cd_conta_contabil, descricao,
+  total_saldo_inicial, total_saldo_final, total_despesa, qtd_lancamentos
+)
+SELECT
+  registro_operadora,
+  :ano,
+  :trimestre,
+  cd_conta_contabil,
+  COALESCE(MAX(descricao), ''),
+  COALESCE(SUM(vl_saldo_inicial), 0),
+  COALESCE(SUM(vl_saldo_final), 0),
+  COALESCE(SUM(vl_saldo_final), 0) - COALESCE(SUM(vl_saldo_inicial), 0),
+  COUNT(*)
+FROM {TABELA_FATOS}
+WHERE data >= :inicio AND data < :fim
+GROUP BY registro_operadora, cd_conta_contabil
+"""
+
+
+def trimestres_importados(conexao) -> dict[tuple[int, int], dict] | None:
+    """
+    Trimestres da tabela de fatos segundo o controle gravado pelo import_despesas_to_mysql.
+
+    O importador registra a assinatura de cada trimestre que carrega (partição do Parquet
+    ou hash do CSV), então descobrir o que mudou não exige ler a tabela de fatos.
+
+    Returns:
+        dict | None: {(ano, trimestre): {"linhas", "assinatura"}}, ou None se o controle não existe.
+    """
+    if not inspect(conexao).has_table(TABELA_CONTROLE_IMPORT):
+        return None
+    resultado = conexao.execute(text(f"SELECT ano, trimestre, assinatura, qtd_linhas FROM {TABELA_CONTROLE_IMPORT}"))
+    return {
+        (int(ano), int(trimestre)): {"linhas": int(linhas), "assinatura": assinatura}
+        for ano, trimestre, assinatura, linhas in resultado
+    }
+
+
+def trimestres_da_tabela_fatos(conexao) -> dict[tuple[int, int], dict]:
+    """
+    Trimestres presentes na tabela de fatos, para bancos carregados antes do controle de importação.
+    Lê a tabela inteira; sem assinatura, todos são reagregados.
+    """
+    resultado = conexao.execute(text(
+        f"SELECT YEAR(data), QUARTER(data), COUNT(*) FROM {TABELA_FATOS} WHERE data IS NOT NULL "
+        "GROUP BY YEAR(data), QUARTER(data)"
+    ))
+    return {(int(ano), int(trimestre)): {"linhas": int(linhas), "assinatura": None} for ano, trimestre, linhas in resultado}
+
+
+def garantir_coluna_assinatura(conexao) -> None:
+    """
+    Adiciona `assinatura` ao controle criado por versões anteriores (só com a contagem de linhas).
+    """
+    existe = conexao.execute(text(f"SHOW COLUMNS FROM {TABELA_CONTROLE} LIKE 'assinatura'")).first()
+    if not existe:
+        conexao.execute(text(f"ALTER TABLE {TABELA_CONTROLE} ADD COLUMN assinatura CHAR(64) NULL AFTER qtd_linhas_origem"))
+
+
+def criar_engine():
+    engine_str = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+    return create_engine(engine_str)
+
+
+def resumir_despesas(completo: bool = False):
+    """
+    Atualiza as tabelas de resumo a partir de `fato_despesas_contabeis`.
+
+    Um trimestre só é reagregado quando é novo ou quando a assinatura gravada pelo
+    importador (`controle_import_despesas`) mudou desde o último resumo (ou com `completo=True`).
+    A tabela de fatos só é lida para agregar os trimestres pendentes.
+    Trimestres que saíram da tabela de fatos são removidos do resumo.
+    """
+    engine = criar_engine()
+
+    try:
+        with engine.begin() as conexao:
+            conexao.execute(text(DDL_RESUMO))
+            conexao.execute(text(DDL_CONTROLE))
+            garantir_coluna_assinatura(conexao)
+
+        with engine.connect() as conexao:
+            origem = trimestres_importados(conexao)
+            if origem is None:
+                logger.warning(
+                    f"⚠️ '{TABELA_CONTROLE_IMPORT}' não existe (carga anterior ao controle); reagregando todos os trimestres."
+                )
+                origem = trimestres_da_tabela_fatos(conexao)
+                completo = True
+            controle = {
+                (ano, trimestre): assinatura
+                for ano, trimestre, assinatura in conexao.execute(
+                    text(f"SELECT ano, trimestre, assinatura FROM {TABELA_CONTROLE}")
+                )
+            }
+
+        pendentes = sorted(
+            chave for chave, info in origem.items()
+            if completo or controle.get(chave) != info["assinatura"]
+        )
+        removidos = sorted(set(controle) - set(origem))
+        logger.info(
+            f"🧮 Trimestres na origem: {len(origem)} | a resumir: {len(pendentes)} | a remover: {len(removidos)}"
+        )
+
+        for ano, trimestre in removidos:
+            with engine.begin() as conexao:
+                filtro = {"ano": ano, "trimestre": trimestre}
+                conexao.execute(text(f"DELETE FROM {TABELA_RESUMO} WHERE ano = :ano AND trimestre = :trimestre"), filtro)
+                conexao.execute(text(f"DELETE FROM {TABELA_CONTROLE} WHERE ano = :ano AND trimestre = :trimestre"), filtro)
+            logger.info(f"🧹 Resumo removido: {trimestre}T{ano}")
+
+        for ano, trimestre in tqdm(pendentes, desc="🧮 Resumindo trimestres"):
+            info = origem[(ano, trimestre)]
+            filtro = {"ano": ano, "trimestre": trimestre}
+            # Troca o trimestre inteiro na mesma transação: leitores nunca veem o resumo pela metade
+            with engine.begin() as conexao:
+                conexao.execute(text(f"DELETE FROM {TABELA_RESUMO} WHERE ano = :ano AND trimestre = :trimestre"), filtro)
+                inicio, fim = limites_trimestre(ano, trimestre)
+                inseridos = conexao.execute(
+                    text(SQL_RESUMIR_TRIMESTRE), {**filtro, "inicio": inicio, "fim": fim}
+                ).rowcount
+                conexao.execute(
+                    text(
+                        f"REPLACE INTO {TABELA_CONTROLE} (ano, trimestre, qtd_linhas_origem, assinatura, atualizado_em) "
+                        "VALUES (:ano, :trimestre, :linhas, :assinatura, NOW())"
+                    ),
+                    {**filtro, "linhas": info["linhas"], "assinatura": info["assinatura"]},
+                )
+            logger.info(f"📦 {trimestre}T{ano}: {info['linhas']} linhas → {inseridos} linhas de resumo")
+
+        logger.info(f"✅ Tabela '{TABELA_RESUMO}' atualizada.")
+    except Exception as e:
+        logger.exception(f"❌ Erro ao resumir despesas: {e}")
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza as tabelas de resumo das despesas contábeis.")
+    parser.add_argument("--completo", action="store_true", help="Reagrega todos os trimestres, mesmo sem alterações.")
+    args = parser.parse_args()
+
+    logger.info("🚀 Iniciando resumo das despesas contábeis...")
+    resumir_despesas(completo=args.completo)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,138 @@
 
+import os
 import pdfplumber
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
+from typing import Iterable, Iterator
 import logging
 from scripts.etl_utils import setup_logger
+from scripts.cache_paginas import ler_pagina, gravar_pagina
 logger = setup_logger(__name__, console=True)
 
 logger.info('🚀 Iniciando script...')
 
+# Configurações do extract_table() (vazio = padrão do pdfplumber); fazem parte da chave do cache
+TABLE_SETTINGS: dict = {}
+# Páginas por tarefa do pool: tamanho fixo, então o que fica em memória não depende do tamanho do PDF
+PAGINAS_POR_TAREFA = int(os.getenv("ETAPA2_PAGINAS_POR_TAREFA", 8))
 
-def detectar_paginas_com_tabelas(pdf_path: Path) -> list[int]:
-    paginas_validas = []
-    if not pdf_path.exists():
-        logging.warning(f"Arquivo não encontrado: {pdf_path}")
-        return []
+
+def tabela_valida(table: list[list] | None) -> bool:
+    """
+    Uma página é considerada com tabela quando há cabeçalho, ao menos uma linha e mais de duas colunas.
+    """
+    return bool(table) and len(table) > 1 and len(table[0]) > 2
+
+
+def varrer_paginas(
+    pdf_path: Path, paginas: Iterable[int] | None = None, cache: dict | None = None
+) -> Iterator[tuple[int, list[list] | None, Exception | None]]:
+    """
+    Percorre as páginas do PDF executando `extract_table()` uma única vez por página.
+
+    É o motor comum do scanner (só detecção) e da Etapa 2 (detecção + extração):
+    quem consome decide o que fazer com a tabela, sem reprocessar a página.
+
+    Args:
+        pdf_path (Path): Caminho do PDF.
+        paginas (Iterable[int] | None): Números das páginas (1-based). None percorre todas.
+        cache (dict | None): Configuração de `cache_paginas.configurar_cache`. Páginas
+            em cache não são reprocessadas; falhas nunca são gravadas, então são
+            sempre tentadas de novo.
+
+    Yields:
+        tuple: (número da página, tabela extraída ou None, exceção ocorrida ou None).
+    """
     with pdfplumber.open(pdf_path) as pdf:
-        for i, page in enumerate(pdf.pages):
+        numeros = paginas if paginas is not None else range(1, len(pdf.pages) + 1)
+        for numero in numeros:
+            if cache is not None:
+                encontrada, table = ler_pagina(cache, numero)
+                if encontrada:
+                    yield numero, table, None
+                    continue
+
+            page = pdf.pages[numero - 1]
             try:
-                table = page.extract_table()
-                if table and len(table) > 1 and len(table[0]) > 2:
-                    paginas_validas.append(i + 1)
+                table, erro = page.extract_table(TABLE_SETTINGS), None
             except Exception as e:
-                logging.warning(f"Erro na página {i + 1}: {e}")
+                table, erro = None, e
+            # Libera o cache de objetos da página: a memória não cresce com o tamanho do PDF
+            page.close()
+            if cache is not None and erro is None:
+                gravar_pagina(cache, numero, table)
+            yield numero, table, erro
+
+
+def _varrer_intervalo(
+    pdf_path: Path, paginas: list[int], cache: dict | None = None
+) -> list[tuple[int, list[list] | None, Exception | None]]:
+    """
+    Tarefa de um processo do pool: abre o PDF por conta própria e varre um intervalo de páginas.
+    """
+    # Exceções do pdfminer nem sempre são serializáveis: devolve só a mensagem
+    return [
+        (numero, table, None if erro is None else RuntimeError(str(erro)))
+        for numero, table, erro in varrer_paginas(pdf_path, paginas, cache)
+    ]
+
+
+def dividir_em_lotes(paginas: Iterable[int], tamanho: int) -> Iterator[list[int]]:
+    """
+    Divide as páginas em lotes contíguos de até `tamanho` páginas, sem materializar a lista inteira.
+    """
+    iterador = iter(paginas)
+    while lote := list(islice(iterador, max(tamanho, 1))):
+        yield lote
+
+
+def varrer_paginas_em_paralelo(
+    pdf_path: Path,
+    paginas: Iterable[int] | None = None,
+    workers: int = 1,
+    cache: dict | None = None,
+    paginas_por_tarefa: int = PAGINAS_POR_TAREFA,
+) -> Iterator[tuple[int, list[list] | None, Exception | None]]:
+    """
+    Versão de `varrer_paginas` que distribui intervalos de páginas entre processos.
+
+    Cada processo abre o PDF sozinho. Os resultados são devolvidos na ordem das
+    páginas, então quem consome recebe exatamente a mesma sequência da versão sequencial.
+    As tarefas têm `paginas_por_tarefa` páginas e só `2 * workers` ficam em andamento
+    ao mesmo tempo: no máximo `2 * workers * paginas_por_tarefa` tabelas em memória,
+    qualquer que seja o número de páginas do PDF.
+    Com `workers <= 1` delega para `varrer_paginas`.
+    """
+    if workers <= 1:
+        yield from varrer_paginas(pdf_path, paginas, cache)
+        return
+
+    if paginas is None:
+        with pdfplumber.open(pdf_path) as pdf:
+            paginas = range(1, len(pdf.pages) + 1)
+
+    pendentes = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for lote in dividir_em_lotes(paginas, paginas_por_tarefa):
+            pendentes.append(executor.submit(_varrer_intervalo, pdf_path, lote, cache))
+            if len(pendentes) >= 2 * workers:
+                yield from pendentes.popleft().result()
+        while pendentes:
+            yield from pendentes.popleft().result()
+
+
+def detectar_paginas_com_tabelas(pdf_path: Path, workers: int = 1) -> list[int]:
+    if not pdf_path.exists():
+        logging.warning(f"Arquivo não encontrado: {pdf_path}")
+        return []
+    paginas_validas = []
+    for numero, table, erro in varrer_paginas_em_paralelo(pdf_path, workers=workers):
+        if erro is not None:
+            logging.warning(f"Erro na página {numero}: {erro}")
+        elif tabela_valida(table):
+            paginas_validas.append(numero)
     return paginas_validas
 
 def main():
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# A API roda a partir de api/ (uvicorn main:app), então os serviços são importados dali
+api_dir = Path(__file__).resolve().parent.parent / "api"
+if str(api_dir) not in sys.path:
+    sys.path.insert(0, str(api_dir))
+
+pytest.importorskip("sqlalchemy.ext.asyncio")
+
+from services.banco import COLUNA_ORDEM, montar_sql_busca, termo_booleano
+
+
+def test_contem_ordena_pela_ordem_do_arquivo():
+    sql, parametros = montar_sql_busca("Amil", "contem", 10, 20)
+
+    assert f"ORDER BY {COLUNA_ORDEM}" in sql
+    assert "registro_operadora" not in sql
+    assert "MATCH(razao_social) AGAINST (:frase IN BOOLEAN MODE)" in sql
+    assert "razao_social LIKE :like" in sql
+    assert parametros == {"limit": 10, "offset": 20, "like": "%Amil%", "frase": '"Amil"'}
+
+
+def test_contem_escapa_curingas_e_pula_fulltext_em_termo_curto():
+    sql, parametros = montar_sql_busca("a%", "contem", 5, 0)
+    assert parametros["like"] == "%a\\%%"
+    assert "MATCH" in sql
+
+    sql, parametros = montar_sql_busca("a", "contem", 5, 0)
+    assert "MATCH" not in sql
+    assert "frase" not in parametros
+
+
+def test_relevancia_usa_modo_booleano_com_limiar():
+    sql, parametros = montar_sql_busca("unimde", "relevancia", 10, 0)
+
+    assert "IN BOOLEAN MODE" in sql
+    assert "NATURAL LANGUAGE" not in sql
+    assert "score >= :limiar * score_maximo" in sql
+    assert f"ORDER BY score DESC, {COLUNA_ORDEM}" in sql
+    assert parametros == {"limit": 10, "offset": 0, "termo": "unimde", "limiar": 0.2}
+
+
+def test_relevancia_le_limiar_do_ambiente(monkeypatch):
+    monkeypatch.setenv("BUSCA_MYSQL_LIMIAR", "0.5")
+    _, parametros = montar_sql_busca("amil", "relevancia", 10, 0)
+    assert parametros["limiar"] == 0.5
+
+
+def test_relevancia_remove_operadores_booleanos():
+    assert termo_booleano('+amil -"saúde" (sp)* ~x @2') == "amil saúde sp x 2"
+
+    _, parametros = montar_sql_busca("-unimed*", "relevancia", 10, 0)
+    assert parametros["termo"] == "unimed"
+
+
+def test_relevancia_sem_termo_pesquisavel_nao_consulta():
+    assert montar_sql_busca("  +-* ", "relevancia", 10, 0) is None
@@ -0,0 +1,113 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# A API roda a partir de api/ (uvicorn main:app), então os serviços são importados dali
+api_dir = Path(__file__).resolve().parent.parent / "api"
+if str(api_dir) not in sys.path:
+    sys.path.insert(0, str(api_dir))
+
+from services.busca import IndiceBusca, IndiceRelevancia, normalizar
+from services.snapshot import GerenciadorSnapshot
+
+
+def criar_df():
+    return pd.DataFrame({
+        "razao_social": [
+            "UNIMED SÃO PAULO COOPERATIVA",
+            "Amil Assistência Médica",
+            None,
+            "Bradesco Saúde S.A.",
+            "SAÚDE CAIXA",
+            "Odonto Sorriso",
+        ],
+        "nome_fantasia": ["Unimed SP", None, "Hapvida", "Bradesco", "Caixa", "Sorriso Odonto"],
+    })
+
+
+def busca_linear(df, consulta):
+    termo = normalizar(consulta)
+    return [i for i, valor in enumerate(df["razao_social"]) if termo in normalizar(valor)]
+
+
+def test_busca_mantem_semantica_de_contem():
+    df = criar_df()
+    indice = IndiceBusca(df, "razao_social")
+    for consulta in ["saude", "SAÚDE", "  medica ", "sa", "", "unimed sao", "xyz", "o s"]:
+        assert indice.buscar(consulta) == busca_linear(df, consulta)
+
+
+def test_busca_respeita_limite_na_ordem_do_arquivo():
+    df = criar_df()
+    indice = IndiceBusca(df, "razao_social")
+    assert indice.buscar("a", limite=2) == [0, 1]
+
+
+def test_relevancia_tolera_erros_e_ordem_das_palavras():
+    indice = IndiceRelevancia(criar_df(), ["razao_social", "nome_fantasia"])
+    assert indice.buscar("paulo unimde")[0][0] == 0
+    assert indice.buscar("caixa saude")[0][0] == 4
+    assert indice.buscar("hapvida")[0][0] == 2
+
+
+def test_relevancia_pagina_igual_ao_ranking_completo():
+    indice = IndiceRelevancia(criar_df(), ["razao_social", "nome_fantasia"])
+    completo = indice.buscar("saude odonto", limite=100)
+    assert indice.buscar("saude odonto", limite=1, deslocamento=1) == completo[1:2]
+    assert [p for p, _ in completo] == sorted(
+        [p for p, _ in completo], key=lambda p: (-dict(completo)[p], p)
+    )
+
+
+def test_gerenciador_recarrega_quando_o_csv_muda(tmp_path):
+    caminho = tmp_path / "Relatorio_cadop.csv"
+    caminho.write_text("Registro_ANS;Razao_Social;Nome_Fantasia\n1;SAÚDE CAIXA;Caixa\n", encoding="utf-8")
+    gerenciador = GerenciadorSnapshot(caminho, intervalo=0)
+    anterior = gerenciador.atual
+
+    assert gerenciador.verificar() is False
+
+    caminho.write_text(
+        "Registro_ANS;Razao_Social;Nome_Fantasia\n1;SAÚDE CAIXA;Caixa\n2;NOVA SAÚDE;Nova\n", encoding="utf-8"
+    )
+    assert gerenciador.verificar() is True
+    assert gerenciador.atual.versao != anterior.versao
+    assert gerenciador.atual.indice_busca.buscar("saude") == [0, 1]
+    # O snapshot antigo continua íntegro para requisições que já o obtiveram
+    assert anterior.indice_busca.buscar("saude") == [0]
+
+
+def ranking_exaustivo(df, campos, consulta, limite, deslocamento, limiar=0.2):
+    from services.busca import gerar_trigramas_palavras
+
+    trigramas_consulta = gerar_trigramas_palavras(consulta)
+    pontuacoes = []
+    for linha, valores in enumerate(zip(*(df[campo].tolist() for campo in campos))):
+        pontuacao = 0.0
+        for valor in valores:
+            trigramas = gerar_trigramas_palavras(valor)
+            if trigramas & trigramas_consulta:
+                pontuacao = max(pontuacao, len(trigramas & trigramas_consulta) / len(trigramas | trigramas_consulta))
+        if pontuacao >= limiar:
+            pontuacoes.append((linha, pontuacao))
+    pontuacoes.sort(key=lambda item: (-item[1], item[0]))
+    return [(linha, round(p, 4)) for linha, p in pontuacoes[deslocamento:deslocamento + limite]]
+
+
+def test_relevancia_com_parada_antecipada_igual_ao_ranking_exaustivo():
+    import random
+
+    gerador = random.Random(7)
+    palavras = ["saude", "unimed", "amil", "odonto", "sorriso", "medica", "vida", "plano", "caixa", "bradesco", "sul", "norte"]
+    df = pd.DataFrame({
+        "razao_social": [" ".join(gerador.choices(palavras, k=gerador.randint(1, 4))) for _ in range(400)],
+        "nome_fantasia": [" ".join(gerador.choices(palavras, k=gerador.randint(0, 2))) or None for _ in range(400)],
+    })
+    campos = ["razao_social", "nome_fantasia"]
+    indice = IndiceRelevancia(df, campos)
+    for consulta in ["saude", "unimde vida", "plano odonto sul", "caixa", "xyz", "medica saude norte"]:
+        for limite, deslocamento in [(1, 0), (10, 0), (5, 7), (1000, 0)]:
+            assert indice.buscar(consulta, limite=limite, deslocamento=deslocamento) == ranking_exaustivo(
+                df, campos, consulta, limite, deslocamento
+            )
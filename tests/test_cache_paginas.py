@@ -0,0 +1,119 @@
+import os
+import sys
+
+import pytest
+
+import scripts.cache_paginas as cache_paginas
+import scripts.extract_tables as etapa2
+import scripts.scan_pdf_tables as scanner
+from scripts.cache_paginas import aplicar_limite_cache, caminho_pagina, configurar_cache, gravar_pagina, ler_pagina
+
+
+class PaginaFalsa:
+    def __init__(self, numero, extraidas):
+        self.numero = numero
+        self.extraidas = extraidas
+
+    def extract_table(self, settings):
+        self.extraidas.append(self.numero)
+        return [["a", "b", "c"], [str(self.numero), "x", "y"]]
+
+    def close(self):
+        pass
+
+
+class PdfFalso:
+    def __init__(self, paginas, extraidas):
+        self.pages = [PaginaFalsa(numero, extraidas) for numero in range(1, paginas + 1)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    caminho = tmp_path / "anexo.pdf"
+    caminho.write_bytes(b"%PDF-1.4 conteudo")
+    return caminho
+
+
+@pytest.fixture
+def extraidas(monkeypatch):
+    extraidas = []
+    monkeypatch.setattr(scanner.pdfplumber, "open", lambda caminho: PdfFalso(3, extraidas))
+    return extraidas
+
+
+def test_segunda_varredura_vem_do_cache(pdf, tmp_path, extraidas):
+    cache = configurar_cache(pdf, {}, tmp_path / "cache")
+
+    primeira = list(scanner.varrer_paginas(pdf, cache=cache))
+    segunda = list(scanner.varrer_paginas(pdf, cache=cache))
+
+    assert extraidas == [1, 2, 3]
+    assert segunda == primeira
+    assert ler_pagina(cache, 2) == (True, [["a", "b", "c"], ["2", "x", "y"]])
+
+
+def test_sem_cache_sempre_extrai(pdf, tmp_path, extraidas):
+    cache = configurar_cache(pdf, {}, tmp_path / "cache")
+    gravar_pagina(cache, 1, [["antiga"]])
+
+    list(scanner.varrer_paginas(pdf, cache=None))
+
+    assert extraidas == [1, 2, 3]
+
+
+def test_chave_muda_com_pdf_versao_e_configuracao(pdf, tmp_path, monkeypatch):
+    diretorio = tmp_path / "cache"
+    original = configurar_cache(pdf, {"snap_tolerance": 3}, diretorio)
+    gravar_pagina(original, 1, [["x"]])
+
+    assert ler_pagina(configurar_cache(pdf, {"snap_tolerance": 3}, diretorio), 1) == (True, [["x"]])
+    assert ler_pagina(configurar_cache(pdf, {"snap_tolerance": 4}, diretorio), 1) == (False, None)
+
+    with monkeypatch.context() as m:
+        m.setattr(cache_paginas.pdfplumber, "__version__", "0.0.1")
+        assert ler_pagina(configurar_cache(pdf, {"snap_tolerance": 3}, diretorio), 1) == (False, None)
+
+    pdf.write_bytes(b"%PDF-1.4 outro conteudo")
+    assert ler_pagina(configurar_cache(pdf, {"snap_tolerance": 3}, diretorio), 1) == (False, None)
+
+
+def test_limite_remove_primeiro_as_entradas_usadas_ha_mais_tempo(pdf, tmp_path):
+    diretorio = tmp_path / "cache"
+    cache = configurar_cache(pdf, {}, diretorio)
+    for pagina in (1, 2, 3):
+        gravar_pagina(cache, pagina, [["x" * 400_000]])
+        os.utime(caminho_pagina(cache, pagina), (1000 + pagina, 1000 + pagina))
+    # Leitura renova a entrada mais antiga
+    assert ler_pagina(cache, 1)[0]
+
+    assert aplicar_limite_cache(diretorio, max_mb=1) == 1
+
+    assert not caminho_pagina(cache, 2).exists()
+    assert caminho_pagina(cache, 1).exists() and caminho_pagina(cache, 3).exists()
+    assert aplicar_limite_cache(diretorio, max_mb=1) == 0
+
+
+@pytest.mark.parametrize("argumentos, usa_cache", [([], True), (["--no-cache"], False)])
+def test_no_cache_na_linha_de_comando(pdf, monkeypatch, argumentos, usa_cache):
+    recebido = {}
+
+    def extrair(pdf_path, workers=1, cache=None):
+        recebido["cache"] = cache
+        return [], [], []
+
+    monkeypatch.setattr(sys, "argv", ["extract_tables.py", "--workers", "1", *argumentos])
+    monkeypatch.setattr(etapa2, "extrair_zip_anexos", lambda *args: None)
+    monkeypatch.setattr(etapa2, "PDF_PATH", pdf)
+    monkeypatch.setattr(etapa2, "STREAMING", False)
+    monkeypatch.setattr(etapa2, "configurar_cache", lambda pdf_path, settings: {"diretorio": "x", "prefixo": "y"})
+    monkeypatch.setattr(etapa2, "extrair_tabelas_em_passada_unica", extrair)
+
+    etapa2.main()
+
+    assert (recebido["cache"] is not None) == usa_cache
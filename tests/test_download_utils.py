@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import importlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scripts.download_utils import ClienteDownload, arquivo_integro, caminho_parcial, ler_manifesto
+
+ARQUIVOS = {
+    "/indice/": b'<a href="2022/">2022/</a> <a href="2023/">2023/</a>',
+    "/indice/2023/": b'<a href="1T2023.zip">1T2023.zip</a> <a href="leiame.txt">leiame</a>',
+    "/2023/1T2023.zip": b"zip" * 1000,
+    "/2023/2T2023.zip": b"outro zip",
+    "/lento.zip": b"x" * 30,
+}
+
+
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    falhas: dict[str, int] = {}
+    # Respostas cortadas na metade (conexão encerrada antes do fim)
+    quedas: dict[str, int] = {}
+    requisicoes: list[str] = []
+    ranges: list[str | None] = []
+    # Responde "Content-Range: bytes x-y/*" (tamanho total desconhecido)
+    total_desconhecido = False
+
+    def do_GET(self):
+        self.requisicoes.append(self.path)
+        self.ranges.append(self.headers.get("Range"))
+        if self.falhas.get(self.path, 0) > 0:
+            self.falhas[self.path] -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        corpo = ARQUIVOS.get(self.path)
+        if corpo is None:
+            self.send_error(404)
+            return
+
+        inicio = 0
+        intervalo = self.headers.get("Range")
+        if intervalo and self.headers.get("If-Range") == ETAG:
+            inicio = int(intervalo.removeprefix("bytes=").rstrip("-"))
+            self.send_response(206)
+            total = "*" if self.total_desconhecido else len(corpo)
+            self.send_header("Content-Range", f"bytes {inicio}-{len(corpo) - 1}/{total}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(corpo) - inicio))
+        self.end_headers()
+        if self.path == "/lento.zip":
+            # Corpo enviado aos poucos: nenhuma leitura demora, mas o total passa do timeout
+            for i in range(0, len(corpo) - inicio, 5):
+                self.wfile.write(corpo[inicio + i:inicio + i + 5])
+                self.wfile.flush()
+                time.sleep(0.3)
+            return
+        if self.quedas.get(self.path, 0) > 0:
+            self.quedas[self.path] -= 1
+            self.wfile.write(corpo[inicio:inicio + (len(corpo) - inicio) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(corpo[inicio:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    Handler.falhas = {}
+    Handler.quedas = {}
+    Handler.requisicoes = []
+    Handler.ranges = []
+    Handler.total_desconhecido = False
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_baixar_varios_em_paralelo(servidor, tmp_path):
+    async def rodar():
+        async with ClienteDownload(backoff=0) as cliente:
+            indice = await cliente.buscar_texto(f"{servidor}/indice/")
+            resultados = await cliente.baixar_varios([
+                (f"{servidor}/2023/1T2023.zip", tmp_path / "1T2023.zip"),
+                (f"{servidor}/2023/2T2023.zip", tmp_path / "2T2023.zip"),
+                (f"{servidor}/2023/3T2023.zip", tmp_path / "3T2023.zip"),
+            ])
+        return indice, resultados
+
+    indice, resultados = asyncio.run(rodar())
+
+    assert "2023/" in indice
+    assert (tmp_path / "1T2023.zip").read_bytes() == ARQUIVOS["/2023/1T2023.zip"]
+    assert (tmp_path / "2T2023.zip").read_bytes() == ARQUIVOS["/2023/2T2023.zip"]
+    assert resultados[:2] == [tmp_path / "1T2023.zip", tmp_path / "2T2023.zip"]
+    assert isinstance(resultados[2], Exception)
+    assert not (tmp_path / "3T2023.zip").exists()
+    # 404 não é repetido
+    assert Handler.requisicoes.count("/2023/3T2023.zip") == 1
+
+
+def test_nova_tentativa_em_erro_temporario(servidor):
+    Handler.falhas = {"/indice/": 2}
+
+    async def rodar(tentativas):
+        async with ClienteDownload(tentativas=tentativas, backoff=0) as cliente:
+            return await cliente.buscar_texto(f"{servidor}/indice/")
+
+    assert "2023/" in asyncio.run(rodar(3))
+    assert Handler.requisicoes.count("/indice/") == 3
+
+    Handler.falhas = {"/indice/": 5}
+    with pytest.raises(Exception, match="503"):
+        asyncio.run(rodar(2))
+
+
+def test_encontrar_arquivos_zip_percorre_os_anos(servidor, monkeypatch):
+    monkeypatch.setenv("DEMO_ANOS_RETROATIVOS", "2")
+    demonstracoes = importlib.import_module("scripts.download_demonstracoes_contabeis")
+
+    async def rodar():
+        async with ClienteDownload(backoff=0) as cliente:
+            return await demonstracoes.encontrar_arquivos_zip(cliente, f"{servidor}/indice/", anos=["2022", "2023"])
+
+    # 2022 responde 404: o erro é registrado e os outros anos continuam
+    assert asyncio.run(rodar()) == [f"{servidor}/indice/2023/1T2023.zip"]
+
+
+@pytest.mark.parametrize("total_desconhecido", [False, True])
+def test_download_interrompido_continua_com_range(servidor, tmp_path, total_desconhecido):
+    Handler.total_desconhecido = total_desconhecido
+    url = f"{servidor}/2023/1T2023.zip"
+    destino = tmp_path / "1T2023.zip"
+    corpo = ARQUIVOS["/2023/1T2023.zip"]
+    Handler.quedas = {"/2023/1T2023.zip": 1}
+
+    async def rodar(tentativas):
+        async with ClienteDownload(tentativas=tentativas, backoff=0) as cliente:
+            return await cliente.baixar(url, destino)
+
+    # Primeira execução cai no meio e desiste: fica só o .part
+    with pytest.raises(Exception):
+        asyncio.run(rodar(1))
+    assert not destino.exists()
+    assert caminho_parcial(destino).stat().st_size == len(corpo) // 2
+    assert not arquivo_integro(destino)
+
+    # Segunda execução pede só o restante
+    assert asyncio.run(rodar(1)) == destino
+    assert Handler.ranges[-1] == f"bytes={len(corpo) // 2}-"
+    assert destino.read_bytes() == corpo
+    assert not caminho_parcial(destino).exists()
+    manifesto = ler_manifesto(destino)
+    assert manifesto["tamanho"] == len(corpo)
+    assert manifesto["sha256"] == hashlib.sha256(corpo).hexdigest()
+    assert arquivo_integro(destino)
+
+    # Arquivo corrompido depois do download não passa na verificação
+    destino.write_bytes(corpo[:-1] + b"?")
+    assert not arquivo_integro(destino)
+
+
+def test_hash_divergente_descarta_o_download(servidor, tmp_path):
+    destino = tmp_path / "2T2023.zip"
+
+    async def rodar():
+        async with ClienteDownload(backoff=0) as cliente:
+            return await cliente.baixar(f"{servidor}/2023/2T2023.zip", destino, sha256_esperado="0" * 64)
+
+    with pytest.raises(ValueError, match="SHA-256"):
+        asyncio.run(rodar())
+    assert not destino.exists()
+    assert not caminho_parcial(destino).exists()
+
+
+def test_timeout_vale_por_leitura_e_nao_para_o_download_inteiro(servidor, tmp_path):
+    async def rodar():
+        async with ClienteDownload(tentativas=1, timeout=1) as cliente:
+            return await cliente.baixar(f"{servidor}/lento.zip", tmp_path / "lento.zip")
+
+    assert asyncio.run(rodar()).read_bytes() == ARQUIVOS["/lento.zip"]
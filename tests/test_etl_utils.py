@@ -0,0 +1,119 @@
+import pandas as pd
+import pytest
+
+from scripts.etl_utils import (
+    ALIASES_COLUNAS_OPERADORAS,
+    detectar_encoding,
+    gerar_create_table,
+    gerar_ddl_despesas,
+    ler_em_segundo_plano,
+    normalizar_serie,
+    normalizar_texto,
+    substituir_siglas,
+)
+
+
+def test_substituir_siglas_somente_nas_colunas_de_segmentacao():
+    df = pd.DataFrame({
+        "PROCEDIMENTO": ["CONSULTA ODONTOLOGICA", "OD", "AMB"],
+        "OD": ["OD", None, " OD "],
+        "AMB": ["AMB", "", "AMBULATORIO"],
+    })
+    resultado = substituir_siglas(df)
+
+    assert resultado["PROCEDIMENTO"].tolist() == ["CONSULTA ODONTOLOGICA", "OD", "AMB"]
+    assert resultado["OD"].tolist() == ["Seg. Odontológica", None, "Seg. Odontológica"]
+    assert resultado["AMB"].tolist() == ["Seg. Ambulatorial", "", "AMBULATORIO"]
+
+
+def test_substituir_siglas_com_colunas_configuradas():
+    df = pd.DataFrame({"Segmentação": ["OD", "AMB"], "OD": ["OD", "OD"]})
+    resultado = substituir_siglas(df, colunas=["Segmentação"])
+
+    assert resultado["Segmentação"].tolist() == ["Seg. Odontológica", "Seg. Ambulatorial"]
+    assert resultado["OD"].tolist() == ["OD", "OD"]
+
+
+def test_normalizar_serie_igual_a_normalizar_texto():
+    valores = ["  Saúde Médico ", "AÇÃO", "ﬁscal", "Saúde Médico", None, 3, float("nan"), " Prêmio ", ""]
+    serie = pd.Series(valores, name="DESCRICAO")
+    resultado = normalizar_serie(serie)
+
+    esperado = [normalizar_texto(v) for v in valores]
+    assert resultado.name == "DESCRICAO"
+    assert resultado.tolist()[:6] == esperado[:6]
+    assert pd.isna(resultado.iloc[6])
+    assert resultado.tolist()[7:] == esperado[7:]
+
+
+def test_detectar_encoding_olha_o_fim_do_arquivo(tmp_path):
+    caminho = tmp_path / "despesas.csv"
+    caminho.write_bytes(b"DATA;DESCRICAO\n" + b"2023-01-01;texto ascii\n" * 50000 + "2023-01-01;Saúde\n".encode("latin1"))
+    assert detectar_encoding(caminho, tamanho_amostra=4096) == "latin1"
+
+    caminho.write_bytes("DATA;DESCRICAO\n2023-01-01;Saúde\n".encode("utf-8"))
+    assert detectar_encoding(caminho) == "utf-8"
+
+
+def test_detectar_encoding_amostra_no_meio_de_um_caractere(tmp_path):
+    tamanho_amostra = 4096
+    corpo = b"DATA;DESCRICAO\n" + "2023-01-01;Saúde médica\n".encode("utf-8") * 2000
+
+    # Procura um preenchimento que faça a amostra do meio começar num byte de continuação
+    for preenchimento in range(64):
+        conteudo = b"x" * preenchimento + corpo
+        if 0x80 <= conteudo[len(conteudo) // 2 - tamanho_amostra // 2] <= 0xBF:
+            break
+    else:
+        pytest.fail("nenhum preenchimento cai no meio de um caractere")
+
+    caminho = tmp_path / "despesas.csv"
+    caminho.write_bytes(conteudo)
+    assert detectar_encoding(caminho, tamanho_amostra=tamanho_amostra) == "utf-8"
+
+
+def test_ler_em_segundo_plano_preserva_ordem_e_erros():
+    assert list(ler_em_segundo_plano(iter(range(5)))) == [0, 1, 2, 3, 4]
+
+    def falha():
+        yield 1
+        raise ValueError("chunk inválido")
+
+    with pytest.raises(ValueError, match="chunk inválido"):
+        list(ler_em_segundo_plano(falha()))
+
+
+def test_gerar_ddl_despesas_com_chave_indices_e_particoes():
+    sql = gerar_ddl_despesas("fato_despesas_contabeis", [2024, 2023, 2024])
+
+    assert "`vl_saldo_final` DECIMAL(20,2) NULL" in sql
+    assert "PRIMARY KEY (`data`, `registro_operadora`, `cd_conta_contabil`)" in sql
+    assert "KEY `idx_operadora_data` (`registro_operadora`, `data`)" in sql
+    assert "KEY `idx_conta_data` (`cd_conta_contabil`, `data`)" in sql
+    assert "PARTITION BY RANGE (YEAR(`data`))" in sql
+    particoes = [linha.strip() for linha in sql.splitlines() if linha.strip().startswith("PARTITION p")]
+    assert particoes == [
+        "PARTITION p2023 VALUES LESS THAN (2024),",
+        "PARTITION p2024 VALUES LESS THAN (2025),",
+        "PARTITION pmax VALUES LESS THAN MAXVALUE",
+    ]
+    assert sql.count(";") == 1
+
+
+def test_gerar_create_table_com_chave_primaria_e_aliases():
+    dicionario = pd.DataFrame({
+        "Nome do Campo": ["Registro_ANS", "Razao_Social"],
+        "Tipo": ["Número", "Texto"],
+        "Tamanho": [6, 140],
+    })
+    sql = gerar_create_table(
+        dicionario, "cadastro_operadoras", chave_primaria="registro_operadora", aliases=ALIASES_COLUNAS_OPERADORAS
+    )
+
+    assert "`registro_operadora` INT NOT NULL" in sql
+    assert "`registro_ans`" not in sql
+    assert "PRIMARY KEY (`registro_operadora`)" in sql
+
+    sql = gerar_create_table(dicionario, "cadastro_operadoras", chave_primaria="registro_operadora", coluna_ordem="ordem_arquivo")
+    assert "`ordem_arquivo` INT UNSIGNED NOT NULL" in sql
+    assert "UNIQUE KEY `idx_ordem_arquivo` (`ordem_arquivo`)" in sql
@@ -0,0 +1,105 @@
+import zipfile
+
+import pandas as pd
+import pytest
+
+import scripts.extract_tables as etapa2
+from scripts.scan_pdf_tables import detectar_paginas_com_tabelas, varrer_paginas
+
+
+@pytest.fixture
+def saidas(tmp_path, monkeypatch):
+    monkeypatch.setattr(etapa2, "CSV_PATH", tmp_path / "rol_procedimentos.csv")
+    monkeypatch.setattr(etapa2, "ZIP_OUT", tmp_path / "Teste.zip")
+    monkeypatch.setattr(etapa2, "COLUNAS_SIGLAS", None)
+    return tmp_path
+
+
+def tabelas_por_pagina():
+    return [
+        etapa2.montar_dataframe([["PROCEDIMENTO", "OD", "AMB"], ["Consulta", "OD", "AMB"], ["Exame", "", "AMB"]], 1),
+        # Coluna que só aparece a partir da segunda página
+        etapa2.montar_dataframe([["PROCEDIMENTO", "OD", "AMB", "RN\n(alteração)"], ["Cirurgia", "OD", "", "465"]], 2),
+        etapa2.montar_dataframe([["PROCEDIMENTO", "OD"], ["Raio X", "OD"]], 3),
+    ]
+
+
+def test_streaming_gera_o_mesmo_csv_e_zip_que_o_modo_em_memoria(saidas):
+    etapa2.exportar_csv_e_zip(tabelas_por_pagina())
+    esperado = etapa2.CSV_PATH.read_bytes()
+
+    assert etapa2.exportar_csv_e_zip_streaming(iter(tabelas_por_pagina())) == 3
+    gerado = etapa2.CSV_PATH.read_bytes()
+
+    assert gerado == esperado
+    with zipfile.ZipFile(etapa2.ZIP_OUT) as zipf:
+        assert zipf.namelist() == [etapa2.CSV_PATH.name]
+        assert zipf.read(etapa2.CSV_PATH.name) == gerado
+
+    df = pd.read_csv(etapa2.CSV_PATH, dtype=str, keep_default_na=False)
+    # Cabeçalho completo: a coluna nova da página 2 não é descartada
+    assert list(df.columns) == ["PROCEDIMENTO", "OD", "AMB", "pagina", "RN (alteração)"]
+    assert df["RN (alteração)"].tolist() == ["", "", "465", ""]
+    assert df["OD"].tolist() == ["Seg. Odontológica", "", "Seg. Odontológica", "Seg. Odontológica"]
+    assert df["pagina"].tolist() == ["1", "1", "2", "3"]
+
+
+def test_streaming_sem_tabelas_nao_gera_arquivos(saidas):
+    assert etapa2.exportar_csv_e_zip_streaming(iter([])) == 0
+    assert not etapa2.CSV_PATH.exists()
+    assert not etapa2.ZIP_OUT.exists()
+
+
+def gerar_pdf(caminho):
+    """
+    PDF com páginas de tabela (3 colunas), uma tabela de 2 colunas (inválida) e uma página só de texto.
+    """
+    canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+    pdf = canvas.Canvas(str(caminho))
+    paginas = [
+        [["Código", "Procedimento", "OD"], ["1", "Consulta", "OD"], ["2", "Exame", ""]],
+        None,
+        [["Código", "Procedimento"], ["3", "Curativo"]],
+        [["Código", "Procedimento", "OD"], ["4", "Raio X", "OD"], ["5", "Sutura", "OD"], ["6", "Biópsia", ""]],
+    ]
+    for linhas in paginas:
+        if linhas is None:
+            pdf.drawString(72, 700, "Página sem tabela")
+        else:
+            largura, altura = 150, 20
+            topo = 700
+            colunas = len(linhas[0])
+            for i in range(len(linhas) + 1):
+                pdf.line(72, topo - i * altura, 72 + colunas * largura, topo - i * altura)
+            for j in range(colunas + 1):
+                pdf.line(72 + j * largura, topo, 72 + j * largura, topo - len(linhas) * altura)
+            for i, linha in enumerate(linhas):
+                for j, valor in enumerate(linha):
+                    pdf.drawString(76 + j * largura, topo - (i + 1) * altura + 6, valor)
+        pdf.showPage()
+    pdf.save()
+
+
+def detectar_e_extrair(pdf_path):
+    """
+    Pipeline antigo, mantido só como referência: detecta as páginas e depois extrai cada uma de novo.
+    """
+    paginas = detectar_paginas_com_tabelas(pdf_path)
+    tabelas = [etapa2.montar_dataframe(table, i) for i, table, _ in varrer_paginas(pdf_path, paginas)]
+    return tabelas, paginas
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_passada_unica_equivale_a_detectar_e_extrair(tmp_path, workers):
+    pdf_path = tmp_path / "anexo.pdf"
+    gerar_pdf(pdf_path)
+
+    tabelas_antigas, paginas_antigas = detectar_e_extrair(pdf_path)
+    tabelas, falhas, paginas = etapa2.extrair_tabelas_em_passada_unica(pdf_path, workers=workers)
+
+    assert paginas == paginas_antigas == [1, 4]
+    assert falhas == []
+    assert len(tabelas) == len(tabelas_antigas)
+    for nova, antiga in zip(tabelas, tabelas_antigas):
+        pd.testing.assert_frame_equal(nova, antiga)
+    assert tabelas[1]["Procedimento"].tolist() == ["Raio X", "Sutura", "Biópsia"]
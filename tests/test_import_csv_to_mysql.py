@@ -0,0 +1,28 @@
+import pandas as pd
+
+from scripts.import_csv_to_mysql import limpar_colunas, sql_ampliar_enum, valores_fora_do_enum
+
+
+def test_celulas_vazias_viram_nulas():
+    df = pd.DataFrame({"uf": ["SP", "  ", "", None], "capital": [" 1,5", "", "2", "   "], "nome": ["Operadora  ", "", "x", "y"]})
+
+    df = limpar_colunas(df, {"nome": 5})
+
+    assert df["uf"].isna().tolist() == [False, True, True, True]
+    assert df["capital"].isna().tolist() == [False, True, False, True]
+    assert df["capital"].iloc[0] == "1,5"
+    assert df["nome"].tolist()[0] == "Opera"
+    assert pd.isna(df["nome"].iloc[1])
+
+
+def test_valores_fora_do_enum_ampliam_a_coluna():
+    df = limpar_colunas(pd.DataFrame({"uf": ["SP", "RJ", "DF", "", "DF", "Exterior"]}), {})
+
+    fora = valores_fora_do_enum(df, {"uf": ["RJ", "SP"]})
+
+    # Vazio não é valor fora da lista: vira NULL
+    assert fora == {"uf": ["DF", "Exterior"]}
+    assert valores_fora_do_enum(df, {"uf": ["DF", "Exterior", "RJ", "SP"]}) == {}
+    assert sql_ampliar_enum("uf", ["RJ", "SP", "DF", "Exterior"], nula=True) == (
+        "ALTER TABLE `cadastro_operadoras` MODIFY `uf` VARCHAR(12) NULL"
+    )
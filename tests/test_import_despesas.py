@@ -0,0 +1,179 @@
+import sys
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+import scripts.import_despesas_to_mysql as importador
+from scripts.etl_utils import ESQUEMA_DESPESAS
+
+
+def gravar_particao(raiz, ano, trimestre, linhas):
+    pasta = raiz / f"ano={ano}" / f"trimestre={trimestre}"
+    pasta.mkdir(parents=True)
+    colunas = list(zip(*linhas))
+    tabela = pa.table([pa.array(valores, type=campo.type) for valores, campo in zip(colunas, ESQUEMA_DESPESAS)], schema=ESQUEMA_DESPESAS)
+    pq.write_table(tabela, pasta / "fonte.parquet")
+
+
+def test_importar_trimestre_prepara_cada_lote(tmp_path, monkeypatch):
+    raiz = tmp_path / "parquet"
+    gravar_particao(raiz, 2023, 1, [
+        (date(2023, 1, 1), 1, 411, "X" * 300, Decimal("1.00"), Decimal("2.00")),
+        (date(2023, 2, 1), None, 411, "sem operadora", Decimal("1.00"), Decimal("2.00")),
+        (date(2023, 3, 1), 2, 412, "curta", None, Decimal("5.00")),
+    ])
+    gravar_particao(raiz, "__HIVE_DEFAULT_PARTITION__", "__HIVE_DEFAULT_PARTITION__", [
+        (None, 3, 411, "sem data", Decimal("1.00"), Decimal("1.00")),
+    ])
+
+    # A partição sem data não vira trimestre: `data` é NOT NULL na tabela de fatos
+    assert list(importador.listar_particoes(raiz)) == [(2023, 1)]
+
+    enviados = []
+    monkeypatch.setattr(importador, "METODO_IMPORTACAO", "load_data")
+    monkeypatch.setattr(importador, "carregar_chunk_load_data", lambda conexao, chunk, *args, **kwargs: enviados.append(chunk))
+    monkeypatch.setattr(importador, "registrar_trimestre", lambda *args: None)
+
+    engine = create_engine("sqlite://")
+    with engine.begin() as conexao:
+        conexao.execute(text(f"CREATE TABLE {importador.TABELA_FATOS} (data DATE)"))
+
+    dataset = ds.dataset(raiz, format="parquet", partitioning="hive")
+    linhas = importador.importar_trimestre(engine, dataset, 2023, 1, "assinatura", tmp_path)
+
+    assert linhas == 2
+    chunk = enviados[0]
+    assert chunk["registro_operadora"].tolist() == [1, 2]
+    assert chunk["descricao"].str.len().max() == importador.TAMANHO_DESCRICAO
+
+
+def chunk_despesas(linhas):
+    return pd.DataFrame(linhas, columns=ESQUEMA_DESPESAS.names)
+
+
+@pytest.fixture
+def carga_completa(tmp_path, monkeypatch):
+    """
+    Carga completa contra um SQLite: staging com a mesma chave primária da tabela de fatos.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'banco.db'}", connect_args={"check_same_thread": False})
+    csv = tmp_path / "despesas.csv"
+    csv.write_text("", encoding="utf-8")
+    trocas = []
+    registros = []
+
+    def criar_staging(engine):
+        with engine.begin() as conexao:
+            conexao.execute(text(f"DROP TABLE IF EXISTS {importador.TABELA_STAGING}"))
+            conexao.execute(text(
+                f"CREATE TABLE {importador.TABELA_STAGING} (data DATE, registro_operadora INT, cd_conta_contabil BIGINT, "
+                "descricao TEXT, vl_saldo_inicial NUMERIC, vl_saldo_final NUMERIC, "
+                "PRIMARY KEY (data, registro_operadora, cd_conta_contabil))"
+            ))
+
+    monkeypatch.setattr(importador, "CSV_CAMINHO", csv)
+    monkeypatch.setattr(importador, "PARQUET_CAMINHO", tmp_path / "sem_parquet")
+    monkeypatch.setattr(importador, "criar_engine", lambda: engine)
+    monkeypatch.setattr(importador, "criar_staging", criar_staging)
+    monkeypatch.setattr(importador, "trocar_tabela_fatos", lambda engine: trocas.append("trocada"))
+    monkeypatch.setattr(importador, "registrar_carga_completa", lambda *args: registros.append(args[1:]))
+    monkeypatch.setattr(importador, "WRITERS", 2)
+
+    def usar_fonte(*chunks):
+        monkeypatch.setattr(importador, "abrir_fonte_despesas", lambda: (iter(chunks), False, None))
+
+    usar_fonte.registros = registros
+    return engine, trocas, usar_fonte
+
+
+LINHA_A = (date(2023, 1, 1), 1, 411, "a", 1.0, 2.0)
+LINHA_B = (date(2023, 1, 1), 2, 411, "b", 1.0, 2.0)
+LINHA_C = (date(2023, 2, 1), 1, 411, "c", 1.0, 2.0)
+
+
+def test_carga_completa_com_to_sql_troca_a_tabela(carga_completa, monkeypatch):
+    engine, trocas, usar_fonte = carga_completa
+    monkeypatch.setattr(importador, "METODO_IMPORTACAO", "to_sql")
+    usar_fonte(chunk_despesas([LINHA_A, LINHA_B]), chunk_despesas([LINHA_C]))
+
+    importador.importar_para_mysql()
+
+    with engine.connect() as conexao:
+        assert conexao.execute(text(f"SELECT COUNT(*) FROM {importador.TABELA_STAGING}")).scalar() == 3
+    assert trocas == ["trocada"]
+    # Linhas por trimestre vão para o controle que o resumir_despesas consulta
+    assert usar_fonte.registros == [(False, {(2023, 1): 3})]
+
+
+def test_chave_repetida_no_to_sql_interrompe_a_carga(carga_completa, monkeypatch):
+    _, trocas, usar_fonte = carga_completa
+    monkeypatch.setattr(importador, "METODO_IMPORTACAO", "to_sql")
+    usar_fonte(chunk_despesas([LINHA_A]), chunk_despesas([LINHA_A]))
+
+    with pytest.raises(IntegrityError):
+        importador.importar_para_mysql()
+    assert trocas == []
+
+
+def test_contagem_divergente_falha_e_lista_as_chaves(carga_completa, monkeypatch):
+    _, trocas, usar_fonte = carga_completa
+    ignoradas = []
+
+    def carregar_como_load_data(conexao, chunk, caminho, tabela, substituir=False):
+        # Como o LOAD DATA LOCAL: chave repetida vira aviso e a linha é ignorada
+        carregadas = 0
+        for linha in chunk.itertuples(index=False):
+            resultado = conexao.execute(
+                text(f"INSERT OR IGNORE INTO {tabela} VALUES (:data, :op, :conta, :descricao, :inicial, :final)"),
+                dict(zip(["data", "op", "conta", "descricao", "inicial", "final"], linha)),
+            )
+            if resultado.rowcount:
+                carregadas += 1
+            else:
+                ignoradas.append(f"{linha.data}-{linha.registro_operadora}-{linha.cd_conta_contabil}")
+        return carregadas
+
+    monkeypatch.setattr(importador, "METODO_IMPORTACAO", "load_data")
+    monkeypatch.setattr(importador, "carregar_chunk_load_data", carregar_como_load_data)
+    monkeypatch.setattr(importador, "chaves_duplicadas", lambda conexao: ignoradas[:])
+    usar_fonte(chunk_despesas([LINHA_A, LINHA_B]), chunk_despesas([LINHA_C, LINHA_A]))
+
+    with pytest.raises(RuntimeError, match="3 linhas e a origem 4") as erro:
+        importador.importar_para_mysql()
+    assert "2023-01-01-1-411" in str(erro.value)
+    assert trocas == []
+
+
+def test_falha_na_carga_encerra_com_codigo_de_erro(carga_completa, monkeypatch):
+    _, trocas, usar_fonte = carga_completa
+    monkeypatch.setattr(importador, "METODO_IMPORTACAO", "to_sql")
+    monkeypatch.setattr(sys, "argv", ["import_despesas_to_mysql.py"])
+    monkeypatch.setattr(importador, "MODO_INCREMENTAL", False)
+    usar_fonte(chunk_despesas([LINHA_A]), chunk_despesas([LINHA_A]))
+
+    with pytest.raises(SystemExit) as saida:
+        importador.main()
+    assert saida.value.code == 1
+
+
+class ConexaoComAvisos:
+    def exec_driver_sql(self, sql):
+        assert sql == "SHOW WARNINGS"
+        return self
+
+    def fetchall(self):
+        return [
+            ("Warning", 1062, "Duplicate entry '2023-01-01-1-411' for key 'fato_despesas_contabeis_staging.PRIMARY'"),
+            ("Warning", 1265, "Data truncated for column 'descricao' at row 3"),
+        ]
+
+
+def test_chaves_duplicadas_vem_dos_avisos_do_servidor():
+    assert importador.chaves_duplicadas(ConexaoComAvisos()) == ["2023-01-01-1-411"]
@@ -0,0 +1,57 @@
+import json
+
+from scripts.inferir_esquema import perfilar_csv, salvar_perfil, tipos_sql
+
+
+def test_perfilar_csv_em_chunks_infere_tipos_compactos(tmp_path):
+    linhas = ["Registro_ANS;CNPJ;UF;Modalidade;Razao_Social;Capital;Data_Registro_ANS;Vazia"]
+    for i in range(40):
+        linhas.append(
+            f"{300000 + i};{i:014d};{'SP' if i % 2 else 'RJ'};{'Cooperativa' if i % 3 else 'Medicina de Grupo'};"
+            f"Operadora {'X' * i};{i},5;2020-01-{i % 28 + 1:02d};"
+        )
+    caminho = tmp_path / "Relatorio_cadop.csv"
+    caminho.write_text("\n".join(linhas) + "\n", encoding="latin1")
+
+    perfis = perfilar_csv(caminho, aliases={"registro_ans": "registro_operadora"}, chunksize=7)
+    tipos = tipos_sql(perfis)
+
+    assert tipos["registro_operadora"] == "MEDIUMINT UNSIGNED"
+    assert tipos["cnpj"] == "CHAR(14)"
+    assert tipos["uf"] == "ENUM('RJ', 'SP')"
+    assert tipos["modalidade"] == "ENUM('Cooperativa', 'Medicina de Grupo')"
+    # Maior razão social tem 49 caracteres: 50% de folga
+    assert tipos["razao_social"] == "VARCHAR(74)"
+    # Maior capital 39,5: um dígito inteiro de folga
+    assert tipos["capital"] == "DECIMAL(4,1)"
+    assert tipos["data_registro_ans"] == "DATE"
+    assert "vazia" not in tipos
+    assert perfis["vazia"].taxa_nulos == 1.0
+    assert perfis["registro_operadora"].linhas == 40
+
+
+def test_salvar_perfil_grava_truncamentos_das_colunas_de_texto(tmp_path):
+    caminho = tmp_path / "dados.csv"
+    caminho.write_text("codigo;nome\n1;Ana\n-2;Bernardo\n", encoding="utf-8")
+
+    perfis = perfilar_csv(caminho, amostra_linhas=1)
+    assert perfis["codigo"].linhas == 1
+
+    perfis = perfilar_csv(caminho)
+    assert tipos_sql(perfis)["codigo"] == "TINYINT"
+    salvar_perfil(perfis, tmp_path / "perfil.json", tmp_path / "truncamentos.json")
+
+    assert json.loads((tmp_path / "truncamentos.json").read_text(encoding="utf-8")) == {"nome": 12}
+    assert json.loads((tmp_path / "perfil.json").read_text(encoding="utf-8"))["nome"]["tamanho_max"] == 8
+
+
+def test_tipos_numericos_tem_um_digito_de_folga(tmp_path):
+    caminho = tmp_path / "dados.csv"
+    caminho.write_text("quantidade;saldo\n200;-120\n7;3\n", encoding="utf-8")
+
+    tipos = tipos_sql(perfilar_csv(caminho))
+
+    # 200 caberia em TINYINT UNSIGNED (255), mas 2000 não
+    assert tipos["quantidade"] == "SMALLINT UNSIGNED"
+    # -120 caberia em TINYINT (-128), mas -1200 não
+    assert tipos["saldo"] == "SMALLINT"
@@ -0,0 +1,90 @@
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from scripts import processar_despesas
+
+CABECALHO = '"DATA";"REG_ANS";"CD_CONTA_CONTABIL";"DESCRICAO";"VL_SALDO_INICIAL";"VL_SALDO_FINAL"\n'
+
+
+@pytest.fixture
+def pastas(tmp_path, monkeypatch):
+    soltos = tmp_path / "temp"
+    zips = tmp_path / "input"
+    soltos.mkdir()
+    zips.mkdir()
+    monkeypatch.setattr(processar_despesas, "BASE_PATH", soltos)
+    monkeypatch.setattr(processar_despesas, "ZIP_PATH", zips)
+    monkeypatch.setattr(processar_despesas, "CSV_SAIDA", tmp_path / "saida" / "despesas_consolidadas.csv")
+    monkeypatch.setattr(processar_despesas, "PARQUET_SAIDA", tmp_path / "saida" / "parquet")
+    monkeypatch.setattr(processar_despesas, "PARTES_DIR", tmp_path / "saida" / "partes")
+    monkeypatch.setattr(processar_despesas, "MANIFESTO", tmp_path / "saida" / "partes" / "manifesto.json")
+    return soltos, zips, tmp_path / "saida"
+
+
+def test_processar_le_csv_dentro_do_zip_sem_extrair(pastas):
+    soltos, zips, saida = pastas
+    (soltos / "1T2023.csv").write_text(CABECALHO + '"2023-01-01";"123";"411";"Saúde";"1,50";"2,00"\n', encoding="utf-8")
+    conteudo = CABECALHO + '"2023-04-01";"456";"411";"Prêmio";"3,00";"4,25"\n'
+    with zipfile.ZipFile(zips / "2T2023.zip", "w") as arquivo_zip:
+        arquivo_zip.writestr("2T2023.csv", conteudo.encode("latin1"))
+
+    processar_despesas.processar(workers=1)
+
+    linhas = (saida / "despesas_consolidadas.csv").read_text(encoding="utf-8").splitlines()
+    assert linhas == [
+        "DATA;registro_operadora;CD_CONTA_CONTABIL;DESCRICAO;VL_SALDO_INICIAL;VL_SALDO_FINAL",
+        "2023-01-01;123;411;saude;1,50;2,00",
+        "2023-04-01;456;411;premio;3,00;4,25",
+    ]
+    assert sorted(p.name for p in zips.rglob("*")) == ["2T2023.zip"]
+
+
+def test_processar_grava_parquet_tipado_por_trimestre(pastas):
+    soltos, _, saida = pastas
+    (soltos / "1T2023.csv").write_text(
+        CABECALHO
+        + '"2023-01-01";"123";"411";"Saúde";"1,50";"2,00"\n'
+        + '"01/04/2023";"456";"411";"Prêmio";"-3,00";"4,25"\n',
+        encoding="utf-8",
+    )
+    processar_despesas.processar(workers=1)
+
+    raiz = saida / "parquet"
+    particoes = sorted(p.parent.relative_to(raiz).as_posix() for p in raiz.rglob("*.parquet"))
+    assert particoes == ["ano=2023/trimestre=1", "ano=2023/trimestre=2"]
+
+    df = pd.read_parquet(raiz).sort_values("registro_operadora")
+    assert df["data"].tolist() == [date(2023, 1, 1), date(2023, 4, 1)]
+    assert df["registro_operadora"].dtype == "int32"
+    assert df["vl_saldo_inicial"].tolist() == [Decimal("1.50"), Decimal("-3.00")]
+    assert df["trimestre"].astype(int).tolist() == [1, 2]
+
+
+def test_processar_so_reprocessa_fontes_novas_ou_alteradas(pastas, monkeypatch):
+    soltos, _, saida = pastas
+    (soltos / "1T2023.csv").write_text(CABECALHO + '"2023-01-01";"1";"411";"A";"1,00";"2,00"\n', encoding="utf-8")
+    (soltos / "2T2023.csv").write_text(CABECALHO + '"2023-04-01";"2";"411";"B";"1,00";"2,00"\n', encoding="utf-8")
+    processar_despesas.processar(workers=1)
+
+    lidas = []
+    original = processar_despesas.processar_arquivo
+    monkeypatch.setattr(
+        processar_despesas, "processar_arquivo",
+        lambda fonte, *args: lidas.append(fonte.nome) or original(fonte, *args),
+    )
+    processar_despesas.processar(workers=1)
+    assert lidas == []
+
+    (soltos / "2T2023.csv").write_text(CABECALHO + '"2023-04-01";"3";"411";"C";"5,00";"6,00"\n', encoding="utf-8")
+    (soltos / "3T2023.csv").write_text(CABECALHO + '"2023-07-01";"4";"411";"D";"1,00";"2,00"\n', encoding="utf-8")
+    processar_despesas.processar(workers=1)
+    assert lidas == ["2T2023.csv", "3T2023.csv"]
+
+    linhas = (saida / "despesas_consolidadas.csv").read_text(encoding="utf-8").splitlines()
+    assert [linha.split(";")[1] for linha in linhas[1:]] == ["1", "3", "4"]
+    df = pd.read_parquet(saida / "parquet")
+    assert sorted(df["registro_operadora"].tolist()) == [1, 3, 4]
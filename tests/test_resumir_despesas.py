@@ -0,0 +1,93 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, event, text
+
+import scripts.resumir_despesas as resumir
+from scripts.etl_utils import limites_trimestre
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """
+    SQLite com a tabela de fatos, o controle do importador e as tabelas do resumo (sem os índices do MySQL).
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'banco.db'}")
+    event.listen(engine, "connect", lambda conexao, _: conexao.create_function("NOW", 0, lambda: datetime.now().isoformat()))
+    with engine.begin() as conexao:
+        conexao.execute(text(
+            f"CREATE TABLE {resumir.TABELA_FATOS} (data DATE, registro_operadora INT, cd_conta_contabil BIGINT, "
+            "descricao TEXT, vl_saldo_inicial NUMERIC, vl_saldo_final NUMERIC)"
+        ))
+        conexao.execute(text(
+            f"CREATE TABLE {resumir.TABELA_CONTROLE_IMPORT} (ano INT, trimestre INT, assinatura TEXT, "
+            "qtd_linhas INT, atualizado_em TEXT, PRIMARY KEY (ano, trimestre))"
+        ))
+    monkeypatch.setattr(resumir, "criar_engine", lambda: engine)
+    monkeypatch.setattr(resumir, "DDL_RESUMO", resumir.DDL_RESUMO.split("  KEY")[0].rstrip().rstrip(",") + "\n)")
+    monkeypatch.setattr(resumir, "garantir_coluna_assinatura", lambda conexao: None)
+    return engine
+
+
+def importar(engine, ano, trimestre, assinatura, linhas):
+    """
+    Simula o import_despesas_to_mysql: troca as linhas do trimestre e registra a assinatura.
+    """
+    inicio, fim = limites_trimestre(ano, trimestre)
+    with engine.begin() as conexao:
+        conexao.execute(text(f"DELETE FROM {resumir.TABELA_FATOS} WHERE data >= :inicio AND data < :fim"), {"inicio": inicio, "fim": fim})
+        for linha in linhas:
+            conexao.execute(text(f"INSERT INTO {resumir.TABELA_FATOS} VALUES (:d, :op, :conta, :desc, :ini, :fim)"), linha)
+        conexao.execute(
+            text(f"REPLACE INTO {resumir.TABELA_CONTROLE_IMPORT} VALUES (:ano, :trimestre, :assinatura, :linhas, NOW())"),
+            {"ano": ano, "trimestre": trimestre, "assinatura": assinatura, "linhas": len(linhas)},
+        )
+
+
+def lancamento(data, operadora, valor_final):
+    return {"d": data, "op": operadora, "conta": 411, "desc": "Eventos", "ini": 0, "fim": valor_final}
+
+
+def resumo(engine):
+    with engine.connect() as conexao:
+        return {
+            (ano, trimestre, operadora): despesa
+            for ano, trimestre, operadora, despesa in conexao.execute(text(
+                f"SELECT ano, trimestre, registro_operadora, total_despesa FROM {resumir.TABELA_RESUMO}"
+            ))
+        }
+
+
+def test_so_reagrega_trimestres_com_assinatura_nova(banco, monkeypatch):
+    importar(banco, 2023, 1, "a1", [lancamento(date(2023, 1, 1), 1, 100), lancamento(date(2023, 2, 1), 1, 50)])
+    importar(banco, 2023, 2, "b1", [lancamento(date(2023, 4, 1), 2, 70)])
+
+    resumir.resumir_despesas()
+    assert resumo(banco) == {(2023, 1, 1): 150, (2023, 2, 2): 70}
+
+    agregados = []
+    monkeypatch.setattr(
+        resumir, "limites_trimestre", lambda ano, trimestre: agregados.append((ano, trimestre)) or limites_trimestre(ano, trimestre)
+    )
+
+    # Nada mudou: nenhum trimestre é lido da tabela de fatos
+    resumir.resumir_despesas()
+    assert agregados == []
+
+    # Só o 2º trimestre foi recarregado pelo importador
+    importar(banco, 2023, 2, "b2", [lancamento(date(2023, 4, 1), 2, 90)])
+    resumir.resumir_despesas()
+    assert agregados == [(2023, 2)]
+    assert resumo(banco) == {(2023, 1, 1): 150, (2023, 2, 2): 90}
+
+
+def test_trimestre_que_saiu_do_controle_sai_do_resumo(banco):
+    importar(banco, 2023, 1, "a1", [lancamento(date(2023, 1, 1), 1, 100)])
+    importar(banco, 2023, 2, "b1", [lancamento(date(2023, 4, 1), 2, 70)])
+    resumir.resumir_despesas()
+
+    with banco.begin() as conexao:
+        conexao.execute(text(f"DELETE FROM {resumir.TABELA_CONTROLE_IMPORT} WHERE trimestre = 1"))
+    resumir.resumir_despesas()
+
+    assert resumo(banco) == {(2023, 2, 2): 70}
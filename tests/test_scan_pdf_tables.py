@@ -0,0 +1,79 @@
+import multiprocessing
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+
+import scripts.scan_pdf_tables as scanner
+
+
+class ErroPdfminer(Exception):
+    # Como várias exceções do pdfminer: args diferentes dos do __init__, não volta de um pickle
+    def __init__(self, pagina, motivo):
+        super().__init__(f"página {pagina}: {motivo}")
+
+
+def varrer_paginas_falsa(pdf_path, paginas=None, cache=None):
+    for numero in paginas:
+        if numero == 5:
+            yield numero, None, ErroPdfminer(numero, "stream corrompido")
+        else:
+            yield numero, [["cabecalho", "a", "b"], [str(numero), "1", "2"]], None
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="o stub só chega aos processos com fork")
+def test_paralelo_devolve_a_mesma_sequencia_que_o_sequencial(monkeypatch):
+    monkeypatch.setattr(scanner, "varrer_paginas", varrer_paginas_falsa)
+    paginas = list(range(1, 21))
+
+    sequencial = list(scanner.varrer_paginas_em_paralelo(Path("anexo.pdf"), paginas, workers=1))
+    paralelo = list(scanner.varrer_paginas_em_paralelo(Path("anexo.pdf"), paginas, workers=3))
+
+    assert [(numero, table) for numero, table, _ in paralelo] == [(numero, table) for numero, table, _ in sequencial]
+    assert [numero for numero, _, _ in paralelo] == paginas
+
+    erros = {numero: erro for numero, _, erro in paralelo if erro is not None}
+    assert list(erros) == [5]
+    # A exceção original não atravessa o pool: volta como RuntimeError com a mesma mensagem
+    assert isinstance(erros[5], RuntimeError)
+    assert str(erros[5]) == str(sequencial[4][2]) == "página 5: stream corrompido"
+
+
+class ExecutorSincrono:
+    """
+    Substitui o ProcessPoolExecutor: roda cada tarefa na hora e conta as páginas enviadas.
+    """
+    enviadas = 0
+
+    def __init__(self, max_workers):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, funcao, pdf_path, paginas, cache):
+        futuro = Future()
+        futuro.set_result(funcao(pdf_path, paginas, cache))
+        ExecutorSincrono.enviadas += len(paginas)
+        return futuro
+
+
+@pytest.mark.parametrize("total", [100, 1000])
+def test_paginas_em_memoria_nao_crescem_com_o_pdf(monkeypatch, total):
+    monkeypatch.setattr(scanner, "varrer_paginas", varrer_paginas_falsa)
+    monkeypatch.setattr(scanner, "ProcessPoolExecutor", ExecutorSincrono)
+    ExecutorSincrono.enviadas = 0
+
+    consumidas = maximo = 0
+    for numero, _, _ in scanner.varrer_paginas_em_paralelo(
+        Path("anexo.pdf"), range(1, total + 1), workers=3, paginas_por_tarefa=4
+    ):
+        consumidas += 1
+        maximo = max(maximo, ExecutorSincrono.enviadas - consumidas + 1)
+
+    assert consumidas == total
+    # 2 * workers tarefas de 4 páginas, com 100 ou com 1000 páginas
+    assert maximo <= 2 * 3 * 4